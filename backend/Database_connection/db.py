@@ -1,31 +1,111 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
-import os
-from pathlib import Path
-
-# Load environment variables from backend/.env
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
-
-# Get PostgreSQL database URL from environment
-DATABASE_URL = os.getenv('DB_URL')
-
-if not DATABASE_URL:
-    raise ValueError("DB_URL must be set in environment variables")
-
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=5,
-    max_overflow=10,
-)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+from typing import Optional
+import threading
+from ..config import DATABASE_URL, DB_MODE, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE_SECONDS
+from .pool import InstrumentedQueuePool, PoolManager
+
+# Single declarative base and session factory shared by every model and route
 Base = declarative_base()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Engine registry: one engine (and pool) per process, created on first use
+_engine: Optional[Engine] = None
+_pool_manager: Optional[PoolManager] = None
+_pooled_mode = False
+_engine_lock = threading.Lock()
+
+
+def resolve_db_mode(url: str, mode: str = DB_MODE) -> str:
+    """
+    Resolve DB_MODE to "direct" or "pooled"
+    
+    auto picks pooled for Neon pooled endpoints (host contains "-pooler").
+    """
+    if mode in ("direct", "pooled"):
+        return mode
+    host = make_url(url).host or ""
+    return "pooled" if "-pooler" in host else "direct"
+
+
+def create_database_engine(url: str, mode: str = DB_MODE) -> Engine:
+    """
+    Build an engine for a direct connection or a transaction-mode pooler
+    
+    Behind a transaction-mode pooler (PgBouncer, Neon's -pooler endpoint)
+    consecutive transactions may run on different server connections, so
+    server-side prepared statement caches are switched off for the drivers
+    that keep them (psycopg2 never prepares). Session state (SET, advisory
+    locks, LISTEN, temp tables) must not be relied on in this mode.
+    """
+    connect_args = {}
+    if resolve_db_mode(url, mode) == "pooled":
+        driver = make_url(url).get_driver_name()
+        if driver == "psycopg":
+            connect_args["prepare_threshold"] = None
+        elif driver == "asyncpg":
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    
+    # No pool_pre_ping: idle connections are validated in the background
+    # by PoolManager (direct mode) or by the pooler itself (pooled mode)
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        connect_args=connect_args,
+    )
+
+
+def init_engine(url: Optional[str] = None) -> Engine:
+    """Create the process-wide engine and bind the session factory to it"""
+    global _engine, _pool_manager, _pooled_mode
+    with _engine_lock:
+        if _engine is None:
+            database_url = url or DATABASE_URL
+            if not database_url:
+                raise ValueError("DB_URL must be set in environment variables")
+            
+            _pooled_mode = resolve_db_mode(database_url) == "pooled"
+            _engine = create_database_engine(database_url)
+            _pool_manager = PoolManager(_engine, background_checks=not _pooled_mode)
+            SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_engine() -> Engine:
+    """Return the registered engine, initializing it if the lifespan hook has not"""
+    return _engine if _engine is not None else init_engine()
+
+
+def get_pool_manager() -> PoolManager:
+    get_engine()
+    return _pool_manager
+
+
+def is_pooled_mode() -> bool:
+    """True when running behind a transaction-mode pooler (no session state across transactions)"""
+    get_engine()
+    return _pooled_mode
+
+
+def dispose_engine() -> None:
+    """Stop background checks, close all pooled connections and forget the engine"""
+    global _engine, _pool_manager
+    with _engine_lock:
+        if _pool_manager is not None:
+            _pool_manager.stop()
+            _pool_manager = None
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
 
 def get_db():
-    from fastapi import Depends
+    get_pool_manager().ensure_warm()
     db = SessionLocal()
     try:
         yield db
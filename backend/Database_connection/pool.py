@@ -0,0 +1,197 @@
+"""
+Connection Pool Management
+Validates idle connections in the background instead of pinging on every
+checkout, and wakes a scale-to-zero database (Neon) with bounded retries
+"""
+import time
+import logging
+import threading
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import QueuePool
+from ..config import (
+    DB_HEALTHCHECK_INTERVAL_SECONDS,
+    DB_IDLE_RELEASE_SECONDS,
+    DB_WARMUP_RETRIES,
+    DB_WARMUP_BACKOFF_MS,
+    DB_WARMUP_COOLDOWN_SECONDS
+)
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+POOL_WAIT_EWMA_ALPHA = 0.2
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    wait_ewma_ms = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            wait_ms = (time.perf_counter() - started) * 1000
+            metrics.observe("db_pool_wait_ms", wait_ms)
+            metrics.set_gauge("db_pool_last_wait_ms", wait_ms)
+            # Smoothed wait, read by the load shedder
+            self.wait_ewma_ms += POOL_WAIT_EWMA_ALPHA * (wait_ms - self.wait_ewma_ms)
+            metrics.set_gauge("db_pool_wait_ewma_ms", self.wait_ewma_ms)
+
+    def connect_unrecorded(self):
+        """Checkout that leaves the wait metrics alone (background health checks)"""
+        return super().connect()
+
+
+class PoolManager:
+    """
+    Keeps the pool healthy off the request path
+
+    - every DB_HEALTHCHECK_INTERVAL_SECONDS a background thread checks out the
+      idle connections one by one, runs SELECT 1 and invalidates dead ones
+    - after DB_IDLE_RELEASE_SECONDS without traffic it closes the idle
+      connections so Neon can scale to zero, and marks the pool cold
+    - the first request after that calls ensure_warm(), which reconnects with
+      bounded exponential backoff while the compute wakes up; after a failed
+      warm-up, requests skip it for DB_WARMUP_COOLDOWN_SECONDS instead of
+      each retrying in turn behind the lock
+
+    Behind a transaction-mode pooler the pooler owns the server connections,
+    so background checks are disabled and only the warm-up retry remains.
+    """
+
+    def __init__(self, engine: Engine, background_checks: bool = True):
+        self.engine = engine
+        self.background_checks = background_checks
+        self.cold = True
+        self._warmup_failed_at: Optional[float] = None
+        self._last_activity = time.monotonic()
+        self._warm_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        event.listen(engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.pool, "invalidate", self._on_invalidate)
+        event.listen(engine, "handle_error", self._on_error)
+
+    # ---------- events ----------
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._last_activity = time.monotonic()
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        metrics.inc("db_pool_reconnects_total")
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            metrics.inc("db_disconnects_total")
+            self.cold = True
+
+    # ---------- warm-up ----------
+
+    def ensure_warm(self) -> None:
+        """Reconnect with bounded retry if the pool was released or lost its connections"""
+        if not self.cold or self._cooling_down():
+            return
+        with self._warm_lock:
+            # Requests that queued behind a failed attempt do not repeat it
+            if self.cold and not self._cooling_down():
+                self.warm_up()
+
+    def _cooling_down(self) -> bool:
+        failed_at = self._warmup_failed_at
+        if failed_at is not None and time.monotonic() - failed_at < DB_WARMUP_COOLDOWN_SECONDS:
+            metrics.inc("db_warmup_skipped_total")
+            return True
+        return False
+
+    def warm_up(self) -> bool:
+        delay = DB_WARMUP_BACKOFF_MS / 1000
+        for attempt in range(1, DB_WARMUP_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                with self.engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                self.cold = False
+                self._warmup_failed_at = None
+                metrics.observe("db_warmup_ms", (time.perf_counter() - started) * 1000)
+                return True
+            except DBAPIError:
+                logger.warning(
+                    "Database warm-up attempt failed",
+                    extra={"attempt": attempt, "attempts": DB_WARMUP_RETRIES},
+                    exc_info=True
+                )
+                if attempt < DB_WARMUP_RETRIES:
+                    time.sleep(delay)
+                    delay *= 2
+        self._warmup_failed_at = time.monotonic()
+        metrics.inc("db_warmup_failures_total")
+        logger.error("Database did not wake up", extra={"attempts": DB_WARMUP_RETRIES})
+        return False
+
+    # ---------- background checks ----------
+
+    def start(self) -> None:
+        if self._thread is not None or not self.background_checks:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-pool-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(DB_HEALTHCHECK_INTERVAL_SECONDS):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Pool health check failed")
+
+    def check(self) -> None:
+        pool = self.engine.pool
+        self.publish_stats()
+
+        if time.monotonic() - self._last_activity > DB_IDLE_RELEASE_SECONDS:
+            if not self.cold and pool.checkedout() == 0:
+                # Let the database scale to zero instead of keeping it awake
+                self.engine.dispose()
+                self.cold = True
+                logger.info("Released idle database connections")
+            return
+
+        # Each checkout takes the oldest idle connection (FIFO), so checking out
+        # `checkedin` connections in turn visits every idle one once
+        last_activity = self._last_activity
+        # Near-zero waits from these checkouts would drag the load shedder's
+        # wait EWMA down just when requests are queueing
+        checkout = pool.connect_unrecorded if isinstance(pool, InstrumentedQueuePool) else pool.connect
+        for _ in range(pool.checkedin()):
+            connection = checkout()
+            try:
+                cursor = connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+            except Exception:
+                connection.invalidate()
+                self.cold = True
+            finally:
+                connection.close()
+        # Health-check checkouts are not traffic
+        self._last_activity = last_activity
+
+    def publish_stats(self) -> None:
+        pool = self.engine.pool
+        metrics.set_gauge("db_pool_size", pool.size())
+        metrics.set_gauge("db_pool_checked_out", pool.checkedout())
+        metrics.set_gauge("db_pool_checked_in", pool.checkedin())
+        metrics.set_gauge("db_pool_overflow", pool.overflow())
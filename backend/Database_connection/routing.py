@@ -0,0 +1,173 @@
+"""
+Read Replica Routing
+Sends read-only requests to a replica when one is configured and caught up,
+and keeps a user on the primary for a short window after they write so they
+always see their own changes
+"""
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from fastapi import Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from ..config import (
+    DB_REPLICA_URL,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_LAG_CHECK_SECONDS,
+    DB_READ_YOUR_WRITES_SECONDS
+)
+from ..auth.security import decode_access_token
+from ..utils.metrics import metrics
+from .db import SessionLocal, create_database_engine, get_pool_manager
+
+logger = logging.getLogger(__name__)
+
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+_optional_bearer = HTTPBearer(auto_error=False)
+
+
+class ReplicaRouter:
+    """
+    Decides per request whether reads can go to the replica
+
+    - replica lag is measured at most every DB_REPLICA_LAG_CHECK_SECONDS and
+      cached; past DB_REPLICA_MAX_LAG_SECONDS (or when the replica cannot be
+      reached) reads fall back to the primary
+    - mark_write(user_id) pins that user to the primary for
+      DB_READ_YOUR_WRITES_SECONDS. The window is kept in process memory, so
+      with several workers it only covers requests served by the same worker
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lag: Optional[float] = None
+        self._lag_checked_at = 0.0
+        self._lag_lock = threading.Lock()
+        self._recent_writes: Dict[int, float] = {}
+        self._writes_lock = threading.Lock()
+
+    # ---------- lag ----------
+
+    def _measure_lag(self) -> float:
+        if self.engine.dialect.name != "postgresql":
+            return 0.0
+        try:
+            with self.engine.connect() as connection:
+                return float(connection.execute(_LAG_QUERY).scalar() or 0)
+        except Exception:
+            logger.warning("Replica lag check failed", exc_info=True)
+            return float("inf")
+
+    def lag_seconds(self) -> float:
+        now = time.monotonic()
+        if now - self._lag_checked_at >= DB_REPLICA_LAG_CHECK_SECONDS:
+            # One thread refreshes; the others keep using the cached value
+            if self._lag_lock.acquire(blocking=self._lag is None):
+                try:
+                    self._lag = self._measure_lag()
+                    self._lag_checked_at = time.monotonic()
+                    metrics.set_gauge("db_replica_lag_seconds", self._lag)
+                finally:
+                    self._lag_lock.release()
+        return self._lag
+
+    # ---------- read-your-writes ----------
+
+    def mark_write(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._writes_lock:
+            self._recent_writes[user_id] = now + DB_READ_YOUR_WRITES_SECONDS
+            if len(self._recent_writes) > 1000:
+                self._recent_writes = {uid: until for uid, until in self._recent_writes.items() if until > now}
+
+    def wrote_recently(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._recent_writes.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def use_replica(self, user_id: Optional[int]) -> bool:
+        if self.wrote_recently(user_id):
+            metrics.inc("db_reads_primary_sticky_total")
+            return False
+        if self.lag_seconds() > DB_REPLICA_MAX_LAG_SECONDS:
+            metrics.inc("db_reads_primary_lagging_total")
+            return False
+        metrics.inc("db_reads_replica_total")
+        return True
+
+
+_router: Optional[ReplicaRouter] = None
+_router_lock = threading.Lock()
+
+
+def init_replica_engine(url: Optional[str] = None) -> Optional[Engine]:
+    """Create the replica engine when DB_REPLICA_URL (or `url`) is set"""
+    global _router
+    with _router_lock:
+        replica_url = url or DB_REPLICA_URL
+        if _router is None and replica_url:
+            engine = create_database_engine(replica_url)
+            ReplicaSessionLocal.configure(bind=engine)
+            _router = ReplicaRouter(engine)
+    return _router.engine if _router is not None else None
+
+
+def dispose_replica_engine() -> None:
+    global _router
+    with _router_lock:
+        if _router is not None:
+            _router.engine.dispose()
+            _router = None
+
+
+def mark_user_write(user_id: int) -> None:
+    """Route this user's reads to the primary for the read-your-writes window"""
+    if _router is not None:
+        _router.mark_write(user_id)
+
+
+def open_read_session(user_id: Optional[int] = None) -> Session:
+    """
+    New session on the replica or the primary, chosen as in get_read_db
+
+    For work that runs outside the request's own session, e.g. concurrent
+    sub-queries in a threadpool. The caller closes it.
+    """
+    if _router is not None and _router.use_replica(user_id):
+        return ReplicaSessionLocal()
+    get_pool_manager().ensure_warm()
+    return SessionLocal()
+
+
+def get_read_db(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_optional_bearer)):
+    """
+    Session dependency for read-only endpoints
+
+    Uses the replica unless none is configured, it is lagging, or the caller
+    (identified from the bearer token without touching the database) wrote
+    within the read-your-writes window.
+    """
+    user_id = None
+    if credentials is not None:
+        payload = decode_access_token(credentials.credentials)
+        user_id = payload.get("user_id") if payload else None
+
+    db = open_read_session(user_id)
+    try:
+        yield db
+    finally:
+        db.close()
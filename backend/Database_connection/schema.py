@@ -0,0 +1,73 @@
+"""
+Schema Bootstrap
+Creates missing tables and applies additive, idempotent DDL at startup so new
+tables and columns exist without a separate migration step
+"""
+import logging
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from .db import Base
+
+logger = logging.getLogger(__name__)
+
+# Additive statements for tables that already exist in deployed databases.
+# Each one must be safe to run repeatedly (IF NOT EXISTS, or a no-op once applied).
+POSTGRES_DDL: List[str] = [
+    # Typed scheduled-booking timestamps (backfilled from the date/time strings)
+    "ALTER TABLE bookings ADD COLUMN IF NOT EXISTS scheduled_start TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE bookings ADD COLUMN IF NOT EXISTS scheduled_end TIMESTAMP WITH TIME ZONE",
+    "CREATE INDEX IF NOT EXISTS ix_bookings_provider_schedule ON bookings (provider_phone, scheduled_start)",
+    "ALTER TABLE booking_history ADD COLUMN IF NOT EXISTS scheduled_start TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE booking_history ADD COLUMN IF NOT EXISTS scheduled_end TIMESTAMP WITH TIME ZONE",
+    # Provider reminders (claimed once, so restarts never resend)
+    "ALTER TABLE bookings ADD COLUMN IF NOT EXISTS reminder_sent_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE booking_history ADD COLUMN IF NOT EXISTS reminder_sent_at TIMESTAMP WITH TIME ZONE",
+    "CREATE INDEX IF NOT EXISTS ix_bookings_reminder_due ON bookings (scheduled_start) WHERE reminder_sent_at IS NULL",
+    # Provider capacity; active_jobs is counted once from bookings when the
+    # column is first added, then maintained by the booking state machine
+    "ALTER TABLE providers ADD COLUMN IF NOT EXISTS max_concurrent_jobs INTEGER",
+    "ALTER TABLE providers ADD COLUMN IF NOT EXISTS active_jobs INTEGER",
+    "UPDATE providers SET active_jobs = ("
+    " SELECT count(*) FROM bookings JOIN users ON users.phone_number = bookings.provider_phone"
+    " WHERE users.id = providers.user_id AND bookings.status = 'ACCEPTED'"
+    ") WHERE active_jobs IS NULL",
+    "ALTER TABLE providers ALTER COLUMN active_jobs SET DEFAULT 0",
+    "ALTER TABLE providers ALTER COLUMN active_jobs SET NOT NULL",
+    # Dispatch ownership: one worker runs the waves of each unassigned booking
+    "ALTER TABLE bookings ADD COLUMN IF NOT EXISTS dispatch_owner VARCHAR(64)",
+    "ALTER TABLE bookings ADD COLUMN IF NOT EXISTS dispatch_lease_until TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE booking_history ADD COLUMN IF NOT EXISTS dispatch_owner VARCHAR(64)",
+    "ALTER TABLE booking_history ADD COLUMN IF NOT EXISTS dispatch_lease_until TIMESTAMP WITH TIME ZONE",
+]
+
+# Statements that need a contrib extension the server may not ship. They run
+# after POSTGRES_DDL, each in its own transaction; the first failure is logged
+# and skips the rest (they depend on each other), without failing startup.
+POSTGRES_OPTIONAL_DDL: List[str] = [
+    # Substring lookups (LIKE '%key%') on provider search terms
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_provider_search_terms_latin_trgm"
+    " ON provider_search_terms USING gin (latin gin_trgm_ops)",
+]
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Create missing tables, then apply POSTGRES_DDL and POSTGRES_OPTIONAL_DDL on PostgreSQL"""
+    from .. import all_models  # noqa: F401 - registers every model on Base
+
+    Base.metadata.create_all(bind=engine, checkfirst=True)
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for statement in POSTGRES_DDL:
+            connection.execute(text(statement))
+    for statement in POSTGRES_OPTIONAL_DDL:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(statement))
+        except DBAPIError:
+            logger.warning("Optional schema statement failed, skipping the rest", extra={"statement": statement}, exc_info=True)
+            break
+    logger.debug("Schema ensured", extra={"ddl_statements": len(POSTGRES_DDL)})
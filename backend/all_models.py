@@ -1,22 +1,24 @@
 # Import all models in one place to ensure they all use the same Base
 # This file ensures proper SQLAlchemy relationship configuration
 
-import sys
-from pathlib import Path
-
-# Add backend directory to path (same as providers.py does)
-sys.path.append(str(Path(__file__).parent))
-
-from Database_connection.db import Base
+from .Database_connection.db import Base
 
 # Import User model first
-from auth.models import User
+from .auth.models import User
 
 # Import other models  
-from models.providers import Provider
-from models.customers import Customer
-from models.job_codes import JobCode
-from models.otp import OTPVerification
+from .models.providers import Provider
+from .models.customers import Customer
+from .models.job_codes import JobCode
+from .models.otp import OTPVerification
+from .models.bookings import Booking
+from .models.reviews import Review
+from .models.saved_providers import SavedProvider
+from .models.idempotency_keys import IdempotencyKey
+from .models.booking_history import BookingHistory
+from .models.provider_availability import ProviderAvailability
+from .models.booking_offers import BookingOffer
+from .models.provider_search_terms import ProviderSearchTerm
 
 # Export all models
-__all__ = ['Base', 'User', 'Provider', 'Customer', 'JobCode', 'OTPVerification']
+__all__ = ['Base', 'User', 'Provider', 'Customer', 'JobCode', 'OTPVerification', 'Booking', 'Review', 'SavedProvider', 'IdempotencyKey', 'BookingHistory', 'ProviderAvailability', 'BookingOffer', 'ProviderSearchTerm']
@@ -1,28 +1,7 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+# Kept for backwards compatibility: the auth package shares the single
+# engine registry in Database_connection.db instead of owning a second pool
+from ..Database_connection.db import Base, SessionLocal, get_db, get_engine
 
-load_dotenv()
-
-DATABASE_URL = os.getenv("DB_URL")
-
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
@@ -1,10 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.sql import func
-import sys
-from pathlib import Path
-# Add parent directory to path to match how providers.py does it
-sys.path.append(str(Path(__file__).parent.parent))
-from Database_connection.db import Base
+from ..Database_connection.db import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from Database_connection.db import get_db
+from ..Database_connection.db import get_db
+from ..Database_connection.routing import get_read_db
 from .schemas import UserSignup, UserLogin, Token, UserInfo
 from .service import AuthService
 from .security import decode_access_token
@@ -25,6 +26,34 @@ def get_current_user(
     auth_service = AuthService(db)
     return auth_service.get_user_by_id(payload["user_id"])
 
+def get_current_user_for_read(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db)
+):
+    """Same as get_current_user, but loads the user through the read-routed session"""
+    payload = decode_access_token(credentials.credentials)
+    
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+    
+    auth_service = AuthService(db)
+    return auth_service.get_user_by_id(payload["user_id"])
+
+def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Validate the bearer token without loading the user (no database access)"""
+    payload = decode_access_token(credentials.credentials)
+    
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+    
+    return payload
+
 @router.post("/signup", response_model=Token)
 def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     auth_service = AuthService(db)
@@ -1,13 +1,12 @@
-import os
 import jwt
 import logging
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from typing import Optional
+from ..config import SECRET_KEY
 
 logging.getLogger('passlib').setLevel(logging.ERROR)
 
-SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 8
 
@@ -3,6 +3,7 @@ from fastapi import HTTPException, status
 from .models import User
 from .schemas import UserSignup, UserLogin
 from .security import hash_password, verify_password, create_access_token
+from ..Database_connection.routing import mark_user_write
 
 class AuthService:
     def __init__(self, db: Session):
@@ -40,7 +41,15 @@ class AuthService:
                 bio=f"Experienced {user_data.service} in {user_data.location}" if user_data.service and user_data.location else None
             )
             self.db.add(provider)
+            from ..utils.provider_search import index_provider
+            index_provider(self.db, new_user.id, new_user.name, provider.bio, provider.location_name)
             self.db.commit()
+            
+            from ..utils.autocomplete import autocomplete_index
+            autocomplete_index.upsert_provider(new_user.id, new_user.name, provider.bio, provider.location_name)
+        
+        # A replica may not have the new row yet
+        mark_user_write(new_user.id)
         
         access_token = create_access_token({
             "user_id": new_user.id,
@@ -0,0 +1,132 @@
+"""
+Booking State Machine Stress Test
+Races conflicting transitions (accept, reject, provider cancel, customer
+cancel) on the same bookings from many threads and checks that every
+booking ends in exactly the state implied by the transitions that won.
+
+Run with: python -m backend.benchmarks.booking_concurrency [bookings] [threads_per_booking]
+
+Needs DB_URL pointing at a disposable PostgreSQL database: it creates two
+users and the bookings it races on, and deletes them afterwards.
+"""
+import sys
+import random
+import threading
+import time
+from collections import Counter
+from itertools import permutations
+from ..Database_connection.db import SessionLocal, get_engine
+from ..Database_connection.schema import ensure_schema
+from ..auth.models import User
+from ..models.bookings import Booking, BookingStatus
+from ..utils.booking_state_machine import TRANSITIONS, apply_transition
+
+PROVIDER_PHONE = "7000000001"
+CUSTOMER_PHONE = "7000000002"
+
+ACTIONS = {
+    "accept": PROVIDER_PHONE,
+    "reject": PROVIDER_PHONE,
+    "provider_cancel": PROVIDER_PHONE,
+    "customer_cancel": CUSTOMER_PHONE,
+}
+
+
+def setup(bookings: int) -> list:
+    db = SessionLocal()
+    try:
+        for phone, role in ((PROVIDER_PHONE, "provider"), (CUSTOMER_PHONE, "customer")):
+            if not db.query(User).filter(User.phone_number == phone).first():
+                db.add(User(phone_number=phone, password_hash="-", name=f"stress-{role}", role=role))
+        rows = [
+            Booking(customer_phone=CUSTOMER_PHONE, provider_phone=PROVIDER_PHONE, service="Stress", status=BookingStatus.PENDING)
+            for _ in range(bookings)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+def teardown(booking_ids: list) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Booking).filter(Booking.id.in_(booking_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.phone_number.in_([PROVIDER_PHONE, CUSTOMER_PHONE])).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _valid_path(sequence, final_status) -> bool:
+    state = BookingStatus.PENDING
+    for action in sequence:
+        transition = TRANSITIONS[action]
+        if state not in transition.sources:
+            return False
+        state = transition.target
+    return state == final_status
+
+
+def main():
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads_per_booking = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    ensure_schema(get_engine())
+    booking_ids = setup(bookings)
+    wins = {booking_id: [] for booking_id in booking_ids}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads_per_booking)
+    errors = []
+
+    def race(booking_id: int, action: str):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            row = apply_transition(db, action, booking_id, ACTIONS[action])
+            db.commit()
+            if row is not None:
+                with lock:
+                    wins[booking_id].append(action)
+        except Exception as exc:
+            errors.append(repr(exc))
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    for booking_id in booking_ids:
+        threads = [
+            threading.Thread(target=race, args=(booking_id, random.choice(list(ACTIONS))))
+            for _ in range(threads_per_booking)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    # The winners of each booking, in some commit order, must form a valid
+    # path through the transition table ending in the stored status
+    db = SessionLocal()
+    final = {b.id: b.status for b in db.query(Booking).filter(Booking.id.in_(booking_ids))}
+    db.close()
+    violations = sum(
+        1 for booking_id, sequence in wins.items()
+        if not any(_valid_path(order, final[booking_id]) for order in permutations(sequence))
+    )
+
+    teardown(booking_ids)
+
+    attempts = bookings * threads_per_booking
+    winners = Counter(action for sequence in wins.values() for action in sequence)
+    print(f"{attempts} transition attempts on {bookings} bookings in {elapsed:.2f} s")
+    print(f"  successful transitions: {dict(winners)}")
+    print(f"  final states: {dict(Counter(status.value for status in final.values()))}")
+    print(f"  errors: {len(errors)}, invalid sequences or final states: {violations}")
+    if errors or violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
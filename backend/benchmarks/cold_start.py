@@ -0,0 +1,76 @@
+"""
+Cold-Start Benchmark
+Measures, in fresh interpreter processes, how long it takes to import the
+application and serve its first response (lifespan startup included).
+
+Run with: python -m backend.benchmarks.cold_start [runs]
+
+DB_URL is taken from the environment; when unset a throwaway SQLite file is
+used, since /health does not touch the database.
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Executed in each child process; timings start before the app import
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    response = client.get("/health")
+    first_response = time.perf_counter()
+assert response.status_code == 200, response.text
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (first_response - start) * 1000,
+}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    env = dict(os.environ)
+    env.setdefault("DB_URL", f"sqlite:///{tempfile.gettempdir()}/cold_start_benchmark.db")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env.setdefault("LOOP_MONITOR_ENABLED", "false")
+
+    results = [run_once(env) for _ in range(runs)]
+
+    print(f"Cold start over {runs} fresh processes (median / max)")
+    for key, label in (
+        ("import_ms", "import backend.main"),
+        ("first_response_ms", "import -> first response"),
+        ("process_ms", "process spawn -> exit"),
+    ):
+        values = [r[key] for r in results]
+        print(f"  {label:26s} {statistics.median(values):8.1f} ms / {max(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Dispatch Simulator
+Drives the dispatch ranking core (CandidateIndex) with synthetic providers
+and immediate-booking requests, and compares it with today's flow where the
+customer picks a single provider.
+
+Each provider is online with some probability and, when online, answers an
+offer after a random delay with its own accept probability. A request is
+filled when someone accepts within the offer timeout of a wave.
+
+Reports fill rate, simulated time to match and the CPU cost of ranking.
+Runs without a database.
+
+Run with: python -m backend.benchmarks.dispatch_simulator [providers] [requests]
+"""
+import sys
+import time
+import random
+import statistics
+from ..utils.dispatch import Candidate, CandidateIndex
+
+SERVICES = ["Plumber", "Electrician", "Carpenter", "Painter", "AC Repair", "Cleaner", "Mechanic", "Tutor"]
+LOCALITIES = [f"Area {number}" for number in range(40)]
+
+WAVE_SIZE = 3
+MAX_WAVES = 4
+OFFER_TIMEOUT = 60.0  # simulated seconds
+JOB_FINISH_PROBABILITY = 0.3  # per request, one random busy provider finishes a job
+
+
+class SimulatedProvider:
+    def __init__(self, rng: random.Random, user_id: int):
+        self.candidate = Candidate(
+            user_id=user_id,
+            phone=f"8{user_id:09d}",
+            name=f"Provider {user_id}",
+            service=rng.choice(SERVICES),
+            locality=rng.choice(LOCALITIES),
+            rating=rng.choice([None, rng.uniform(2.5, 5.0)]),
+            capacity=rng.choice([1, 2, 3, 3, 5])
+        )
+        self.online = rng.random() < 0.45
+        self.accept_probability = rng.uniform(0.2, 0.95)
+        self.mean_delay = rng.uniform(5, 90)
+
+    def respond(self, rng: random.Random):
+        """Seconds until this provider accepts an offer, or None if it never does"""
+        if not self.online or rng.random() > self.accept_probability:
+            return None
+        return rng.expovariate(1 / self.mean_delay)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    provider_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(43)
+
+    providers = {user_id: SimulatedProvider(rng, user_id) for user_id in range(1, provider_count + 1)}
+    started = time.perf_counter()
+    index = CandidateIndex(provider.candidate for provider in providers.values())
+    build_ms = (time.perf_counter() - started) * 1000
+
+    by_service_locality = {}
+    for provider in providers.values():
+        key = (provider.candidate.service, provider.candidate.locality)
+        by_service_locality.setdefault(key, []).append(provider)
+
+    baseline_filled, baseline_times = 0, []
+    dispatch_filled, dispatch_times, offers_sent = 0, [], 0
+    rank_us = []
+    busy = []
+
+    for _ in range(request_count):
+        service, locality = rng.choice(SERVICES), rng.choice(LOCALITIES)
+
+        # Baseline: the customer picks one provider of the service in their area
+        # (any area if none), and waits for that provider alone
+        pool = by_service_locality.get((service.lower(), locality.lower())) or [
+            provider for provider in providers.values() if provider.candidate.service == service.lower()
+        ][:50]
+        chosen = rng.choice(pool)
+        delay = chosen.respond(rng)
+        if delay is not None and delay <= OFFER_TIMEOUT * MAX_WAVES:
+            baseline_filled += 1
+            baseline_times.append(delay)
+
+        # Dispatch: waves of the best-ranked providers, first acceptance wins
+        offered = set()
+        for wave in range(MAX_WAVES):
+            tick = time.perf_counter()
+            ranked = index.rank(service, locality, WAVE_SIZE, exclude=offered)
+            rank_us.append((time.perf_counter() - tick) * 1e6)
+            if not ranked:
+                break
+            ids = [candidate.user_id for _, candidate in ranked]
+            offered.update(ids)
+            index.record_offers(ids)
+            offers_sent += len(ids)
+
+            answers = [
+                (delay, user_id)
+                for user_id in ids
+                for delay in [providers[user_id].respond(rng)]
+                if delay is not None and delay <= OFFER_TIMEOUT
+            ]
+            if answers:
+                delay, winner = min(answers)
+                index.record_claim(winner)
+                busy.append(winner)
+                dispatch_filled += 1
+                dispatch_times.append(wave * OFFER_TIMEOUT + delay)
+                break
+
+        # Jobs finish over time, freeing providers
+        if busy and rng.random() < JOB_FINISH_PROBABILITY:
+            finished = busy.pop(rng.randrange(len(busy)))
+            index.get(finished).active_jobs -= 1
+
+    print(f"{provider_count} providers, {request_count} immediate requests")
+    print(f"  index build: {build_ms:.1f} ms")
+    print(f"  rank per wave: p50 {percentile(rank_us, 0.5):.0f} us, p99 {percentile(rank_us, 0.99):.0f} us")
+    print(
+        f"  customer-picked provider: fill rate {baseline_filled / request_count:.1%}, "
+        f"time to match p50 {percentile(baseline_times, 0.5):.0f} s, p95 {percentile(baseline_times, 0.95):.0f} s"
+    )
+    print(
+        f"  dispatch ({WAVE_SIZE} per wave, {MAX_WAVES} waves): fill rate {dispatch_filled / request_count:.1%}, "
+        f"time to match p50 {percentile(dispatch_times, 0.5):.0f} s, p95 {percentile(dispatch_times, 0.95):.0f} s, "
+        f"mean {statistics.mean(dispatch_times) if dispatch_times else float('nan'):.0f} s"
+    )
+    print(f"  offers per request: {offers_sent / request_count:.2f}")
+
+
+if __name__ == "__main__":
+    main()
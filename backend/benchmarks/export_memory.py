@@ -0,0 +1,108 @@
+"""
+Export Memory Benchmark
+Seeds a provider with many bookings, then compares the streaming export
+(server-side cursor, chunked encoding) with loading every row first, as the
+dashboard list endpoints do. Reports Python heap peak (tracemalloc) and
+throughput for each.
+
+Run with: python -m backend.benchmarks.export_memory [bookings]
+
+Needs DB_URL pointing at a disposable PostgreSQL database: it creates two
+users and their bookings, and deletes them afterwards.
+"""
+import sys
+import time
+import tracemalloc
+from sqlalchemy import insert
+from ..Database_connection.db import SessionLocal, get_engine
+from ..Database_connection.schema import ensure_schema
+from ..auth.models import User
+from ..models.bookings import Booking, BookingStatus
+from ..routes.exports import bookings_statement, stream_export
+from ..utils.fast_json import dumps
+
+PROVIDER_PHONE = "7100000001"
+CUSTOMER_PHONE = "7100000002"
+INSERT_BATCH = 5000
+
+
+def setup(bookings: int) -> User:
+    db = SessionLocal()
+    try:
+        for phone, role in ((PROVIDER_PHONE, "provider"), (CUSTOMER_PHONE, "customer")):
+            if not db.query(User).filter(User.phone_number == phone).first():
+                db.add(User(phone_number=phone, password_hash="-", name=f"export-{role}", role=role))
+        db.commit()
+        statuses = list(BookingStatus)
+        for start in range(0, bookings, INSERT_BATCH):
+            db.execute(insert(Booking), [
+                {
+                    "customer_phone": CUSTOMER_PHONE,
+                    "provider_phone": PROVIDER_PHONE,
+                    "service": "Plumber",
+                    "description": f"Export benchmark booking {number} " + "x" * 80,
+                    "location": "Pune",
+                    "status": statuses[number % len(statuses)],
+                    "booking_type": "immediate",
+                }
+                for number in range(start, min(start + INSERT_BATCH, bookings))
+            ])
+            db.commit()
+        provider = db.query(User).filter(User.phone_number == PROVIDER_PHONE).one()
+        db.expunge(provider)
+        return provider
+    finally:
+        db.close()
+
+
+def teardown() -> None:
+    db = SessionLocal()
+    try:
+        db.query(Booking).filter(Booking.provider_phone == PROVIDER_PHONE).delete(synchronize_session=False)
+        db.query(User).filter(User.phone_number.in_([PROVIDER_PHONE, CUSTOMER_PHONE])).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(label: str, produce) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    total_bytes = produce()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} {total_bytes / 1e6:8.1f} MB out in {elapsed:6.2f} s, heap peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    ensure_schema(get_engine())
+    teardown()
+    provider = setup(bookings)
+    statement = bookings_statement(provider)
+    try:
+        print(f"Exporting {bookings} bookings")
+        for export_format in ("ndjson", "csv"):
+            measure(
+                f"streaming {export_format}",
+                lambda: sum(len(chunk) for chunk in stream_export(statement, export_format))
+            )
+
+        def materialized() -> int:
+            db = SessionLocal()
+            try:
+                rows = db.execute(statement).all()
+                columns = list(statement.selected_columns.keys())
+                return len(b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows))
+            finally:
+                db.close()
+
+        measure("load all, then encode", materialized)
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Fuzzy Search Benchmark
+Builds the typo-tolerant segment index over a synthetic vocabulary of
+syllable-built words (like the names, localities and services it holds in
+production), then times lookups of misspelled vocabulary words: one typo in
+words of 4-7 letters, two in longer ones. A linear scan with the same
+Levenshtein runs on a few queries for comparison, and a sample of lookups
+(asking for every term within reach) is checked against it.
+
+Run with: python -m backend.benchmarks.fuzzy_search [terms] [queries]
+
+Needs no database.
+"""
+import random
+import resource
+import statistics
+import string
+import sys
+import time
+from ..utils.fuzzy_search import SegmentIndex, _pattern_masks, edit_distance, max_typos
+
+SEED = 50
+ONSETS = ["", "b", "ch", "d", "g", "h", "j", "k", "l", "m", "n", "p", "r", "s", "sh", "t", "v", "y", "pr", "tr", "kr"]
+VOWELS = ["a", "e", "i", "o", "u", "ai", "au"]
+CODAS = ["", "", "", "n", "r", "l", "m", "s", "t"]
+SCAN_QUERIES = 5
+CHECKED_QUERIES = 20
+
+
+def vocabulary(size: int, rnd: random.Random) -> list:
+    terms = set()
+    while len(terms) < size:
+        syllables = rnd.randint(2, 5)
+        word = "".join(rnd.choice(ONSETS) + rnd.choice(VOWELS) + rnd.choice(CODAS) for _ in range(syllables))
+        if 4 <= len(word) <= 16:
+            terms.add(word)
+    return list(terms)
+
+
+def misspell(word: str, rnd: random.Random) -> str:
+    letters = list(word)
+    for _ in range(rnd.randint(1, max_typos(len(word)))):
+        position = rnd.randrange(len(letters))
+        edit = rnd.randrange(3)
+        if edit == 0:
+            letters.insert(position, rnd.choice(string.ascii_lowercase))
+        elif edit == 1 and len(letters) > 4:
+            del letters[position]
+        else:
+            letters[position] = rnd.choice(string.ascii_lowercase)
+    return "".join(letters)
+
+
+def linear_scan(terms: list, word: str) -> list:
+    tau = max_typos(len(word))
+    masks = _pattern_masks(word)
+    found = []
+    for term in terms:
+        if abs(len(term) - len(word)) <= tau:
+            distance = edit_distance(word, term, masks)
+            if distance <= tau:
+                found.append((distance, term))
+    return sorted(found)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rnd = random.Random(SEED)
+
+    terms = vocabulary(size, rnd)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index = SegmentIndex(terms)
+    build_seconds = time.perf_counter() - started
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    print(f"Indexed {len(index)} terms in {build_seconds:.1f} s (+{rss_growth:.0f} MB RSS)")
+
+    queries = [misspell(rnd.choice(terms), rnd) for _ in range(query_count)]
+    timings = []
+    hits = 0
+    for word in queries:
+        started = time.perf_counter()
+        corrections = index.lookup(word)
+        timings.append((time.perf_counter() - started) * 1000)
+        hits += bool(corrections)
+    print(
+        f"  segment index   {query_count} lookups: p50 {percentile(timings, 0.5):.2f} ms, "
+        f"p95 {percentile(timings, 0.95):.2f} ms, p99 {percentile(timings, 0.99):.2f} ms, "
+        f"max {max(timings):.2f} ms, mean {statistics.mean(timings):.2f} ms; {hits} with corrections"
+    )
+
+    timings = []
+    for word in queries[:SCAN_QUERIES]:
+        started = time.perf_counter()
+        linear_scan(terms, word)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"  linear scan     {SCAN_QUERIES} lookups: mean {statistics.mean(timings):.0f} ms")
+
+    # Every term within reach, not just the closest few, must come back
+    for word in queries[:CHECKED_QUERIES]:
+        assert index.lookup(word, limit=len(terms)) == linear_scan(terms, word), word
+    print(f"  {CHECKED_QUERIES} lookups match the linear scan")
+
+
+if __name__ == "__main__":
+    main()
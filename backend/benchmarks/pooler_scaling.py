@@ -0,0 +1,101 @@
+"""
+Pooler Scaling Benchmark
+Simulates hundreds of app workers, each with its own engine and pool, and
+compares connecting straight to Postgres with going through a
+transaction-mode pooler (the stand-in from standin_pooler.py).
+
+Run with: python -m backend.benchmarks.pooler_scaling UPSTREAM_URL [workers] [transactions_per_worker]
+
+UPSTREAM_URL must accept trust authentication (a local test server). In
+direct mode every worker holds its own server connection, so past the
+server's max_connections workers start failing with "too many clients";
+in pooled mode the server only ever sees `server_pool_size` connections.
+"""
+import sys
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit, urlunsplit
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from ..Database_connection.db import create_database_engine
+from .standin_pooler import StandInPooler
+
+POOLER_PORT = 6439
+SERVER_POOL_SIZE = 20
+
+
+def run_workers(url: str, mode: str, workers: int, transactions: int) -> dict:
+    """Start `workers` threads that each open an engine and run short transactions"""
+    errors = []
+    barrier = threading.Barrier(workers)
+
+    def worker():
+        engine = create_database_engine(url, mode)
+        Session = sessionmaker(bind=engine)
+        try:
+            # Keep a connection open (idle, outside a transaction) until every
+            # worker is connected, like long-running workers with a warm pool
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.commit()
+                barrier.wait(timeout=60)
+            for i in range(transactions):
+                with Session() as session:
+                    session.execute(text("SELECT pg_sleep(0.002)"))
+                    session.execute(text("SELECT :i"), {"i": i})
+                    session.commit()
+        except Exception as exc:
+            lines = str(exc).strip().splitlines()
+            errors.append(f"{type(exc).__name__}: {lines[0] if lines else ''}")
+            barrier.abort()
+        finally:
+            engine.dispose()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "errors": errors, "transactions": (workers - len(errors)) * transactions}
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    upstream_url = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    transactions = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    # Run the pooler on its own event loop thread
+    loop = asyncio.new_event_loop()
+    pooler = StandInPooler(upstream_url, server_pool_size=SERVER_POOL_SIZE, listen_port=POOLER_PORT)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(pooler.start(), loop).result()
+
+    parts = urlsplit(upstream_url)
+    netloc = parts.netloc.rsplit("@", 1)
+    host = f"127.0.0.1:{POOLER_PORT}"
+    pooled_url = urlunsplit(parts._replace(netloc=f"{netloc[0]}@{host}" if len(netloc) == 2 else host))
+
+    print(f"{workers} workers x {transactions} transactions")
+    for label, url, mode in (
+        ("direct", upstream_url, "direct"),
+        ("pooled", pooled_url, "pooled"),
+    ):
+        result = run_workers(url, mode, workers, transactions)
+        print(f"  {label:7s} {result['transactions']:6d} tx in {result['elapsed']:6.2f} s, {len(result['errors'])} failed workers")
+        if result["errors"]:
+            print(f"          first error: {result['errors'][0]}")
+    print(
+        f"  pooler: {pooler.clients_peak} peak client connections -> "
+        f"{pooler.servers_opened} server connections opened "
+        f"(peak {pooler.servers_busy_peak} busy), {pooler.transactions} transactions"
+    )
+    asyncio.run_coroutine_threadsafe(pooler.stop(), loop).result()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Replica Routing Check
+Runs the read routing against two local SQLite files, one standing in for
+the primary and one for the replica, each holding a row that names it, and
+asserts where get_read_db and open_read_session send each read:
+- reads go to the replica while it is caught up
+- a user who wrote reads from the primary for the read-your-writes window,
+  other users stay on the replica, and the user moves back once it expires
+- every read falls back to the primary while replica lag is forced past
+  DB_REPLICA_MAX_LAG_SECONDS
+
+Run with: python -m backend.benchmarks.replica_routing
+
+Needs no database server; exits non-zero on the first failed check.
+"""
+import os
+import tempfile
+import time
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, text
+from ..Database_connection import routing
+from ..Database_connection.db import dispose_engine, init_engine
+from ..Database_connection.routing import (
+    dispose_replica_engine,
+    get_read_db,
+    init_replica_engine,
+    mark_user_write,
+    open_read_session
+)
+from ..auth.security import create_access_token
+
+WRITER_ID = 1
+OTHER_ID = 2
+STICKY_SECONDS = 0.5
+
+
+def seed(url: str, name: str) -> None:
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE node (name TEXT)"))
+        connection.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+    engine.dispose()
+
+
+def served_by(user_id=None) -> str:
+    """Which database get_read_db hands out, for a caller with this user id"""
+    credentials = None
+    if user_id is not None:
+        token = create_access_token({"sub": f"user-{user_id}", "user_id": user_id})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    sessions = get_read_db(credentials)
+    db = next(sessions)
+    try:
+        return db.execute(text("SELECT name FROM node")).scalar()
+    finally:
+        sessions.close()
+
+
+def session_served_by(user_id=None) -> str:
+    db = open_read_session(user_id)
+    try:
+        return db.execute(text("SELECT name FROM node")).scalar()
+    finally:
+        db.close()
+
+
+def check(label: str, actual: str, expected: str) -> None:
+    assert actual == expected, f"{label}: read from {actual}, expected {expected}"
+    print(f"  ok  {label:<48} -> {actual}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        primary_url = f"sqlite:///{os.path.join(directory, 'primary.db')}"
+        replica_url = f"sqlite:///{os.path.join(directory, 'replica.db')}"
+        seed(primary_url, "primary")
+        seed(replica_url, "replica")
+
+        init_engine(primary_url)
+        init_replica_engine(replica_url)
+        router = routing._router
+        routing.DB_READ_YOUR_WRITES_SECONDS = STICKY_SECONDS
+        try:
+            print("Replica caught up")
+            check("anonymous read", served_by(), "replica")
+            check("signed-in read", served_by(WRITER_ID), "replica")
+            check("open_read_session", session_served_by(WRITER_ID), "replica")
+
+            print("After a write")
+            mark_user_write(WRITER_ID)
+            check("writer's read", served_by(WRITER_ID), "primary")
+            check("writer's open_read_session", session_served_by(WRITER_ID), "primary")
+            check("another user's read", served_by(OTHER_ID), "replica")
+            time.sleep(STICKY_SECONDS + 0.1)
+            check("writer's read after the window", served_by(WRITER_ID), "replica")
+
+            print("Replica lagging")
+            router._measure_lag = lambda: routing.DB_REPLICA_MAX_LAG_SECONDS + 60
+            router._lag_checked_at = 0.0
+            check("anonymous read", served_by(), "primary")
+            check("signed-in read", served_by(OTHER_ID), "primary")
+            check("open_read_session", session_served_by(OTHER_ID), "primary")
+
+            print("Replica caught up again")
+            router._measure_lag = lambda: 0.0
+            router._lag_checked_at = 0.0
+            check("anonymous read", served_by(), "replica")
+        finally:
+            dispose_replica_engine()
+            dispose_engine()
+    print("All routing checks passed")
+
+
+if __name__ == "__main__":
+    main()
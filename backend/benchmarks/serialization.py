@@ -0,0 +1,92 @@
+"""
+Serialization Benchmark
+Compares CPU time per request for a 1,000-item BookingResponse list:
+
+- validated: build each item as a Pydantic model, re-validate the list
+  against the response_model, then encode with the standard library
+  (what FastAPI does for a route returning models)
+- fast: build plain dicts from trusted rows and render with FastJSONResponse
+
+Items use the route's own BookingResponse model, and the rows must carry
+exactly its fields, so the benchmark follows the real payload.
+
+Run with: python -m backend.benchmarks.serialization
+"""
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+from pydantic import TypeAdapter
+from backend.routes.dashboard import BookingResponse
+from backend.utils.fast_json import FastJSONResponse, orjson
+
+ITEMS = 1000
+ROUNDS = 50
+
+
+def make_rows(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    slot = datetime(2030, 1, 1, 4, 30, tzinfo=timezone.utc)  # 10:00 AM IST
+    return [
+        {
+            "id": i,
+            "customer_phone": f"98{i:08d}",
+            "customer_name": f"Customer {i}",
+            "provider_phone": f"97{i:08d}",
+            "provider_name": f"Provider {i}",
+            "service": "Plumber",
+            "description": "Scheduled for 2030-01-01 at 10:00 AM. Kitchen sink is leaking",
+            "location": "Location not specified",
+            "status": "pending",
+            "booking_type": "scheduled",
+            "scheduled_date": "2030-01-01",
+            "scheduled_time": "10:00 AM",
+            "scheduled_start": slot,
+            "scheduled_end": slot + timedelta(hours=1),
+            "one_time_code": "123456",
+            "acceptance_code": None,
+            "completion_code": None,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def validated_path(rows: List[dict], adapter: TypeAdapter) -> bytes:
+    items = [BookingResponse(**row) for row in rows]
+    validated = adapter.validate_python(items, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(rows: List[dict]) -> bytes:
+    payload = [dict(row) for row in rows]
+    return FastJSONResponse(payload).body
+
+
+def cpu_ms_per_call(fn, *args) -> float:
+    fn(*args)  # warm up
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        fn(*args)
+    return (time.process_time() - start) * 1000 / ROUNDS
+
+
+def main():
+    rows = make_rows(ITEMS)
+    differ = set(BookingResponse.model_fields) ^ set(rows[0])
+    assert not differ, f"rows and BookingResponse differ in {sorted(differ)}"
+    adapter = TypeAdapter(List[BookingResponse])
+
+    validated_ms = cpu_ms_per_call(validated_path, rows, adapter)
+    fast_ms = cpu_ms_per_call(fast_path, rows)
+
+    print(f"Encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{ITEMS}-item list, {ROUNDS} rounds")
+    print(f"  validated models + json: {validated_ms:8.2f} ms CPU/request")
+    print(f"  trusted dicts + fast:    {fast_ms:8.2f} ms CPU/request")
+    print(f"  saved:                   {validated_ms - fast_ms:8.2f} ms CPU/request ({validated_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
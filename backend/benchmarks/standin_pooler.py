@@ -0,0 +1,209 @@
+"""
+Stand-in Transaction-Mode Pooler
+A minimal PgBouncer-like proxy for local testing of DB_MODE=pooled.
+
+Clients authenticate against the pooler itself (no password check); each
+transaction borrows one of at most `server_pool_size` upstream connections
+and returns it as soon as the server reports ReadyForQuery with status idle,
+exactly like PgBouncer's pool_mode=transaction. Only plain TCP and trust
+authentication to the upstream server are supported.
+
+Run with: python -m backend.benchmarks.standin_pooler UPSTREAM_URL [listen_port] [server_pool_size]
+"""
+import sys
+import struct
+import asyncio
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+SSL_REQUEST_CODE = 80877103
+GSSENC_REQUEST_CODE = 80877104
+PROTOCOL_VERSION = 196608
+
+
+def _message(kind: bytes, payload: bytes = b"") -> bytes:
+    return kind + struct.pack("!I", len(payload) + 4) + payload
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Tuple[bytes, bytes]:
+    header = await reader.readexactly(5)
+    length = struct.unpack("!I", header[1:])[0]
+    return header[:1], await reader.readexactly(length - 4)
+
+
+class ServerConnection:
+    """One upstream connection, opened with the pooler's own credentials"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.parameters: List[bytes] = []
+
+    @classmethod
+    async def open(cls, host: str, port: int, user: str, database: str) -> "ServerConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        server = cls(reader, writer)
+        params = b"user\0" + user.encode() + b"\0database\0" + database.encode() + b"\0\0"
+        body = struct.pack("!I", PROTOCOL_VERSION) + params
+        writer.write(struct.pack("!I", len(body) + 4) + body)
+        await writer.drain()
+
+        while True:
+            kind, payload = await _read_message(reader)
+            if kind == b"R" and struct.unpack("!I", payload[:4])[0] != 0:
+                raise RuntimeError("stand-in pooler only supports trust authentication upstream")
+            if kind == b"E":
+                raise RuntimeError(f"upstream refused connection: {payload!r}")
+            if kind == b"S":
+                server.parameters.append(_message(kind, payload))
+            if kind == b"Z":
+                return server
+
+    def close(self) -> None:
+        self.writer.write(_message(b"X"))
+        self.writer.close()
+
+
+class StandInPooler:
+    def __init__(self, upstream_url: str, server_pool_size: int = 20, listen_host: str = "127.0.0.1", listen_port: int = 6432):
+        url = urlsplit(upstream_url)
+        self.upstream = (url.hostname or "127.0.0.1", url.port or 5432, url.username or "postgres", url.path.lstrip("/") or "postgres")
+        self.server_pool_size = server_pool_size
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+
+        self._idle: List[ServerConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._parameters: List[bytes] = []
+        self._server: Optional[asyncio.base_events.Server] = None
+
+        # Counters for the scaling benchmark
+        self.clients_active = 0
+        self.clients_peak = 0
+        self.clients_total = 0
+        self.servers_opened = 0
+        self.servers_busy = 0
+        self.servers_busy_peak = 0
+        self.transactions = 0
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.server_pool_size)
+        # Open one upstream connection up front to learn the ParameterStatus set
+        first = await ServerConnection.open(*self.upstream)
+        self.servers_opened += 1
+        self._parameters = first.parameters
+        self._idle.append(first)
+        self._server = await asyncio.start_server(self._serve_client, self.listen_host, self.listen_port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for server in self._idle:
+            server.close()
+        self._idle.clear()
+
+    # ---------- upstream pool ----------
+
+    async def _acquire(self) -> ServerConnection:
+        await self._slots.acquire()
+        self.servers_busy += 1
+        self.servers_busy_peak = max(self.servers_busy_peak, self.servers_busy)
+        if self._idle:
+            return self._idle.pop()
+        try:
+            server = await ServerConnection.open(*self.upstream)
+        except Exception:
+            self._release(None)
+            raise
+        self.servers_opened += 1
+        return server
+
+    def _release(self, server: Optional[ServerConnection]) -> None:
+        if server is not None:
+            self._idle.append(server)
+        self.servers_busy -= 1
+        self._slots.release()
+
+    # ---------- client side ----------
+
+    async def _startup(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            length = struct.unpack("!I", await reader.readexactly(4))[0]
+            body = await reader.readexactly(length - 4)
+            code = struct.unpack("!I", body[:4])[0]
+            if code in (SSL_REQUEST_CODE, GSSENC_REQUEST_CODE):
+                writer.write(b"N")
+                await writer.drain()
+                continue
+            break
+
+        # Authenticate locally and replay the upstream's parameters
+        writer.write(_message(b"R", struct.pack("!I", 0)))
+        writer.write(b"".join(self._parameters))
+        writer.write(_message(b"K", struct.pack("!II", self.clients_total, 0)))
+        writer.write(_message(b"Z", b"I"))
+        await writer.drain()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.clients_total += 1
+        self.clients_active += 1
+        self.clients_peak = max(self.clients_peak, self.clients_active)
+        server: Optional[ServerConnection] = None
+        try:
+            await self._startup(reader, writer)
+            while True:
+                kind, payload = await _read_message(reader)
+                if kind == b"X":
+                    break
+                if server is None:
+                    server = await self._acquire()
+                server.writer.write(_message(kind, payload))
+                if kind not in (b"Q", b"S"):
+                    continue
+
+                # Relay the reply up to ReadyForQuery; an idle status means the
+                # transaction is over and the upstream connection can be reused
+                await server.writer.drain()
+                while True:
+                    reply_kind, reply = await _read_message(server.reader)
+                    writer.write(_message(reply_kind, reply))
+                    if reply_kind == b"Z":
+                        break
+                await writer.drain()
+                if reply == b"I":
+                    self.transactions += 1
+                    self._release(server)
+                    server = None
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if server is not None:
+                # Client left mid-transaction: discard the upstream session
+                server.writer.close()
+                self._release(None)
+            self.clients_active -= 1
+            writer.close()
+
+
+async def _main(upstream_url: str, port: int, pool_size: int) -> None:
+    pooler = StandInPooler(upstream_url, server_pool_size=pool_size, listen_port=port)
+    await pooler.start()
+    print(f"Stand-in pooler on 127.0.0.1:{port} -> {upstream_url} ({pool_size} server connections)")
+    while True:
+        await asyncio.sleep(5)
+        print(
+            f"clients active={pooler.clients_active} peak={pooler.clients_peak} "
+            f"servers opened={pooler.servers_opened} busy_peak={pooler.servers_busy_peak} "
+            f"transactions={pooler.transactions}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    asyncio.run(_main(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 6432,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 20,
+    ))
@@ -0,0 +1,145 @@
+"""
+Application Configuration
+Loads backend/.env once and exposes every setting as a module constant
+"""
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables from backend/.env (only place this happens)
+env_path = Path(__file__).parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+
+def _flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+# Database
+DATABASE_URL = os.getenv("DB_URL")
+DB_MODE = os.getenv("DB_MODE", "auto").lower()  # direct, pooled (transaction-mode PgBouncer/Neon pooler) or auto
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_HEALTHCHECK_INTERVAL_SECONDS = float(os.getenv("DB_HEALTHCHECK_INTERVAL_SECONDS", "30"))
+DB_IDLE_RELEASE_SECONDS = float(os.getenv("DB_IDLE_RELEASE_SECONDS", "240"))  # below Neon's 5 min suspend
+DB_WARMUP_RETRIES = int(os.getenv("DB_WARMUP_RETRIES", "5"))
+DB_WARMUP_BACKOFF_MS = float(os.getenv("DB_WARMUP_BACKOFF_MS", "250"))
+DB_WARMUP_COOLDOWN_SECONDS = float(os.getenv("DB_WARMUP_COOLDOWN_SECONDS", "10"))  # requests skip the warm-up this long after one failed
+
+# Read replica (unset: every read goes to the primary)
+DB_REPLICA_URL = os.getenv("DB_REPLICA_URL")
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "2"))
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+DB_ENSURE_SCHEMA = _flag("DB_ENSURE_SCHEMA", "true")  # create missing tables/columns at startup
+
+# Authentication
+SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret")
+
+# Twilio (SMS + WhatsApp)
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")  # Twilio Sandbox
+WEBSITE_URL = os.getenv("WEBSITE_URL", "http://localhost:5175")  # Your website URL
+
+# OTP
+MSG91_AUTH_KEY = os.getenv("MSG91_AUTH_KEY")
+MSG91_SENDER_ID = os.getenv("MSG91_SENDER_ID", "MSGIND")
+MSG91_DLT_TEMPLATE_ID = os.getenv("MSG91_DLT_TEMPLATE_ID")
+OTP_PROVIDER = os.getenv("OTP_PROVIDER", "MSG91")  # MSG91 or TWILIO
+OTP_LENGTH = int(os.getenv("OTP_LENGTH", "6"))
+OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "5"))
+MAX_OTP_ATTEMPTS = int(os.getenv("MAX_OTP_ATTEMPTS", "3"))
+DEVELOPMENT_MODE = _flag("DEVELOPMENT_MODE")
+
+# Idempotency-Key support for booking mutations
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "600"))
+
+# Booking archive (finished bookings move from `bookings` to `booking_history`)
+ARCHIVE_ENABLED = _flag("ARCHIVE_ENABLED", "true")
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# Scheduling (customer-facing dates/times are local to SCHEDULE_TIMEZONE)
+SCHEDULE_TIMEZONE = os.getenv("SCHEDULE_TIMEZONE", "Asia/Kolkata")
+BOOKING_SLOT_MINUTES = int(os.getenv("BOOKING_SLOT_MINUTES", "60"))
+DEFAULT_WORKING_HOURS = os.getenv("DEFAULT_WORKING_HOURS", "09:00-19:00")  # providers without an availability calendar
+FREE_SLOTS_MAX_DAYS = int(os.getenv("FREE_SLOTS_MAX_DAYS", "14"))
+
+# Provider reminders for upcoming scheduled bookings
+REMINDERS_ENABLED = _flag("REMINDERS_ENABLED", "true")
+REMINDER_LEAD_MINUTES = float(os.getenv("REMINDER_LEAD_MINUTES", "60"))  # how long before the slot
+REMINDER_HORIZON_HOURS = float(os.getenv("REMINDER_HORIZON_HOURS", "6"))  # how far ahead is kept in memory
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "50"))
+
+# Provider capacity (accepted jobs a provider can hold at once)
+PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS = int(os.getenv("PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS", "3"))
+
+# WhatsApp notification coalescing (per-recipient digests of non-urgent notifications)
+NOTIFY_COALESCE_ENABLED = _flag("NOTIFY_COALESCE_ENABLED", "true")
+NOTIFY_COALESCE_WINDOW_SECONDS = float(os.getenv("NOTIFY_COALESCE_WINDOW_SECONDS", "60"))  # longest a notification is held
+NOTIFY_COALESCE_MAX_BATCH = int(os.getenv("NOTIFY_COALESCE_MAX_BATCH", "20"))  # flush early once this many are held
+
+# Dispatch of immediate bookings placed without choosing a provider
+DISPATCH_ENABLED = _flag("DISPATCH_ENABLED", "true")
+DISPATCH_WAVE_SIZE = int(os.getenv("DISPATCH_WAVE_SIZE", "3"))  # providers offered the job at once
+DISPATCH_MAX_WAVES = int(os.getenv("DISPATCH_MAX_WAVES", "4"))
+DISPATCH_OFFER_TIMEOUT_SECONDS = float(os.getenv("DISPATCH_OFFER_TIMEOUT_SECONDS", "60"))
+DISPATCH_INDEX_REFRESH_SECONDS = float(os.getenv("DISPATCH_INDEX_REFRESH_SECONDS", "60"))
+DISPATCH_STATS_DAYS = int(os.getenv("DISPATCH_STATS_DAYS", "30"))  # window for offer responsiveness
+DISPATCH_OWNER_LEASE_SECONDS = float(os.getenv("DISPATCH_OWNER_LEASE_SECONDS", "180"))  # a worker's hold on a booking it dispatches, renewed while it waits
+DISPATCH_SWEEP_SECONDS = float(os.getenv("DISPATCH_SWEEP_SECONDS", "60"))  # how often a worker picks up bookings whose lease ran out
+
+# Bulk provider import (python -m backend.utils.provider_import)
+PROVIDER_IMPORT_BATCH_SIZE = int(os.getenv("PROVIDER_IMPORT_BATCH_SIZE", "1000"))  # rows per transaction
+PROVIDER_IMPORT_WORKERS = int(os.getenv("PROVIDER_IMPORT_WORKERS", "0"))  # bcrypt processes; 0 = one per CPU
+
+# Streaming exports of booking and review history
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))  # rows fetched and encoded per chunk
+
+# Search box autocomplete (in-memory index of services, localities and provider names)
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "300"))  # full rebuild; 0 = startup only
+AUTOCOMPLETE_SCAN_LIMIT = int(os.getenv("AUTOCOMPLETE_SCAN_LIMIT", "512"))  # provider names ranked per lookup
+
+# Typo-tolerant provider search (edit-distance index of search terms, used when nothing matches exactly)
+FUZZY_SEARCH_ENABLED = _flag("FUZZY_SEARCH_ENABLED", "true")
+FUZZY_MAX_CORRECTIONS = int(os.getenv("FUZZY_MAX_CORRECTIONS", "5"))  # closest spellings tried per query word
+FUZZY_REFRESH_SECONDS = float(os.getenv("FUZZY_REFRESH_SECONDS", "300"))  # full rebuild; 0 = startup only
+
+# Rate limiting (token buckets; rates in requests/second) and load shedding
+RATE_LIMIT_ENABLED = _flag("RATE_LIMIT_ENABLED", "true")
+RATE_LIMIT_USER_RATE = float(os.getenv("RATE_LIMIT_USER_RATE", "10"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "40"))
+RATE_LIMIT_IP_RATE = float(os.getenv("RATE_LIMIT_IP_RATE", "20"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "80"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")  # optional shared store across workers
+RATE_LIMIT_TRUST_FORWARDED = _flag("RATE_LIMIT_TRUST_FORWARDED")  # behind a proxy setting X-Forwarded-For
+LOAD_SHED_POOL_WAIT_MS = float(os.getenv("LOAD_SHED_POOL_WAIT_MS", "250"))
+LOAD_SHED_MAX_CONCURRENCY = int(os.getenv("LOAD_SHED_MAX_CONCURRENCY", "32"))
+LOAD_SHED_RETRY_AFTER_SECONDS = int(os.getenv("LOAD_SHED_RETRY_AFTER_SECONDS", "2"))
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # e.g. "backend.routes.dashboard=DEBUG,backend.utils.otp_service=WARNING"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json or text
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+# Query instrumentation
+DEBUG_MODE = _flag("DEBUG")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SLOWEST_STATEMENTS_KEPT = int(os.getenv("SLOWEST_STATEMENTS_KEPT", "3"))
+
+# Event loop monitor
+LOOP_MONITOR_ENABLED = _flag("LOOP_MONITOR_ENABLED", "true")
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "250"))
+
+# Response compression
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
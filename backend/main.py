@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import routes
@@ -7,14 +8,85 @@ from .routes.providers import router as providers_router
 from .routes.customers import router as customers_router
 from .routes.otp import router as otp_router
 from .routes.dashboard import router as dashboard_router
+from .routes.exports import router as exports_router
 from .auth.routes import router as auth_router
+from .config import DEBUG_MODE, LOOP_MONITOR_ENABLED, DB_ENSURE_SCHEMA, ARCHIVE_ENABLED, REMINDERS_ENABLED, DISPATCH_ENABLED, FUZZY_SEARCH_ENABLED
+from .Database_connection.db import init_engine, get_engine, get_pool_manager, dispose_engine, is_pooled_mode
+from .Database_connection.routing import init_replica_engine, dispose_replica_engine
+from .Database_connection.schema import ensure_schema
+from .utils.structured_logging import configure_logging, shutdown_logging
+from .utils.metrics import metrics
+from .utils.loop_monitor import loop_monitor
+from .utils.compression import CompressionMiddleware
+from .utils.rate_limit import RateLimitMiddleware
+from .utils.booking_archive import booking_archiver
+from .utils.scheduling import backfill_schedule_timestamps
+from .utils.reminders import reminder_scheduler
+from .utils.dispatch import dispatch_engine
+from .utils.whatsapp_service import notification_coalescer
+from .utils.autocomplete import autocomplete_index
+from .utils.provider_search import backfill_provider_search
+from .utils.fuzzy_search import fuzzy_vocabulary
+from .utils.query_instrumentation import (
+    install_query_instrumentation,
+    begin_request_stats,
+    end_request_stats,
+    report_request_stats
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One-time startup: logging, engine registry, instrumentation, monitors
+    configure_logging()
+    install_query_instrumentation()
+    init_engine()
+    init_replica_engine()
+    pool_manager = get_pool_manager()
+    warmed = pool_manager.warm_up()
+    if DB_ENSURE_SCHEMA and warmed:
+        ensure_schema(get_engine())
+        backfill_schedule_timestamps(get_engine())
+        backfill_provider_search(get_engine())
+    pool_manager.start()
+    notification_coalescer.start()
+    autocomplete_index.start()
+    if FUZZY_SEARCH_ENABLED:
+        fuzzy_vocabulary.start()
+    if ARCHIVE_ENABLED:
+        booking_archiver.start()
+    if REMINDERS_ENABLED:
+        reminder_scheduler.start()
+    if DISPATCH_ENABLED:
+        await dispatch_engine.start()
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    
+    yield
+    
+    await loop_monitor.stop()
+    await reminder_scheduler.stop()
+    await dispatch_engine.stop()
+    await notification_coalescer.stop()
+    booking_archiver.stop()
+    autocomplete_index.stop()
+    fuzzy_vocabulary.stop()
+    dispose_replica_engine()
+    dispose_engine()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="Community Connection Platform API",
     description="API for local service trust platform with completion code verification",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Per-user/per-IP token buckets and DB-pressure load shedding (inside CORS,
+# so 429/503 responses still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173", "http://localhost:5175"],
@@ -23,6 +95,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip compression for large JSON payloads
+app.add_middleware(CompressionMiddleware)
+
+# Track per-request query counts, DB time and N+1 patterns
+@app.middleware("http")
+async def query_instrumentation_middleware(request: Request, call_next):
+    stats, token = begin_request_stats()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request_stats(token)
+    
+    report_request_stats(stats, request.method, request.url.path)
+    if DEBUG_MODE:
+        response.headers["Server-Timing"] = stats.server_timing()
+    return response
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(otp_router)
@@ -30,6 +119,7 @@ app.include_router(job_codes_router)
 app.include_router(providers_router)
 app.include_router(customers_router)
 app.include_router(dashboard_router)
+app.include_router(exports_router)
 
 @app.get("/")
 def root():
@@ -40,7 +130,16 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy", "database": "neon-postgresql"}
+    return {
+        "status": "healthy",
+        "database": "neon-postgresql",
+        "db_mode": "pooled" if is_pooled_mode() else "direct"
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    get_pool_manager().publish_stats()
+    return metrics.snapshot()
 
 if __name__ == "__main__":
     import uvicorn
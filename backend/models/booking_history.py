@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy.sql import func
+from backend.Database_connection.db import Base
+from backend.models.bookings import BookingStatus
+
+
+class BookingHistory(Base):
+    """Finished bookings moved out of the hot `bookings` table by the archiver"""
+    __tablename__ = "booking_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # original bookings.id
+    customer_phone = Column(String(15), nullable=False, index=True)
+    provider_phone = Column(String(15), nullable=False, index=True)
+    service = Column(String(100), nullable=False)
+    description = Column(Text)
+    location = Column(String(255))
+    status = Column(Enum(BookingStatus), nullable=False)
+    booking_type = Column(String(20), default="scheduled", nullable=False)
+    scheduled_date = Column(String(20), nullable=True)
+    scheduled_time = Column(String(20), nullable=True)
+    scheduled_start = Column(DateTime(timezone=True), nullable=True)
+    scheduled_end = Column(DateTime(timezone=True), nullable=True)
+    reminder_sent_at = Column(DateTime(timezone=True), nullable=True)
+    dispatch_owner = Column(String(64), nullable=True)
+    dispatch_lease_until = Column(DateTime(timezone=True), nullable=True)
+    one_time_code = Column(String(6), nullable=True)
+    acceptance_code = Column(String(6), nullable=True)
+    completion_code = Column(String(6), nullable=True)
+    created_at = Column(DateTime(timezone=True), index=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
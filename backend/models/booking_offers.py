@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from backend.Database_connection.db import Base
+
+
+class BookingOffer(Base):
+    """An immediate booking offered to one provider by the dispatch engine"""
+    __tablename__ = "booking_offers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, nullable=False, index=True)  # no FK: archived bookings leave the table
+    provider_id = Column(Integer, nullable=False)
+    provider_phone = Column(String(15), nullable=False)
+    wave = Column(Integer, nullable=False)
+    score = Column(Integer, nullable=True)  # ranking score x 1000, for tuning
+    status = Column(String(10), nullable=False, default="offered")  # offered, accepted, declined, expired
+    offered_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    responded_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('booking_id', 'provider_id', name='unique_booking_offer'),
+        # Open offers of a provider, and per-provider responsiveness stats
+        Index("ix_booking_offers_provider_status", "provider_id", "status"),
+    )
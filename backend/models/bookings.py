@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from sqlalchemy.sql import func
@@ -27,11 +27,23 @@ class Booking(Base):
     booking_type = Column(String(20), default="scheduled", nullable=False)  # 'immediate' or 'scheduled'
     scheduled_date = Column(String(20), nullable=True)  # Date for scheduled bookings
     scheduled_time = Column(String(20), nullable=True)  # Time for scheduled bookings
+    scheduled_start = Column(DateTime(timezone=True), nullable=True)  # Parsed slot start (UTC)
+    scheduled_end = Column(DateTime(timezone=True), nullable=True)  # Parsed slot end (UTC)
+    reminder_sent_at = Column(DateTime(timezone=True), nullable=True)  # Set once when the provider reminder is claimed
+    dispatch_owner = Column(String(64), nullable=True)  # Worker running the dispatch waves of an unassigned booking
+    dispatch_lease_until = Column(DateTime(timezone=True), nullable=True)  # Owner's hold, renewed every wave
     one_time_code = Column(String(6), nullable=True)  # 6-digit code for booking verification (deprecated)
     acceptance_code = Column(String(6), nullable=True)  # 6-digit code when provider accepts
     completion_code = Column(String(6), nullable=True)  # 6-digit code for review verification
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # "What does this provider have between X and Y" is an index range scan
+    __table_args__ = (
+        Index("ix_bookings_provider_schedule", "provider_phone", "scheduled_start"),
+        # Reminder loading only walks bookings that have not been reminded yet
+        Index("ix_bookings_reminder_due", "scheduled_start", postgresql_where=text("reminder_sent_at IS NULL")),
+    )
+
     # Relationships
     # customer = relationship("User", foreign_keys=[customer_phone], back_populates="customer_bookings")
     # provider = relationship("User", foreign_keys=[provider_phone], back_populates="provider_bookings")
@@ -1,9 +1,6 @@
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-from Database_connection.db import Base
+from ..Database_connection.db import Base
 
 class Customer(Base):
     __tablename__ = "customers"
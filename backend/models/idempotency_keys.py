@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from backend.Database_connection.db import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    endpoint = Column(String(50), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 of endpoint + request body
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is still running
+    response_json = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # A key is scoped to the user who sent it
+    __table_args__ = (
+        UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key'),
+    )
@@ -1,9 +1,6 @@
 from sqlalchemy import Column, String, DateTime, Boolean, Integer
 from sqlalchemy.sql import func
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-from Database_connection.db import Base
+from ..Database_connection.db import Base
 
 class OTPVerification(Base):
     __tablename__ = "otp_verifications"
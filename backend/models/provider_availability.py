@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Time, ForeignKey
+from backend.Database_connection.db import Base
+
+
+class ProviderAvailability(Base):
+    """
+    One weekly working window of a provider, in SCHEDULE_TIMEZONE local time.
+    A provider without any rows works DEFAULT_WORKING_HOURS every day.
+    """
+    __tablename__ = "provider_availability"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
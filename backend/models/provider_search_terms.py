@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
+from backend.Database_connection.db import Base
+
+
+class ProviderSearchTerm(Base):
+    """
+    One word of a provider's name, service or locality as script-neutral
+    search keys (see utils/transliteration.py). Rebuilt whenever the profile
+    changes; queries in Latin or Devanagari look words up here instead of
+    running ILIKE over the profile text.
+    """
+    __tablename__ = "provider_search_terms"
+
+    id = Column(Integer, primary_key=True)
+    provider_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    field = Column(String(10), nullable=False)  # 'name', 'service' or 'locality'
+    latin = Column(String(64), nullable=False)  # romanized, spelling variants folded
+    skeleton = Column(String(64), nullable=False)  # consonant skeleton
+
+    # Prefix lookups (LIKE 'key%') are index range scans on PostgreSQL; the
+    # trigram index for substring lookups is optional DDL in schema.py, as it
+    # needs the pg_trgm extension
+    __table_args__ = (
+        Index("ix_provider_search_terms_latin", "latin", "field", postgresql_ops={"latin": "text_pattern_ops"}),
+        Index("ix_provider_search_terms_skeleton", "skeleton", "field", postgresql_ops={"skeleton": "text_pattern_ops"}),
+    )
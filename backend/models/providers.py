@@ -1,10 +1,6 @@
 from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
-import sys
-from pathlib import Path
-# Add parent directory to path to match how it's done in routes
-sys.path.append(str(Path(__file__).parent.parent))
-from Database_connection.db import Base
+from ..Database_connection.db import Base
 
 class Provider(Base):
     __tablename__ = "providers"
@@ -17,6 +13,8 @@ class Provider(Base):
     average_rating = Column(Numeric(2, 1), default=0.0)
     jobs_completed = Column(Integer, default=0)
     is_verified = Column(Boolean, default=False)
+    max_concurrent_jobs = Column(Integer, nullable=True)  # NULL: PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS
+    active_jobs = Column(Integer, nullable=False, default=0, server_default="0")  # accepted, not yet completed/cancelled
     
     # Relationships
     job_codes = relationship("JobCode", back_populates="provider", cascade="all, delete-orphan")
\ No newline at end of file
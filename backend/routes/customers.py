@@ -1,16 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from ..Database_connection.db import get_db
+from ..Database_connection.routing import get_read_db, mark_user_write
 from ..models.customers import Customer
 from pydantic import BaseModel, Field
 from typing import Optional
-
-# Import auth dependency
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-from auth.routes import get_current_user
-from auth.models import User
+from ..auth.routes import get_current_user
+from ..auth.models import User
 
 router = APIRouter(prefix="/customers", tags=["Customers"])
 
@@ -76,6 +72,7 @@ def create_customer_profile(
     
     db.add(new_customer)
     db.commit()
+    mark_user_write(current_user.id)
     db.refresh(new_customer)
     
     return new_customer
@@ -108,6 +105,7 @@ def update_customer_profile(
         user.email_id = profile_data.email_id
     
     db.commit()
+    mark_user_write(current_user.id)
     db.refresh(user)
     
     # Return user data
@@ -154,7 +152,7 @@ def get_my_customer_profile(
 @router.get("/profile/{customer_id}", response_model=CustomerProfileResponse)
 def get_customer_profile_by_id(
     customer_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get a customer profile by customer ID (user_id).
@@ -193,5 +191,6 @@ def delete_customer_profile(
     
     db.delete(customer)
     db.commit()
+    mark_user_write(current_user.id)
     
     return None
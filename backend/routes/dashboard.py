@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case
 from backend.Database_connection.db import get_db
-from backend.auth.routes import get_current_user
+from backend.Database_connection.routing import get_read_db, mark_user_write, open_read_session
+from backend.auth.routes import get_current_user, get_current_user_for_read, get_token_payload
 from backend.models.bookings import Booking, BookingStatus
 from backend.models.reviews import Review
 from backend.models.saved_providers import SavedProvider
 from backend.models.providers import Provider
+from backend.models.customers import Customer
+from backend.models.booking_offers import BookingOffer
 from backend.auth.models import User
 from backend.utils.whatsapp_service import (
     notify_provider_new_booking,
@@ -16,12 +20,56 @@ from backend.utils.whatsapp_service import (
     notify_provider_booking_cancelled,
     notify_customer_job_cancelled
 )
-from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import logging
 import random
 import re
+from backend.config import (
+    LOG_DEBUG_SAMPLE_RATE,
+    FREE_SLOTS_MAX_DAYS,
+    DISPATCH_ENABLED,
+    PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS,
+    FUZZY_SEARCH_ENABLED
+)
+from backend.utils.fast_json import FastJSONResponse
+from backend.utils.idempotency import IdempotencyGuard, idempotency_guard
+from backend.utils.booking_state_machine import ProviderAtCapacity, apply_transition, apply_transition_batch
+from backend.utils.booking_archive import BookingWithHistory
+from backend.utils.reminders import reminder_scheduler
+from backend.utils.autocomplete import autocomplete_index
+from backend.utils.provider_search import (
+    ALL_FIELDS as SEARCH_ALL_FIELDS,
+    BIO as SEARCH_BIO,
+    LOCALITY as SEARCH_LOCALITY,
+    SERVICE as SEARCH_SERVICE,
+    fuzzy_match,
+    match_condition
+)
+from backend.utils.dispatch import (
+    UNASSIGNED_PROVIDER,
+    WORKER_ID,
+    dispatch_engine,
+    dispatch_lease,
+    open_offer_condition,
+    close_offers_after_claim
+)
+from backend.utils.scheduling import (
+    SCHEDULE_TZ,
+    SLOT_LENGTH,
+    parse_schedule,
+    format_slot,
+    lock_provider_schedule,
+    slot_taken,
+    load_weekly_windows,
+    load_busy_index,
+    free_slots
+)
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -78,12 +126,14 @@ class CustomerStats(BaseModel):
 
 
 class CreateBookingRequest(BaseModel):
-    provider_phone: str
+    provider_phone: Optional[str] = None  # required unless dispatch is set
     service: str
     booking_type: str  # 'immediate' or 'scheduled'
     scheduled_date: Optional[str] = None
     scheduled_time: Optional[str] = None
     description: Optional[str] = None
+    dispatch: bool = False  # immediate only: offer the job to the best nearby providers
+    location: Optional[str] = None  # customer's locality for dispatch (defaults to their profile)
 
 
 class VerifyCodeRequest(BaseModel):
@@ -96,6 +146,12 @@ class CompleteBookingRequest(BaseModel):
     completion_code: str
 
 
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    kind: str  # service, locality or provider
+    providers: int  # providers offering the service / in the locality / with the name
+
+
 class ProviderCardResponse(BaseModel):
     phone: str
     name: str
@@ -105,6 +161,7 @@ class ProviderCardResponse(BaseModel):
     location: Optional[str]
     reviews_count: int
     is_saved: bool
+    available: bool = True  # False while the provider is at max_concurrent_jobs
 
 
 class BookingResponse(BaseModel):
@@ -120,18 +177,64 @@ class BookingResponse(BaseModel):
     booking_type: Optional[str] = "immediate"
     scheduled_date: Optional[str] = None
     scheduled_time: Optional[str] = None
+    scheduled_start: Optional[datetime] = None
+    scheduled_end: Optional[datetime] = None
     one_time_code: Optional[str] = None
     acceptance_code: Optional[str] = None
     completion_code: Optional[str] = None
     created_at: datetime
 
 
+def _user_names(db: Session, phones: set) -> Dict[str, str]:
+    """Map phone number -> user name for all `phones` in one query"""
+    if not phones:
+        return {}
+    return dict(db.query(User.phone_number, User.name).filter(User.phone_number.in_(phones)).all())
+
+
+def _booking_payloads(db: Session, bookings: List[Booking], names: Optional[Dict[str, str]] = None) -> List[dict]:
+    """
+    Build BookingResponse-shaped dicts straight from trusted DB rows
+    
+    All customer and provider names are loaded in a single query (or taken
+    from `names`), and the dicts are serialized by FastJSONResponse without
+    re-validation.
+    """
+    if names is None:
+        phones = {b.customer_phone for b in bookings} | {b.provider_phone for b in bookings}
+        names = _user_names(db, phones)
+    
+    return [
+        {
+            "id": booking.id,
+            "customer_phone": booking.customer_phone,
+            "customer_name": names.get(booking.customer_phone, "Unknown"),
+            "provider_phone": booking.provider_phone,
+            "provider_name": names.get(booking.provider_phone, "Unknown"),
+            "service": booking.service,
+            "description": booking.description,
+            "location": booking.location,
+            "status": booking.status.value,
+            "booking_type": booking.booking_type or "immediate",
+            "scheduled_date": booking.scheduled_date,
+            "scheduled_time": booking.scheduled_time,
+            "scheduled_start": booking.scheduled_start,
+            "scheduled_end": booking.scheduled_end,
+            "one_time_code": booking.one_time_code,
+            "acceptance_code": booking.acceptance_code,
+            "completion_code": booking.completion_code,
+            "created_at": booking.created_at
+        }
+        for booking in bookings
+    ]
+
+
 # ==================== CUSTOMER DASHBOARD ENDPOINTS ====================
 
 @router.get("/customer/stats", response_model=CustomerStats)
 async def get_customer_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_for_read),
+    db: Session = Depends(get_read_db)
 ):
     """Get dashboard statistics for customer"""
     if current_user.role != "customer":
@@ -150,8 +253,9 @@ async def get_customer_stats(
     ).count()
     
     # Total booking history
-    booking_history = db.query(Booking).filter(
-        Booking.customer_phone == current_user.phone_number
+    # Finished bookings may have been archived: count them across both tables
+    booking_history = db.query(BookingWithHistory).filter(
+        BookingWithHistory.customer_phone == current_user.phone_number
     ).count()
     
     # Saved providers count
@@ -172,17 +276,17 @@ async def get_customer_stats(
     ).count()
     
     # Completed bookings
-    completed_bookings = db.query(Booking).filter(
-        Booking.customer_phone == current_user.phone_number,
-        Booking.status == BookingStatus.COMPLETED
+    completed_bookings = db.query(BookingWithHistory).filter(
+        BookingWithHistory.customer_phone == current_user.phone_number,
+        BookingWithHistory.status == BookingStatus.COMPLETED
     ).count()
     
     # Cancelled bookings
-    cancelled_bookings = db.query(Booking).filter(
-        Booking.customer_phone == current_user.phone_number,
+    cancelled_bookings = db.query(BookingWithHistory).filter(
+        BookingWithHistory.customer_phone == current_user.phone_number,
         or_(
-            Booking.status == BookingStatus.CANCELLED,
-            Booking.status == BookingStatus.REJECTED
+            BookingWithHistory.status == BookingStatus.CANCELLED,
+            BookingWithHistory.status == BookingStatus.REJECTED
         )
     ).count()
     
@@ -201,7 +305,8 @@ async def get_customer_stats(
 async def create_booking(
     request: CreateBookingRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("create-booking"))
 ):
     """Create a new booking (immediate or scheduled)"""
     if current_user.role != "customer":
@@ -210,13 +315,52 @@ async def create_booking(
             detail="Only customers can create bookings"
         )
     
+    # A retry with the same Idempotency-Key gets the original response back
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
+    
+    # Scheduled bookings occupy a typed [start, end) slot
+    scheduled_start = scheduled_end = None
+    if request.booking_type == "scheduled":
+        scheduled_start = parse_schedule(request.scheduled_date, request.scheduled_time)
+        if scheduled_start is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Scheduled bookings need scheduled_date like 2030-01-31 and scheduled_time like 09:00 AM"
+            )
+        if scheduled_start < datetime.now(timezone.utc):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Scheduled time is in the past"
+            )
+        scheduled_end = scheduled_start + SLOT_LENGTH
+    
+    if request.dispatch:
+        if request.booking_type != "immediate" or not DISPATCH_ENABLED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Dispatch is only available for immediate bookings"
+            )
+        return _create_dispatched_booking(request, current_user, db, idempotency)
+    
+    if not request.provider_phone:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="provider_phone is required"
+        )
+    
     # Normalize phone numbers for consistent matching
     normalized_provider_phone = normalize_phone(request.provider_phone)
     
-    print(f"\n📝 Creating booking:")
-    print(f"   Customer: {current_user.name} ({current_user.phone_number})")
-    print(f"   Provider phone (from request): {request.provider_phone}")
-    print(f"   Provider phone (normalized): {normalized_provider_phone}")
+    logger.debug(
+        "Creating booking",
+        extra={
+            "customer_phone": current_user.phone_number,
+            "provider_phone": request.provider_phone,
+            "provider_phone_normalized": normalized_provider_phone
+        }
+    )
     
     # Find provider - check all providers and match normalized phones
     all_providers = db.query(User).filter(User.role == "provider").all()
@@ -228,17 +372,23 @@ async def create_booking(
             break
     
     if not provider:
-        print(f"   ❌ Provider not found with normalized phone: {normalized_provider_phone}")
-        print(f"   Available providers:")
-        for p in all_providers[:5]:
-            print(f"      - {p.name}: {p.phone_number} (norm: {normalize_phone(p.phone_number)})")
+        logger.info("Provider not found", extra={"provider_phone_normalized": normalized_provider_phone})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Available providers",
+                extra={
+                    "sample_rate": LOG_DEBUG_SAMPLE_RATE,
+                    "providers": [
+                        {"name": p.name, "phone": p.phone_number, "normalized": normalize_phone(p.phone_number)}
+                        for p in all_providers[:5]
+                    ]
+                }
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Provider not found with phone: {request.provider_phone}"
         )
     
-    print(f"   ✅ Found provider: {provider.name} (Phone in DB: {provider.phone_number})")
-    
     # Get provider location from Provider model
     provider_profile = db.query(Provider).filter(
         Provider.user_id == provider.id
@@ -246,6 +396,18 @@ async def create_booking(
     
     location = provider_profile.location_name if provider_profile else None
     
+    # Reject double bookings; the per-provider lock makes check-then-insert
+    # atomic against concurrent requests for the same provider
+    if scheduled_start is not None:
+        lock_provider_schedule(db, provider.id)
+        if slot_taken(db, provider.phone_number, scheduled_start, scheduled_end):
+            # Release the lock now rather than at session teardown
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The provider already has a booking at this time. Please pick another slot."
+            )
+    
     # Generate 6-digit one-time booking code
     one_time_code = str(random.randint(100000, 999999))
     
@@ -266,22 +428,39 @@ async def create_booking(
         booking_type=request.booking_type,
         scheduled_date=request.scheduled_date,
         scheduled_time=request.scheduled_time,
+        scheduled_start=scheduled_start,
+        scheduled_end=scheduled_end,
         one_time_code=one_time_code
     )
     
     db.add(new_booking)
+    db.flush()
+    
+    result = {
+        "success": True,
+        "message": "Booking created successfully",
+        "booking_id": new_booking.id,
+        "one_time_code": one_time_code,
+        "status": new_booking.status.value,
+        "booking_type": new_booking.booking_type
+    }
+    idempotency.store(db, result)
+    
     db.commit()
+    mark_user_write(current_user.id)
     db.refresh(new_booking)
-    
-    # Debug logging
-    print(f"✅ Booking created successfully!")
-    print(f"   Booking ID: {new_booking.id}")
-    print(f"   Customer Phone: {new_booking.customer_phone}")
-    print(f"   Provider Phone: {new_booking.provider_phone}")
-    print(f"   Service: {new_booking.service}")
-    print(f"   Status: {new_booking.status}")
-    print(f"   Type: {new_booking.booking_type}")
-    print(f"   Code: {new_booking.one_time_code}")
+    reminder_scheduler.schedule(new_booking.id, scheduled_start)
+    
+    logger.info(
+        "Booking created",
+        extra={
+            "booking_id": new_booking.id,
+            "customer_phone": new_booking.customer_phone,
+            "provider_phone": new_booking.provider_phone,
+            "service": new_booking.service,
+            "booking_type": new_booking.booking_type
+        }
+    )
     
     # 📱 Send WhatsApp notification to provider
     try:
@@ -292,19 +471,71 @@ async def create_booking(
             booking_type=request.booking_type,
             description=full_description
         )
-        print(f"✅ WhatsApp notification sent to provider")
-    except Exception as e:
-        print(f"⚠️ Failed to send WhatsApp notification to provider: {str(e)}")
+    except Exception:
+        logger.warning("Failed to send WhatsApp notification to provider", exc_info=True)
         # Don't fail the booking if notification fails
     
-    return {
+    return result
+
+
+def _create_dispatched_booking(
+    request: CreateBookingRequest,
+    current_user: User,
+    db: Session,
+    idempotency: IdempotencyGuard
+) -> dict:
+    """Store an unassigned immediate booking and hand it to the dispatch engine"""
+    location = request.location
+    if not location:
+        location = db.query(Customer.location_name).filter(Customer.user_id == current_user.id).scalar()
+    
+    full_description = f"Immediate booking. {request.description or ''}".strip()
+    new_booking = Booking(
+        customer_phone=current_user.phone_number,
+        provider_phone=UNASSIGNED_PROVIDER,  # set by the provider who claims the offer
+        service=request.service,
+        description=full_description,
+        location=location,
+        status=BookingStatus.PENDING,
+        booking_type="immediate",
+        one_time_code=str(random.randint(100000, 999999)),
+        # Held by this worker from the start so other workers' sweeps leave it alone
+        dispatch_owner=WORKER_ID,
+        dispatch_lease_until=dispatch_lease(datetime.now(timezone.utc))
+    )
+    db.add(new_booking)
+    db.flush()
+    
+    result = {
         "success": True,
-        "message": "Booking created successfully",
+        "message": "Finding an available provider near you",
         "booking_id": new_booking.id,
-        "one_time_code": one_time_code,
+        "one_time_code": new_booking.one_time_code,
         "status": new_booking.status.value,
-        "booking_type": new_booking.booking_type
+        "booking_type": new_booking.booking_type,
+        "dispatch": True
     }
+    idempotency.store(db, result)
+    
+    db.commit()
+    mark_user_write(current_user.id)
+    
+    logger.info(
+        "Dispatched booking created",
+        extra={"booking_id": new_booking.id, "customer_phone": current_user.phone_number, "service": request.service}
+    )
+    dispatch_engine.dispatch(new_booking.id, request.service, location, current_user.name, full_description)
+    return result
+
+
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    _token: dict = Depends(get_token_payload)
+):
+    """Search box suggestions (services, localities, provider names) from the in-memory index"""
+    return autocomplete_index.suggest(q, limit)
 
 
 @router.get("/customer/providers", response_model=List[ProviderCardResponse])
@@ -313,64 +544,79 @@ async def get_providers_for_customer(
     service: Optional[str] = None,
     location: Optional[str] = None,
     min_rating: Optional[float] = None,
+    hide_busy: bool = False,
     skip: int = 0,
     limit: int = 100,  # Increased default limit to show more providers
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_for_read),
+    db: Session = Depends(get_read_db)
 ):
     """Get list of providers with filters for customer dashboard"""
     
+    # Saturated providers (active_jobs at capacity) are ranked after available
+    # ones, or left out with hide_busy; both read the counter columns directly
+    saturated = func.coalesce(Provider.active_jobs, 0) >= func.coalesce(
+        Provider.max_concurrent_jobs, PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS
+    )
+    
     # Optimized query with all JOINs
     # Get users with their IDs, then join with providers and calculate ratings
-    query = db.query(
+    base_query = db.query(
         User.id,
         User.phone_number,
         User.name,
         Provider.location_name,
         Provider.bio,
         func.coalesce(func.avg(Review.rating), 0.0).label('avg_rating'),
-        func.count(Review.rating).label('review_count')  # Count ratings, not IDs
+        func.count(Review.rating).label('review_count'),  # Count ratings, not IDs
+        saturated.label('saturated')
     ).outerjoin(Provider, User.id == Provider.user_id
     ).outerjoin(Review, User.id == Review.provider_id
     ).filter(User.role == "provider"
-    ).group_by(User.id, User.phone_number, User.name, Provider.location_name, Provider.bio)
+    ).group_by(
+        User.id, User.phone_number, User.name, Provider.location_name, Provider.bio,
+        Provider.active_jobs, Provider.max_concurrent_jobs
+    )
     
-    # Apply filters (handle NULL values from LEFT JOIN)
-    if search:
-        search_conditions = [User.name.ilike(f"%{search}%")]
-        # Only add Provider filters if the provider profile exists
-        search_conditions.append(
-            and_(
-                Provider.bio.isnot(None),
-                Provider.bio.ilike(f"%{search}%")
-            )
-        )
-        search_conditions.append(
-            and_(
-                Provider.location_name.isnot(None),
-                Provider.location_name.ilike(f"%{search}%")
-            )
-        )
-        query = query.filter(or_(*search_conditions))
+    if hide_busy:
+        base_query = base_query.filter(~saturated)
     
+    # Text filters match the precomputed, transliterated search terms, so
+    # "प्लंबर" finds "Plumber" and "Pune" finds "पुणे"; input without any
+    # searchable word filters nothing, as an empty ILIKE pattern did
+    text_filters = []
+    if search:
+        text_filters.append((search, SEARCH_ALL_FIELDS))
     if service and service.lower() != "all":
-        query = query.filter(
-            and_(
-                Provider.bio.isnot(None),
-                Provider.bio.ilike(f"%{service}%")
-            )
-        )
-    
+        text_filters.append((service, (SEARCH_SERVICE, SEARCH_BIO)))
     if location and location.lower() != "all":
-        query = query.filter(
-            and_(
-                Provider.location_name.isnot(None),
-                Provider.location_name.ilike(f"%{location}%")
-            )
-        )
+        text_filters.append((location, (SEARCH_LOCALITY,)))
+    
+    query = base_query.order_by(saturated, User.id)
+    for text, fields in text_filters:
+        condition = match_condition(text, fields)
+        if condition is not None:
+            query = query.filter(condition)
     
     providers_data = query.offset(skip).limit(limit).all()
     
+    # Nothing matched as typed: retry with the closest known spellings
+    # ("plumer", "electrision"), nearest first
+    if not providers_data and text_filters and FUZZY_SEARCH_ENABLED and (skip == 0 or query.first() is None):
+        fuzzy_query = base_query
+        edits = []
+        for text, fields in text_filters:
+            fuzzy = fuzzy_match(text, fields)
+            if fuzzy is None:
+                edits = None
+                break
+            condition, distance = fuzzy
+            fuzzy_query = fuzzy_query.filter(condition)
+            edits.append(distance)
+        if edits:
+            providers_data = fuzzy_query.order_by(
+                sum(edits), saturated, User.id
+            ).offset(skip).limit(limit).all()
+    
     # Get all saved providers for this customer in one query
     saved_providers_phones = {
         sp.provider_phone for sp in db.query(SavedProvider.provider_phone).filter(
@@ -380,7 +626,7 @@ async def get_providers_for_customer(
     
     # Calculate rating and review count for each provider
     result = []
-    for user_id, phone_number, name, location_name, bio, avg_rating, review_count in providers_data:
+    for user_id, phone_number, name, location_name, bio, avg_rating, review_count, is_saturated in providers_data:
         # Extract service from bio (format: "Experienced {service} in {location}")
         service = "General Services"
         description = bio or "No description available"
@@ -401,32 +647,92 @@ async def get_providers_for_customer(
         # Check if saved using pre-fetched set
         is_saved = phone_number in saved_providers_phones
         
-        result.append(ProviderCardResponse(
-            phone=phone_number,
-            name=name,
-            service=service,
-            description=description,
-            rating=round(avg_rating, 1),
-            location=location_name or "Location not specified",
-            reviews_count=review_count,
-            is_saved=is_saved
-        ))
+        result.append({
+            "phone": phone_number,
+            "name": name,
+            "service": service,
+            "description": description,
+            "rating": round(avg_rating, 1),
+            "location": location_name or "Location not specified",
+            "reviews_count": review_count,
+            "is_saved": is_saved,
+            "available": not is_saturated
+        })
+    
+    return FastJSONResponse(result)
+
+
+class FreeSlotResponse(BaseModel):
+    scheduled_date: str
+    scheduled_time: str
+    start: datetime
+    end: datetime
+
+
+@router.get("/customer/free-slots", response_model=List[FreeSlotResponse])
+async def get_provider_free_slots(
+    provider_phone: str,
+    start_date: Optional[date] = None,
+    days: int = 1,
+    current_user: User = Depends(get_current_user_for_read),
+    db: Session = Depends(get_read_db)
+):
+    """Free booking slots of a provider from start_date (default today) for `days` days"""
+    if days < 1 or days > FREE_SLOTS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"days must be between 1 and {FREE_SLOTS_MAX_DAYS}"
+        )
     
-    return result
+    provider = db.query(User).filter(User.role == "provider", User.phone_number == provider_phone).first()
+    if provider is None:
+        normalized_provider_phone = normalize_phone(provider_phone)
+        provider = next(
+            (p for p in db.query(User).filter(User.role == "provider").all()
+             if normalize_phone(p.phone_number) == normalized_provider_phone),
+            None
+        )
+    if provider is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Provider not found with phone: {provider_phone}"
+        )
+    
+    first_day = start_date or datetime.now(SCHEDULE_TZ).date()
+    range_start = datetime.combine(first_day, datetime.min.time(), tzinfo=SCHEDULE_TZ).astimezone(timezone.utc)
+    range_end = range_start + timedelta(days=days)
+    
+    # One index range scan for the bookings, then O(log n) per candidate slot
+    windows = load_weekly_windows(db, provider.id)
+    busy = load_busy_index(db, provider.phone_number, range_start, range_end)
+    
+    result = []
+    for start in free_slots(windows, busy, first_day, days):
+        scheduled_date, scheduled_time = format_slot(start)
+        result.append({
+            "scheduled_date": scheduled_date,
+            "scheduled_time": scheduled_time,
+            "start": start,
+            "end": start + SLOT_LENGTH
+        })
+    return FastJSONResponse(result)
 
 
 @router.get("/customer/bookings", response_model=List[BookingResponse])
 async def get_customer_bookings(
     status_filter: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_for_read),
+    db: Session = Depends(get_read_db)
 ):
     """Get customer's bookings with optional status filter"""
     # Normalize the current user's phone
     normalized_customer_phone = normalize_phone(current_user.phone_number)
     
+    # Active work lives only in the hot table; anything else may be archived
+    hot_only = status_filter is not None and status_filter.upper() in ("ACTIVE", "PENDING", "ACCEPTED")
+    
     # Find all bookings where normalized phones match
-    all_bookings = db.query(Booking).all()
+    all_bookings = db.query(Booking if hot_only else BookingWithHistory).all()
     matching_bookings = [
         b for b in all_bookings 
         if normalize_phone(b.customer_phone) == normalized_customer_phone
@@ -462,40 +768,18 @@ async def get_customer_bookings(
     # Sort by created_at descending
     matching_bookings.sort(key=lambda x: x.created_at, reverse=True)
     
-    # Enrich with user names
-    result = []
-    for booking in matching_bookings:
-        provider = db.query(User).filter(User.phone_number == booking.provider_phone).first()
-        customer = db.query(User).filter(User.phone_number == booking.customer_phone).first()
-        
-        result.append(BookingResponse(
-            id=booking.id,
-            customer_phone=booking.customer_phone,
-            customer_name=customer.name if customer else "Unknown",
-            provider_phone=booking.provider_phone,
-            provider_name=provider.name if provider else "Unknown",
-            service=booking.service,
-            description=booking.description,
-            location=booking.location,
-            status=booking.status.value,
-            booking_type=booking.booking_type or "immediate",
-            scheduled_date=booking.scheduled_date,
-            scheduled_time=booking.scheduled_time,
-            one_time_code=booking.one_time_code,
-            acceptance_code=booking.acceptance_code,
-            completion_code=booking.completion_code,
-            created_at=booking.created_at
-        ))
+    # Enrich with user names in one query
+    result = _booking_payloads(db, matching_bookings)
     
-    return result
+    return FastJSONResponse(result)
 
 
 # ==================== PROVIDER DASHBOARD ENDPOINTS ====================
 
 @router.get("/provider/stats", response_model=ProviderStats)
 async def get_provider_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_for_read),
+    db: Session = Depends(get_read_db)
 ):
     """Get dashboard statistics for provider"""
     if current_user.role != "provider":
@@ -516,8 +800,8 @@ async def get_provider_stats(
     avg_rating = float(rating_stats.avg_rating) if rating_stats.avg_rating else 0.0
     total_reviews = rating_stats.total_reviews or 0
     
-    # Get all bookings and filter by normalized phone
-    all_bookings = db.query(Booking).all()
+    # Get all bookings (hot and archived) and filter by normalized phone
+    all_bookings = db.query(BookingWithHistory).all()
     provider_bookings = [b for b in all_bookings if normalize_phone(b.provider_phone) == normalized_provider_phone]
     
     # Customers served (completed bookings)
@@ -540,7 +824,7 @@ async def get_provider_stats(
     reviews = db.query(Review).filter(Review.provider_id == current_user.id).order_by(Review.created_at.desc()).all()
     for review in reviews:
         customer = db.query(User).filter(User.id == review.customer_id).first()
-        booking = db.query(Booking).filter(Booking.id == review.booking_id).first()
+        booking = db.query(BookingWithHistory).filter(BookingWithHistory.id == review.booking_id).first()
         if customer and booking:
             reviews_list.append(ReviewDetail(
                 customer_name=customer.name,
@@ -587,14 +871,8 @@ async def get_provider_pending_requests(
             detail="Only providers can access this endpoint"
         )
     
-    # Debug logging
-    print(f"\n📋 Fetching pending requests for provider:")
-    print(f"   Provider Name: {current_user.name}")
-    print(f"   Provider Phone (in DB): {current_user.phone_number}")
-    
     # Normalize provider phone for matching
     normalized_provider_phone = normalize_phone(current_user.phone_number)
-    print(f"   Provider Phone (normalized): {normalized_provider_phone}")
     
     # Get ALL pending bookings and filter in Python (more reliable than SQL regex)
     all_pending_bookings = db.query(Booking).filter(
@@ -608,43 +886,32 @@ async def get_provider_pending_requests(
         if normalized_booking_phone == normalized_provider_phone:
             bookings.append(booking)
     
-    print(f"   Total pending bookings in system: {len(all_pending_bookings)}")
-    print(f"   Bookings matching this provider: {len(bookings)}")
+    logger.debug(
+        "Fetched pending requests",
+        extra={
+            "provider_phone": current_user.phone_number,
+            "total_pending": len(all_pending_bookings),
+            "matching": len(bookings)
+        }
+    )
     
-    if len(bookings) == 0 and len(all_pending_bookings) > 0:
-        print(f"   ⚠️  No matches found. Comparing phone numbers:")
-        for b in all_pending_bookings[:5]:
-            norm_booking_phone = normalize_phone(b.provider_phone)
-            match = "✅ MATCH" if norm_booking_phone == normalized_provider_phone else "❌ NO MATCH"
-            print(f"      - Booking ID {b.id}: {b.provider_phone} → {norm_booking_phone} {match}")
+    if len(bookings) == 0 and len(all_pending_bookings) > 0 and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "No pending requests matched provider phone",
+            extra={
+                "sample_rate": LOG_DEBUG_SAMPLE_RATE,
+                "provider_phone_normalized": normalized_provider_phone,
+                "compared": [
+                    {"booking_id": b.id, "provider_phone": b.provider_phone, "normalized": normalize_phone(b.provider_phone)}
+                    for b in all_pending_bookings[:5]
+                ]
+            }
+        )
     
-    # Enrich with customer names
-    result = []
-    for booking in bookings:
-        customer = db.query(User).filter(User.phone_number == booking.customer_phone).first()
-        provider_user = db.query(User).filter(User.phone_number == booking.provider_phone).first()
-        
-        result.append(BookingResponse(
-            id=booking.id,
-            customer_phone=booking.customer_phone,
-            customer_name=customer.name if customer else "Unknown",
-            provider_phone=booking.provider_phone,
-            provider_name=provider_user.name if provider_user else "Unknown",
-            service=booking.service,
-            description=booking.description,
-            location=booking.location,
-            status=booking.status.value,
-            booking_type=booking.booking_type,
-            scheduled_date=booking.scheduled_date,
-            scheduled_time=booking.scheduled_time,
-            one_time_code=booking.one_time_code,
-            acceptance_code=booking.acceptance_code,
-            completion_code=booking.completion_code,
-            created_at=booking.created_at
-        ))
-    
-    print(f"   ✅ Returning {len(result)} booking(s)\n")
-    return result
+    # Enrich with user names in one query
+    result = _booking_payloads(db, bookings)
+    
+    return FastJSONResponse(result)
 
 
 @router.get("/provider/accepted-jobs", response_model=List[BookingResponse])
@@ -673,32 +940,10 @@ async def get_provider_accepted_jobs(
         if normalize_phone(booking.provider_phone) == normalized_provider_phone:
             bookings.append(booking)
     
-    # Enrich with customer names
-    result = []
-    for booking in bookings:
-        customer = db.query(User).filter(User.phone_number == booking.customer_phone).first()
-        provider = db.query(User).filter(User.phone_number == booking.provider_phone).first()
-        
-        result.append(BookingResponse(
-            id=booking.id,
-            customer_phone=booking.customer_phone,
-            customer_name=customer.name if customer else "Unknown",
-            provider_phone=booking.provider_phone,
-            provider_name=provider.name if provider else "Unknown",
-            service=booking.service,
-            description=booking.description,
-            location=booking.location,
-            status=booking.status.value,
-            booking_type=booking.booking_type,
-            scheduled_date=booking.scheduled_date,
-            scheduled_time=booking.scheduled_time,
-            one_time_code=booking.one_time_code,
-            acceptance_code=booking.acceptance_code,
-            completion_code=booking.completion_code,
-            created_at=booking.created_at
-        ))
+    # Enrich with user names in one query
+    result = _booking_payloads(db, bookings)
     
-    return result
+    return FastJSONResponse(result)
 
 
 # ==================== BOOKING ACTIONS ====================
@@ -707,11 +952,43 @@ class AcceptBookingRequest(BaseModel):
     booking_id: int
 
 
+MAX_BATCH_SIZE = 50
+
+
+class BatchBookingActionRequest(BaseModel):
+    booking_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+def _capacity_conflict(db: Session, exc: ProviderAtCapacity) -> HTTPException:
+    """Roll back the attempted accept (releasing row locks now) and build the 409"""
+    db.rollback()
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"You already have {exc.active_jobs} of {exc.capacity} active jobs. "
+               "Complete or cancel one before accepting more."
+    )
+
+
+async def _send_notifications(notifications: List[tuple]) -> None:
+    """Send queued (notify_function, kwargs) pairs concurrently after the response"""
+    results = await asyncio.gather(
+        *(notify(**kwargs) for notify, kwargs in notifications),
+        return_exceptions=True
+    )
+    failed = sum(1 for sent in results if sent is not True)
+    if failed:
+        logger.warning(
+            "Some batch notifications were not sent",
+            extra={"failed": failed, "total": len(results)}
+        )
+
+
 @router.post("/provider/accept-booking")
 async def accept_booking(
     request: AcceptBookingRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("accept-booking"))
 ):
     """Provider accepts a booking request"""
     if current_user.role != "provider":
@@ -720,58 +997,63 @@ async def accept_booking(
             detail="Only providers can accept bookings"
         )
     
-    booking = db.query(Booking).filter(
-        Booking.id == request.booking_id,
-        Booking.provider_phone == current_user.phone_number,
-        Booking.status == BookingStatus.PENDING
-    ).first()
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
+    
+    # Generate 6-digit acceptance code (shown to provider and customer)
+    acceptance_code = str(random.randint(100000, 999999))
+    
+    # Single conditional UPDATE: only one of several concurrent accepts wins
+    try:
+        booking = apply_transition(
+            db, "accept", request.booking_id, current_user.phone_number,
+            values={"acceptance_code": acceptance_code}
+        )
+    except ProviderAtCapacity as exc:
+        raise _capacity_conflict(db, exc)
     
     if not booking:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Booking not found or already processed"
         )
     
-    # Generate 6-digit acceptance code (shown to provider and customer)
-    acceptance_code = str(random.randint(100000, 999999))
-    
-    booking.status = BookingStatus.ACCEPTED
-    booking.acceptance_code = acceptance_code
+    result = {
+        "message": "Booking accepted successfully",
+        "booking_id": booking.id,
+        "acceptance_code": acceptance_code,
+        "customer_phone": booking.customer_phone
+    }
+    idempotency.store(db, result)
     
     db.commit()
-    
-    # Get customer details for WhatsApp notification
-    customer = db.query(User).filter(
-        User.phone_number == booking.customer_phone
-    ).first()
+    mark_user_write(current_user.id)
+    reminder_scheduler.schedule(booking.id, booking.scheduled_start)
     
     # 📱 Send WhatsApp notification to customer
-    if customer:
+    if booking.counterparty_id:
         try:
             await notify_customer_booking_accepted(
-                customer_phone=customer.phone_number,
+                customer_phone=booking.counterparty_phone,
                 provider_name=current_user.name,
                 service=booking.service,
                 acceptance_code=acceptance_code
             )
-            print(f"✅ WhatsApp acceptance notification sent to customer")
-        except Exception as e:
-            print(f"⚠️ Failed to send WhatsApp notification to customer: {str(e)}")
+        except Exception:
+            logger.warning("Failed to send WhatsApp notification to customer", exc_info=True)
             # Don't fail the acceptance if notification fails
     
-    return {
-        "message": "Booking accepted successfully",
-        "booking_id": booking.id,
-        "acceptance_code": acceptance_code,
-        "customer_phone": booking.customer_phone
-    }
+    return result
 
 
 @router.post("/provider/reject-booking")
 async def reject_booking(
     request: AcceptBookingRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("reject-booking"))
 ):
     """Provider rejects a booking request"""
     if current_user.role != "provider":
@@ -780,11 +1062,11 @@ async def reject_booking(
             detail="Only providers can reject bookings"
         )
     
-    booking = db.query(Booking).filter(
-        Booking.id == request.booking_id,
-        Booking.provider_phone == current_user.phone_number,
-        Booking.status == BookingStatus.PENDING
-    ).first()
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
+    
+    booking = apply_transition(db, "reject", request.booking_id, current_user.phone_number)
     
     if not booking:
         raise HTTPException(
@@ -792,28 +1074,299 @@ async def reject_booking(
             detail="Booking not found or already processed"
         )
     
-    booking.status = BookingStatus.REJECTED
+    result = {"message": "Booking rejected successfully"}
+    idempotency.store(db, result)
     db.commit()
-    
-    # Get customer details for WhatsApp notification
-    customer = db.query(User).filter(
-        User.phone_number == booking.customer_phone
-    ).first()
+    mark_user_write(current_user.id)
+    reminder_scheduler.cancel(booking.id)
     
     # 📱 Send WhatsApp notification to customer
-    if customer:
+    if booking.counterparty_id:
         try:
             await notify_customer_booking_rejected(
-                customer_phone=customer.phone_number,
+                customer_phone=booking.counterparty_phone,
                 provider_name=current_user.name,
                 service=booking.service
             )
-            print(f"✅ WhatsApp rejection notification sent to customer")
-        except Exception as e:
-            print(f"⚠️ Failed to send WhatsApp notification to customer: {str(e)}")
+        except Exception:
+            logger.warning("Failed to send WhatsApp notification to customer", exc_info=True)
             # Don't fail the rejection if notification fails
     
-    return {"message": "Booking rejected successfully"}
+    return result
+
+
+@router.post("/provider/batch-accept-bookings")
+async def batch_accept_bookings(
+    request: BatchBookingActionRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("batch-accept-bookings"))
+):
+    """Provider accepts several booking requests in one transaction"""
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only providers can accept bookings"
+        )
+    
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
+    
+    booking_ids = list(dict.fromkeys(request.booking_ids))
+    acceptance_codes = {booking_id: str(random.randint(100000, 999999)) for booking_id in booking_ids}
+    
+    # One UPDATE for the whole batch, each booking getting its own code;
+    # a batch that does not fit in the provider's free capacity is refused whole
+    try:
+        accepted = apply_transition_batch(
+            db, "accept", booking_ids, current_user.phone_number,
+            values={"acceptance_code": case(acceptance_codes, value=Booking.id)}
+        )
+    except ProviderAtCapacity as exc:
+        raise _capacity_conflict(db, exc)
+    
+    results = []
+    notifications = []
+    for booking_id in booking_ids:
+        booking = accepted.get(booking_id)
+        if not booking:
+            results.append({
+                "booking_id": booking_id,
+                "success": False,
+                "detail": "Booking not found or already processed"
+            })
+            continue
+        results.append({
+            "booking_id": booking_id,
+            "success": True,
+            "acceptance_code": booking.acceptance_code,
+            "customer_phone": booking.customer_phone
+        })
+        if booking.counterparty_id:
+            notifications.append((notify_customer_booking_accepted, {
+                "customer_phone": booking.counterparty_phone,
+                "provider_name": current_user.name,
+                "service": booking.service,
+                "acceptance_code": booking.acceptance_code
+            }))
+    
+    result = {
+        "message": f"Accepted {len(accepted)} of {len(booking_ids)} bookings",
+        "accepted": len(accepted),
+        "results": results
+    }
+    idempotency.store(db, result)
+    
+    db.commit()
+    mark_user_write(current_user.id)
+    for booking in accepted.values():
+        reminder_scheduler.schedule(booking.id, booking.scheduled_start)
+    
+    # 📱 All customer notifications go out together after the response
+    if notifications:
+        background_tasks.add_task(_send_notifications, notifications)
+    
+    return result
+
+
+@router.post("/provider/batch-reject-bookings")
+async def batch_reject_bookings(
+    request: BatchBookingActionRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("batch-reject-bookings"))
+):
+    """Provider rejects several booking requests in one transaction"""
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only providers can reject bookings"
+        )
+    
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
+    
+    booking_ids = list(dict.fromkeys(request.booking_ids))
+    rejected = apply_transition_batch(db, "reject", booking_ids, current_user.phone_number)
+    
+    results = []
+    notifications = []
+    for booking_id in booking_ids:
+        booking = rejected.get(booking_id)
+        if not booking:
+            results.append({
+                "booking_id": booking_id,
+                "success": False,
+                "detail": "Booking not found or already processed"
+            })
+            continue
+        results.append({"booking_id": booking_id, "success": True})
+        if booking.counterparty_id:
+            notifications.append((notify_customer_booking_rejected, {
+                "customer_phone": booking.counterparty_phone,
+                "provider_name": current_user.name,
+                "service": booking.service
+            }))
+    
+    result = {
+        "message": f"Rejected {len(rejected)} of {len(booking_ids)} bookings",
+        "rejected": len(rejected),
+        "results": results
+    }
+    idempotency.store(db, result)
+    
+    db.commit()
+    mark_user_write(current_user.id)
+    for booking_id in rejected:
+        reminder_scheduler.cancel(booking_id)
+    
+    # 📱 All customer notifications go out together after the response
+    if notifications:
+        background_tasks.add_task(_send_notifications, notifications)
+    
+    return result
+
+
+@router.get("/provider/offers")
+async def get_provider_offers(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Open dispatch offers for this provider (first to claim gets the job)"""
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only providers can view offers"
+        )
+    
+    offers = db.query(
+        BookingOffer.booking_id,
+        BookingOffer.expires_at,
+        Booking.service,
+        Booking.description,
+        Booking.location,
+        Booking.created_at,
+        User.name.label("customer_name")
+    ).join(Booking, Booking.id == BookingOffer.booking_id
+    ).outerjoin(User, User.phone_number == Booking.customer_phone
+    ).filter(
+        BookingOffer.provider_id == current_user.id,
+        BookingOffer.status == "offered",
+        BookingOffer.expires_at > datetime.now(timezone.utc),
+        Booking.status == BookingStatus.PENDING,
+        Booking.provider_phone == UNASSIGNED_PROVIDER
+    ).order_by(BookingOffer.expires_at).all()
+    
+    return FastJSONResponse([
+        {
+            "booking_id": offer.booking_id,
+            "customer_name": offer.customer_name or "Unknown",
+            "service": offer.service,
+            "description": offer.description,
+            "location": offer.location,
+            "created_at": offer.created_at,
+            "expires_at": offer.expires_at
+        }
+        for offer in offers
+    ])
+
+
+@router.post("/provider/claim-offer")
+async def claim_offer(
+    request: AcceptBookingRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("claim-offer"))
+):
+    """Provider takes a dispatched booking they were offered"""
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only providers can claim offers"
+        )
+    
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
+    
+    acceptance_code = str(random.randint(100000, 999999))
+    
+    # Single conditional UPDATE: only the first offered provider to claim wins
+    try:
+        booking = apply_transition(
+            db, "claim", request.booking_id, UNASSIGNED_PROVIDER,
+            values={"provider_phone": current_user.phone_number, "acceptance_code": acceptance_code},
+            conditions=(open_offer_condition(current_user.id),)
+        )
+    except ProviderAtCapacity as exc:
+        raise _capacity_conflict(db, exc)
+    
+    if not booking:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Offer expired or the booking was already taken"
+        )
+    
+    close_offers_after_claim(db, booking.id, current_user.id)
+    result = {
+        "message": "Booking accepted successfully",
+        "booking_id": booking.id,
+        "acceptance_code": acceptance_code,
+        "customer_phone": booking.customer_phone
+    }
+    idempotency.store(db, result)
+    
+    db.commit()
+    mark_user_write(current_user.id)
+    dispatch_engine.claimed(booking.id, current_user.id)
+    
+    # 📱 Send WhatsApp notification to customer
+    if booking.counterparty_id:
+        try:
+            await notify_customer_booking_accepted(
+                customer_phone=booking.counterparty_phone,
+                provider_name=current_user.name,
+                service=booking.service,
+                acceptance_code=acceptance_code
+            )
+        except Exception:
+            logger.warning("Failed to send WhatsApp notification to customer", exc_info=True)
+    
+    return result
+
+
+@router.post("/provider/decline-offer")
+async def decline_offer(
+    request: AcceptBookingRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Provider passes on a dispatch offer so the next wave can start sooner"""
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only providers can decline offers"
+        )
+    
+    declined = db.query(BookingOffer).filter(
+        BookingOffer.booking_id == request.booking_id,
+        BookingOffer.provider_id == current_user.id,
+        BookingOffer.status == "offered"
+    ).update({"status": "declined", "responded_at": func.now()}, synchronize_session=False)
+    
+    if not declined:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Open offer not found"
+        )
+    
+    db.commit()
+    return {"message": "Offer declined"}
 
 
 @router.post("/provider/cancel-job")
@@ -829,11 +1382,7 @@ async def cancel_accepted_job(
             detail="Only providers can cancel jobs"
         )
     
-    booking = db.query(Booking).filter(
-        Booking.id == request.booking_id,
-        Booking.provider_phone == current_user.phone_number,
-        Booking.status == BookingStatus.ACCEPTED
-    ).first()
+    booking = apply_transition(db, "provider_cancel", request.booking_id, current_user.phone_number)
     
     if not booking:
         raise HTTPException(
@@ -841,25 +1390,20 @@ async def cancel_accepted_job(
             detail="Accepted job not found"
         )
     
-    booking.status = BookingStatus.CANCELLED
     db.commit()
-    
-    # Get customer details for WhatsApp notification
-    customer = db.query(User).filter(
-        User.phone_number == booking.customer_phone
-    ).first()
+    mark_user_write(current_user.id)
+    reminder_scheduler.cancel(booking.id)
     
     # 📱 Send WhatsApp notification to customer
-    if customer:
+    if booking.counterparty_id:
         try:
             await notify_customer_job_cancelled(
-                customer_phone=customer.phone_number,
+                customer_phone=booking.counterparty_phone,
                 provider_name=current_user.name,
                 service=booking.service
             )
-            print(f"✅ WhatsApp job cancellation notification sent to customer")
-        except Exception as e:
-            print(f"⚠️ Failed to send WhatsApp notification to customer: {str(e)}")
+        except Exception:
+            logger.warning("Failed to send WhatsApp notification to customer", exc_info=True)
             # Don't fail the cancellation if notification fails
     
     return {"message": "Job cancelled successfully"}
@@ -878,14 +1422,7 @@ async def customer_cancel_booking(
             detail="Only customers can cancel their bookings"
         )
     
-    booking = db.query(Booking).filter(
-        Booking.id == request.booking_id,
-        Booking.customer_phone == current_user.phone_number,
-        or_(
-            Booking.status == BookingStatus.PENDING,
-            Booking.status == BookingStatus.ACCEPTED
-        )
-    ).first()
+    booking = apply_transition(db, "customer_cancel", request.booking_id, current_user.phone_number)
     
     if not booking:
         raise HTTPException(
@@ -893,26 +1430,21 @@ async def customer_cancel_booking(
             detail="Booking not found or already completed/cancelled"
         )
     
-    booking.status = BookingStatus.CANCELLED
     db.commit()
-    
-    # Get provider details for WhatsApp notification
-    provider = db.query(User).filter(
-        User.phone_number == booking.provider_phone
-    ).first()
+    mark_user_write(current_user.id)
+    reminder_scheduler.cancel(booking.id)
     
     # 📱 Send WhatsApp notification to provider
-    if provider:
+    if booking.counterparty_id:
         try:
             await notify_provider_booking_cancelled(
-                provider_phone=provider.phone_number,
+                provider_phone=booking.counterparty_phone,
                 customer_name=current_user.name,
                 service=booking.service,
                 booking_type=booking.booking_type
             )
-            print(f"✅ WhatsApp booking cancellation notification sent to provider")
-        except Exception as e:
-            print(f"⚠️ Failed to send WhatsApp notification to provider: {str(e)}")
+        except Exception:
+            logger.warning("Failed to send WhatsApp notification to provider", exc_info=True)
             # Don't fail the cancellation if notification fails
     
     return {"message": "Booking cancelled successfully"}
@@ -968,6 +1500,7 @@ async def save_provider(
     )
     db.add(saved)
     db.commit()
+    mark_user_write(current_user.id)
     
     return {"message": "Provider saved successfully"}
 
@@ -999,6 +1532,7 @@ async def unsave_provider(
     
     db.delete(saved)
     db.commit()
+    mark_user_write(current_user.id)
     
     return {"message": "Provider removed from saved list"}
 
@@ -1061,11 +1595,15 @@ async def complete_booking(
             detail="Only customers can complete bookings"
         )
     
-    booking = db.query(Booking).filter(
-        Booking.id == request.booking_id,
-        Booking.customer_phone == current_user.phone_number,
-        Booking.status == BookingStatus.ACCEPTED
-    ).first()
+    # Generate completion code for mandatory review
+    completion_code = str(random.randint(100000, 999999))
+    
+    # Store completion code but keep status as ACCEPTED
+    # Status will change to COMPLETED only after review is submitted
+    booking = apply_transition(
+        db, "finish", request.booking_id, current_user.phone_number,
+        values={"completion_code": completion_code}
+    )
     
     if not booking:
         raise HTTPException(
@@ -1073,14 +1611,8 @@ async def complete_booking(
             detail="Booking not found or not in accepted status"
         )
     
-    # Generate completion code for mandatory review
-    completion_code = str(random.randint(100000, 999999))
-    
-    # Store completion code but keep status as ACCEPTED
-    # Status will change to COMPLETED only after review is submitted
-    booking.completion_code = completion_code
-    
     db.commit()
+    mark_user_write(current_user.id)
     
     return {
         "success": True,
@@ -1102,7 +1634,8 @@ class CreateReviewRequest(BaseModel):
 async def create_review(
     request: CreateReviewRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyGuard = Depends(idempotency_guard("create-review"))
 ):
     """Customer creates a mandatory review - booking completion requires review"""
     if current_user.role != "customer":
@@ -1111,30 +1644,9 @@ async def create_review(
             detail="Only customers can create reviews"
         )
     
-    # Verify booking and completion code
-    booking = db.query(Booking).filter(
-        Booking.id == request.booking_id,
-        Booking.customer_phone == current_user.phone_number,
-        Booking.status == BookingStatus.ACCEPTED  # Changed from COMPLETED
-    ).first()
-    
-    if not booking:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Booking not found or not in accepted status"
-        )
-    
-    if not booking.completion_code:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Please mark the work as finished first"
-        )
-    
-    if booking.completion_code != request.completion_code:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid completion code"
-        )
+    replay = idempotency.begin(request.model_dump(mode="json"))
+    if replay is not None:
+        return replay
     
     # Validate rating
     if request.rating < 1.0 or request.rating > 5.0:
@@ -1143,48 +1655,240 @@ async def create_review(
             detail="Rating must be between 1.0 and 5.0"
         )
     
-    # Get provider and customer IDs
-    provider = db.query(User).filter(User.phone_number == booking.provider_phone).first()
-    customer = db.query(User).filter(User.phone_number == booking.customer_phone).first()
+    # Mark booking as completed only if the completion code matches; the
+    # conditional UPDATE also makes a second concurrent review a no-op
+    booking = apply_transition(
+        db, "complete", request.booking_id, current_user.phone_number,
+        conditions=[Booking.completion_code == request.completion_code]
+    )
     
-    if not provider or not customer:
+    if not booking:
+        # Failure path only: find out which check failed
+        pending = db.query(Booking.completion_code).filter(
+            Booking.id == request.booking_id,
+            Booking.customer_phone == current_user.phone_number,
+            Booking.status == BookingStatus.ACCEPTED
+        ).first()
+        if not pending:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Booking not found or not in accepted status"
+            )
+        if not pending.completion_code:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Please mark the work as finished first"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Provider or customer not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid completion code"
         )
     
-    # Check if review already exists for this booking
-    existing_review = db.query(Review).filter(
-        Review.provider_id == provider.id,
-        Review.customer_id == customer.id,
-        Review.booking_id == booking.id
-    ).first()
-    
-    if existing_review:
+    if not booking.counterparty_id:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Review already submitted for this booking"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Provider or customer not found"
         )
     
-    # Create review
+    # Create review in the same transaction
     review = Review(
-        provider_id=provider.id,
-        customer_id=customer.id,
+        provider_id=booking.counterparty_id,
+        customer_id=current_user.id,
         booking_id=booking.id,
         rating=request.rating,
         comment=request.comment
     )
-    
     db.add(review)
+    db.flush()
     
-    # NOW mark booking as completed (review is mandatory)
-    booking.status = BookingStatus.COMPLETED
-    
-    db.commit()
-    
-    return {
+    result = {
         "success": True,
         "message": "Review submitted successfully and booking marked as completed",
         "review_id": review.id,
         "booking_status": "completed"
     }
+    idempotency.store(db, result)
+    
+    db.commit()
+    mark_user_write(current_user.id)
+    
+    return result
+
+
+# ==================== DASHBOARD BOOTSTRAP ====================
+# One request per dashboard load: authenticate once, scan the user's
+# bookings once, and run the independent queries concurrently, each on its
+# own session in the threadpool.
+
+def _provider_bookings_section(user_id: int, phone: str) -> dict:
+    db = open_read_session(user_id)
+    try:
+        normalized_provider_phone = normalize_phone(phone)
+        provider_bookings = [
+            b for b in db.query(BookingWithHistory).order_by(BookingWithHistory.created_at.desc()).all()
+            if normalize_phone(b.provider_phone) == normalized_provider_phone
+        ]
+        pending = [b for b in provider_bookings if b.status == BookingStatus.PENDING]
+        accepted = [b for b in provider_bookings if b.status == BookingStatus.ACCEPTED]
+        completed = [b for b in provider_bookings if b.status == BookingStatus.COMPLETED]
+        
+        phones = {b.customer_phone for b in provider_bookings} | {b.provider_phone for b in provider_bookings}
+        names = _user_names(db, phones)
+        
+        return {
+            "customers_served": len({b.customer_phone for b in completed}),
+            "active_bookings": len(pending) + len(accepted),
+            "pending_requests": _booking_payloads(db, pending, names),
+            "accepted_jobs": _booking_payloads(db, accepted, names),
+            "served_customers": [
+                {
+                    "name": names[b.customer_phone],
+                    "phone": b.customer_phone,
+                    "service": b.service,
+                    "booking_date": b.created_at.strftime("%Y-%m-%d") if b.created_at else ""
+                }
+                for b in completed if b.customer_phone in names
+            ]
+        }
+    finally:
+        db.close()
+
+
+def _provider_reviews_section(user_id: int) -> dict:
+    db = open_read_session(user_id)
+    try:
+        # Every review counts towards the rating; only reviews whose customer
+        # and booking still exist are listed (same as /provider/stats)
+        rows = db.query(
+            Review.rating,
+            Review.comment,
+            Review.created_at,
+            User.name,
+            User.phone_number,
+            BookingWithHistory.service
+        ).outerjoin(User, User.id == Review.customer_id
+        ).outerjoin(BookingWithHistory, BookingWithHistory.id == Review.booking_id
+        ).filter(Review.provider_id == user_id
+        ).order_by(Review.created_at.desc()).all()
+        
+        return {
+            "avg_rating": round(sum(r.rating for r in rows) / len(rows), 1) if rows else 0.0,
+            "total_reviews": len(rows),
+            "reviews": [
+                {
+                    "customer_name": r.name,
+                    "customer_phone": r.phone_number,
+                    "rating": r.rating,
+                    "comment": r.comment or "No comment provided",
+                    "created_at": r.created_at.strftime("%Y-%m-%d %H:%M:%S") if r.created_at else "",
+                    "service": r.service
+                }
+                for r in rows if r.name is not None and r.service is not None
+            ]
+        }
+    finally:
+        db.close()
+
+
+@router.get("/provider/bootstrap")
+async def get_provider_bootstrap(current_user: User = Depends(get_current_user_for_read)):
+    """Provider stats, pending requests and accepted jobs in one payload"""
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only providers can access this endpoint"
+        )
+    
+    bookings, reviews = await asyncio.gather(
+        run_in_threadpool(_provider_bookings_section, current_user.id, current_user.phone_number),
+        run_in_threadpool(_provider_reviews_section, current_user.id)
+    )
+    
+    return FastJSONResponse({
+        "stats": {
+            "avg_rating": reviews["avg_rating"],
+            "total_reviews": reviews["total_reviews"],
+            "customers_served": bookings["customers_served"],
+            "active_bookings": bookings["active_bookings"],
+            "pending_requests": len(bookings["pending_requests"]),
+            "accepted_jobs": len(bookings["accepted_jobs"]),
+            "reviews": reviews["reviews"],
+            "served_customers": bookings["served_customers"]
+        },
+        "pending_requests": bookings["pending_requests"],
+        "accepted_jobs": bookings["accepted_jobs"]
+    })
+
+
+def _customer_bookings_section(user_id: int, phone: str) -> dict:
+    db = open_read_session(user_id)
+    try:
+        normalized_customer_phone = normalize_phone(phone)
+        bookings = [
+            b for b in db.query(BookingWithHistory).order_by(BookingWithHistory.created_at.desc()).all()
+            if normalize_phone(b.customer_phone) == normalized_customer_phone
+        ]
+        counts = {status_value: 0 for status_value in BookingStatus}
+        for booking in bookings:
+            counts[booking.status] += 1
+        
+        return {
+            "counts": counts,
+            "total": len(bookings),
+            "bookings": _booking_payloads(db, bookings)
+        }
+    finally:
+        db.close()
+
+
+def _customer_saved_section(user_id: int, phone: str) -> List[dict]:
+    db = open_read_session(user_id)
+    try:
+        rows = db.query(
+            SavedProvider.provider_phone,
+            SavedProvider.created_at,
+            User.name
+        ).outerjoin(User, User.phone_number == SavedProvider.provider_phone
+        ).filter(SavedProvider.customer_phone == phone
+        ).order_by(SavedProvider.created_at.desc()).all()
+        
+        return [
+            {
+                "provider_phone": r.provider_phone,
+                "provider_name": r.name or "Unknown",
+                "saved_at": r.created_at
+            }
+            for r in rows
+        ]
+    finally:
+        db.close()
+
+
+@router.get("/customer/bootstrap")
+async def get_customer_bootstrap(current_user: User = Depends(get_current_user_for_read)):
+    """Customer stats, bookings and saved providers in one payload"""
+    if current_user.role != "customer":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only customers can access this endpoint"
+        )
+    
+    bookings, saved = await asyncio.gather(
+        run_in_threadpool(_customer_bookings_section, current_user.id, current_user.phone_number),
+        run_in_threadpool(_customer_saved_section, current_user.id, current_user.phone_number)
+    )
+    
+    counts = bookings["counts"]
+    return FastJSONResponse({
+        "stats": {
+            "active_bookings": counts[BookingStatus.PENDING] + counts[BookingStatus.ACCEPTED],
+            "booking_history": bookings["total"],
+            "saved_providers": len(saved),
+            "pending_bookings": counts[BookingStatus.PENDING],
+            "accepted_bookings": counts[BookingStatus.ACCEPTED],
+            "completed_bookings": counts[BookingStatus.COMPLETED],
+            "cancelled_bookings": counts[BookingStatus.CANCELLED] + counts[BookingStatus.REJECTED]
+        },
+        "bookings": bookings["bookings"],
+        "saved_providers": saved
+    })
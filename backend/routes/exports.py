@@ -0,0 +1,164 @@
+"""
+Exports
+Streams a user's full booking and review history as NDJSON or CSV.
+
+Rows come from a server-side cursor EXPORT_CHUNK_ROWS at a time and are
+encoded chunk by chunk, so memory stays flat however long the history is.
+Names are joined in SQL; archived bookings are included through
+BookingWithHistory.
+"""
+import csv
+import io
+from datetime import date, datetime
+from enum import Enum
+from typing import Callable, Iterator, List, Optional, Sequence
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+from sqlalchemy.orm import aliased
+from ..Database_connection.routing import open_read_session
+from ..auth.models import User
+from ..auth.routes import get_current_user_for_read
+from ..config import EXPORT_CHUNK_ROWS
+from ..models.reviews import Review
+from ..utils.booking_archive import BookingWithHistory
+from ..utils.fast_json import dumps
+from ..utils.metrics import metrics
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+Customer = aliased(User, name="customer")
+ProviderUser = aliased(User, name="provider_user")
+
+
+def bookings_statement(user: User) -> Select:
+    """The user's bookings (hot and archived) as provider or customer, oldest first, with names and review"""
+    booking = BookingWithHistory
+    own_phone = booking.provider_phone if user.role == "provider" else booking.customer_phone
+    return (
+        select(
+            booking.id.label("booking_id"),
+            booking.created_at,
+            booking.status,
+            booking.booking_type,
+            booking.service,
+            booking.description,
+            booking.location,
+            booking.scheduled_date,
+            booking.scheduled_time,
+            booking.scheduled_start,
+            Customer.name.label("customer_name"),
+            booking.customer_phone,
+            ProviderUser.name.label("provider_name"),
+            booking.provider_phone,
+            Review.rating.label("review_rating"),
+            Review.comment.label("review_comment"),
+        )
+        .outerjoin(Customer, Customer.phone_number == booking.customer_phone)
+        .outerjoin(ProviderUser, ProviderUser.phone_number == booking.provider_phone)
+        .outerjoin(Review, Review.booking_id == booking.id)
+        .where(own_phone == user.phone_number)
+        .order_by(booking.id)
+    )
+
+
+def reviews_statement(user: User) -> Select:
+    """Reviews the provider received, or the customer wrote, oldest first"""
+    own_id = Review.provider_id if user.role == "provider" else Review.customer_id
+    return (
+        select(
+            Review.id.label("review_id"),
+            Review.created_at,
+            Review.booking_id,
+            Review.rating,
+            Review.comment,
+            Customer.name.label("customer_name"),
+            Customer.phone_number.label("customer_phone"),
+            ProviderUser.name.label("provider_name"),
+            ProviderUser.phone_number.label("provider_phone"),
+        )
+        .outerjoin(Customer, Customer.id == Review.customer_id)
+        .outerjoin(ProviderUser, ProviderUser.id == Review.provider_id)
+        .where(own_id == user.id)
+        .order_by(Review.id)
+    )
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _ndjson_encoder(columns: Sequence[str]) -> Callable[[List], bytes]:
+    def encode(rows: List) -> bytes:
+        return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+    return encode
+
+
+def _csv_encoder(columns: Sequence[str]) -> Callable[[List], bytes]:
+    def encode(rows: List) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue().encode("utf-8")
+    return encode
+
+
+def stream_export(statement: Select, export_format: str, user_id: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Encoded export body, one chunk per EXPORT_CHUNK_ROWS rows. Runs on its own
+    read session (StreamingResponse iterates it in the threadpool after the
+    request's dependencies are done) and closes it when the stream ends or
+    the client disconnects.
+    """
+    columns = [str(column.name) for column in statement.selected_columns]  # plain str: orjson rejects quoted_name keys
+    if export_format == "csv":
+        encode = _csv_encoder(columns)
+        header = io.StringIO()
+        csv.writer(header).writerow(columns)
+        yield header.getvalue().encode("utf-8")
+    else:
+        encode = _ndjson_encoder(columns)
+
+    db = open_read_session(user_id)
+    exported = 0
+    try:
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS))
+        for rows in result.partitions():
+            exported += len(rows)
+            yield encode(rows)
+    finally:
+        db.close()
+        metrics.inc("export_rows_total", exported)
+
+
+def _export_response(statement: Select, export_format: str, user: User, name: str) -> StreamingResponse:
+    metrics.inc("exports_total")
+    filename = f"{name}-{user.phone_number}-{date.today().isoformat()}.{export_format}"
+    return StreamingResponse(
+        stream_export(statement, export_format, user.id),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/bookings")
+async def export_bookings(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user_for_read)
+):
+    """Download every booking of the current user (as provider or customer), including archived ones"""
+    return _export_response(bookings_statement(current_user), export_format, current_user, "bookings")
+
+
+@router.get("/reviews")
+async def export_reviews(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user_for_read)
+):
+    """Download every review the current provider received, or the current customer wrote"""
+    return _export_response(reviews_statement(current_user), export_format, current_user, "reviews")
@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from ..Database_connection.db import get_db
+from ..Database_connection.routing import get_read_db, mark_user_write
 from ..models.providers import Provider
+from ..models.provider_availability import ProviderAvailability
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+from datetime import time
 from decimal import Decimal
-
-# Import auth dependency
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-from auth.routes import get_current_user
-from auth.models import User
+from ..auth.routes import get_current_user
+from ..auth.models import User
+from ..config import PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS
+from ..utils.autocomplete import autocomplete_index
+from ..utils.provider_search import index_provider, unindex_provider
 
 router = APIRouter(prefix="/providers", tags=["Providers"])
 
@@ -27,6 +28,7 @@ class ProviderProfileUpdate(BaseModel):
     bio: Optional[str] = Field(None, max_length=1000, description="Provider biography")
     location_name: Optional[str] = Field(None, max_length=255, description="Provider location")
     years_of_experience: Optional[int] = Field(None, description="Years of experience")
+    max_concurrent_jobs: Optional[int] = Field(None, ge=1, le=50, description="Accepted jobs held at once")
 
 class ProviderProfileResponse(BaseModel):
     user_id: int
@@ -39,10 +41,23 @@ class ProviderProfileResponse(BaseModel):
     average_rating: Decimal
     jobs_completed: int
     is_verified: bool
+    max_concurrent_jobs: int = PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS
+    active_jobs: int = 0
+
+    class Config:
+        from_attributes = True
+
+class AvailabilityWindow(BaseModel):
+    weekday: int = Field(..., ge=0, le=6, description="0 = Monday ... 6 = Sunday")
+    start_time: time = Field(..., description="Local start time, e.g. 09:00")
+    end_time: time = Field(..., description="Local end time, e.g. 18:00")
 
     class Config:
         from_attributes = True
 
+class AvailabilityUpdate(BaseModel):
+    windows: List[AvailabilityWindow] = Field(..., max_length=70, description="Weekly working windows; empty means default hours")
+
 # Routes
 @router.post("/profile", response_model=ProviderProfileResponse, status_code=status.HTTP_201_CREATED)
 def create_provider_profile(
@@ -81,8 +96,11 @@ def create_provider_profile(
     )
     
     db.add(new_provider)
+    index_provider(db, current_user.id, current_user.name, new_provider.bio, new_provider.location_name)
     db.commit()
+    mark_user_write(current_user.id)
     db.refresh(new_provider)
+    autocomplete_index.upsert_provider(current_user.id, current_user.name, new_provider.bio, new_provider.location_name)
     
     return ProviderProfileResponse(
         user_id=new_provider.user_id,
@@ -94,7 +112,9 @@ def create_provider_profile(
         years_of_experience=new_provider.years_of_experience,
         average_rating=new_provider.average_rating,
         jobs_completed=new_provider.jobs_completed,
-        is_verified=new_provider.is_verified
+        is_verified=new_provider.is_verified,
+        max_concurrent_jobs=new_provider.max_concurrent_jobs or PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS,
+        active_jobs=new_provider.active_jobs or 0
     )
 
 @router.put("/profile", response_model=ProviderProfileResponse)
@@ -146,10 +166,16 @@ def update_provider_profile(
         provider.location_name = profile_data.location_name
     if profile_data.years_of_experience is not None:
         provider.years_of_experience = profile_data.years_of_experience
+    if profile_data.max_concurrent_jobs is not None:
+        provider.max_concurrent_jobs = profile_data.max_concurrent_jobs
+    if profile_data.name is not None or profile_data.bio is not None or profile_data.location_name is not None:
+        index_provider(db, user.id, user.name, provider.bio, provider.location_name)
     
     db.commit()
+    mark_user_write(current_user.id)
     db.refresh(provider)
     db.refresh(user)
+    autocomplete_index.upsert_provider(user.id, user.name, provider.bio, provider.location_name)
     
     # Return combined user and provider data
     return ProviderProfileResponse(
@@ -162,7 +188,9 @@ def update_provider_profile(
         years_of_experience=provider.years_of_experience,
         average_rating=provider.average_rating,
         jobs_completed=provider.jobs_completed,
-        is_verified=provider.is_verified
+        is_verified=provider.is_verified,
+        max_concurrent_jobs=provider.max_concurrent_jobs or PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS,
+        active_jobs=provider.active_jobs or 0
     )
 
 @router.get("/profile", response_model=ProviderProfileResponse)
@@ -198,13 +226,15 @@ def get_my_provider_profile(
         years_of_experience=provider.years_of_experience,
         average_rating=provider.average_rating,
         jobs_completed=provider.jobs_completed,
-        is_verified=provider.is_verified
+        is_verified=provider.is_verified,
+        max_concurrent_jobs=provider.max_concurrent_jobs or PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS,
+        active_jobs=provider.active_jobs or 0
     )
 
 @router.get("/profile/{provider_id}", response_model=ProviderProfileResponse)
 def get_provider_profile_by_id(
     provider_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get a provider profile by provider ID (user_id).
@@ -238,7 +268,9 @@ def get_provider_profile_by_id(
         # location_name=provider.location_name,
         average_rating=provider.average_rating,
         jobs_completed=provider.jobs_completed,
-        is_verified=provider.is_verified
+        is_verified=provider.is_verified,
+        max_concurrent_jobs=provider.max_concurrent_jobs or PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS,
+        active_jobs=provider.active_jobs or 0
     )
 
 @router.delete("/profile", status_code=status.HTTP_204_NO_CONTENT)
@@ -264,6 +296,69 @@ def delete_provider_profile(
         )
     
     db.delete(provider)
+    # Terms hang off users, so the profile delete does not cascade to them
+    unindex_provider(db, current_user.id)
     db.commit()
+    mark_user_write(current_user.id)
+    autocomplete_index.remove_provider(current_user.id)
     
     return None
+
+@router.get("/availability", response_model=List[AvailabilityWindow])
+def get_my_availability(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the weekly availability calendar of the authenticated provider.
+    An empty list means the default working hours apply every day.
+    """
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only users with provider role have an availability calendar"
+        )
+    
+    return db.query(ProviderAvailability).filter(
+        ProviderAvailability.provider_id == current_user.id
+    ).order_by(ProviderAvailability.weekday, ProviderAvailability.start_time).all()
+
+@router.put("/availability", response_model=List[AvailabilityWindow])
+def update_my_availability(
+    availability: AvailabilityUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Replace the weekly availability calendar of the authenticated provider.
+    Free slots offered to customers are cut from these windows.
+    """
+    if current_user.role != "provider":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only users with provider role have an availability calendar"
+        )
+    
+    for window in availability.windows:
+        if window.start_time >= window.end_time:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Window on weekday {window.weekday} must end after it starts"
+            )
+    
+    db.query(ProviderAvailability).filter(
+        ProviderAvailability.provider_id == current_user.id
+    ).delete(synchronize_session=False)
+    db.add_all([
+        ProviderAvailability(
+            provider_id=current_user.id,
+            weekday=window.weekday,
+            start_time=window.start_time,
+            end_time=window.end_time
+        )
+        for window in availability.windows
+    ])
+    db.commit()
+    mark_user_write(current_user.id)
+    
+    return sorted(availability.windows, key=lambda window: (window.weekday, window.start_time))
@@ -0,0 +1,260 @@
+"""
+Autocomplete
+In-memory prefix index of service names, localities and provider names for
+the customer search box, so typing does not run the providers aggregate.
+
+Terms live in sorted arrays of (key, kind, term) tuples searched with
+bisect: every match for a prefix is a contiguous run starting at
+bisect_left(prefix). Each word start of a term gets its own key, so "pune"
+also finds "Kothrud, Pune". Terms are reference-counted by the providers
+using them and ranked by that count.
+
+Services and localities are a small vocabulary shared by many providers,
+so every match is ranked, even for a one-letter prefix. Provider names
+(about one term per provider, nearly all with a count of one) are kept in
+a separate array of which at most AUTOCOMPLETE_SCAN_LIMIT matches are
+looked at.
+
+Built at startup, updated in place on provider signup and profile changes,
+and rebuilt every AUTOCOMPLETE_REFRESH_SECONDS to pick up changes made by
+other workers or the bulk import.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..Database_connection.db import SessionLocal
+from ..auth.models import User
+from ..config import AUTOCOMPLETE_REFRESH_SECONDS, AUTOCOMPLETE_SCAN_LIMIT
+from ..models.providers import Provider
+from .dispatch import provider_service
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SERVICE = "service"
+LOCALITY = "locality"
+PROVIDER = "provider"
+
+# Tie-break between equally common terms: what customers search by most
+KIND_ORDER = {SERVICE: 0, LOCALITY: 1, PROVIDER: 2}
+
+ProviderTerms = Tuple[Tuple[str, Optional[str]], ...]
+
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").casefold().replace(",", " ").split())
+
+
+def _word_keys(term: str) -> List[str]:
+    """'ac repair pune' -> ['ac repair pune', 'repair pune', 'pune']"""
+    words = term.split()
+    return [" ".join(words[position:]) for position in range(len(words))]
+
+
+def provider_terms(name: Optional[str], bio: Optional[str], location_name: Optional[str]) -> ProviderTerms:
+    return ((SERVICE, provider_service(bio)), (LOCALITY, location_name), (PROVIDER, name))
+
+
+class PrefixIndex:
+    """Sorted (key, kind, term) entries with per-term reference counts; not thread-safe on its own"""
+
+    def __init__(self):
+        # Services and localities, ranked in full
+        self._entries: List[Tuple[str, str, str]] = []
+        # Provider names, ranked up to the scan limit
+        self._names: List[Tuple[str, str, str]] = []
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._display: Dict[Tuple[str, str], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _array(self, kind: str) -> List[Tuple[str, str, str]]:
+        return self._names if kind == PROVIDER else self._entries
+
+    def add(self, kind: str, display: Optional[str]) -> None:
+        term = normalize(display)
+        if not term:
+            return
+        count = self._counts.get((kind, term), 0)
+        self._counts[(kind, term)] = count + 1
+        if count:
+            return
+        self._display[(kind, term)] = " ".join(display.split())
+        entries = self._array(kind)
+        for key in _word_keys(term):
+            bisect.insort(entries, (key, kind, term))
+
+    def remove(self, kind: str, display: Optional[str]) -> None:
+        term = normalize(display)
+        count = self._counts.get((kind, term))
+        if not count:
+            return
+        if count > 1:
+            self._counts[(kind, term)] = count - 1
+            return
+        del self._counts[(kind, term)]
+        del self._display[(kind, term)]
+        entries = self._array(kind)
+        for key in _word_keys(term):
+            position = bisect.bisect_left(entries, (key, kind, term))
+            if position < len(entries) and entries[position] == (key, kind, term):
+                del entries[position]
+
+    @classmethod
+    def from_terms(cls, terms: List[Tuple[str, str]]) -> "PrefixIndex":
+        """Bulk build: count first, then one sort instead of an insort per term"""
+        index = cls()
+        for kind, display in terms:
+            term = normalize(display)
+            if term:
+                index._counts[(kind, term)] = index._counts.get((kind, term), 0) + 1
+                index._display.setdefault((kind, term), " ".join(display.split()))
+        for kind, term in index._counts:
+            index._array(kind).extend((key, kind, term) for key in _word_keys(term))
+        index._entries.sort()
+        index._names.sort()
+        return index
+
+    def _scan(self, entries: List[Tuple[str, str, str]], prefix: str, matches: dict, scan_limit: Optional[int]) -> None:
+        position = bisect.bisect_left(entries, (prefix,))
+        end = None if scan_limit is None else position + scan_limit
+        # Lookups run without the lock: a term removed mid-scan is simply skipped
+        for key, kind, term in entries[position:end]:
+            if not key.startswith(prefix):
+                break
+            count = self._counts.get((kind, term))
+            if count:
+                matches[(kind, term)] = count
+
+    def suggest(self, prefix: str, limit: int, scan_limit: int = AUTOCOMPLETE_SCAN_LIMIT) -> List[dict]:
+        """Most common terms with a word starting with `prefix` (at most `scan_limit` provider names are looked at)"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = {}
+        self._scan(self._entries, prefix, matches, None)
+        self._scan(self._names, prefix, matches, scan_limit)
+        best = heapq.nsmallest(
+            limit, matches.items(), key=lambda item: (-item[1], KIND_ORDER[item[0][0]], item[0][1])
+        )
+        return [
+            {"text": self._display.get((kind, term), term), "kind": kind, "providers": count}
+            for (kind, term), count in best
+        ]
+
+
+class AutocompleteIndex:
+    """
+    The live PrefixIndex plus what each provider contributed to it, so a
+    profile change swaps exactly that provider's terms. Updates come from
+    sync routes in the threadpool, hence the lock; lookups copy nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = PrefixIndex()
+        self._providers: Dict[int, ProviderTerms] = {}
+        self._journal: Optional[List[Tuple[int, ProviderTerms]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        return self._index.suggest(prefix, limit)
+
+    def _apply(self, provider_id: int, terms: ProviderTerms) -> None:
+        for kind, display in self._providers.pop(provider_id, ()):
+            self._index.remove(kind, display)
+        for kind, display in terms:
+            self._index.add(kind, display)
+        if terms:
+            self._providers[provider_id] = terms
+
+    def upsert_provider(
+        self, provider_id: int, name: Optional[str], bio: Optional[str], location_name: Optional[str]
+    ) -> None:
+        """Replace the provider's terms (call after the change is committed)"""
+        terms = provider_terms(name, bio, location_name)
+        with self._lock:
+            if self._providers.get(provider_id) == terms:
+                return
+            self._apply(provider_id, terms)
+            if self._journal is not None:
+                self._journal.append((provider_id, terms))
+            metrics.set_gauge("autocomplete_terms", len(self._index))
+
+    def remove_provider(self, provider_id: int) -> None:
+        """Drop the provider's terms (call after the profile deletion is committed)"""
+        with self._lock:
+            if provider_id not in self._providers:
+                return
+            self._apply(provider_id, ())
+            if self._journal is not None:
+                self._journal.append((provider_id, ()))
+            metrics.set_gauge("autocomplete_terms", len(self._index))
+
+    def rebuild(self, db: Session) -> int:
+        """Reload every provider; updates that land while the query runs are replayed on the new index"""
+        with self._lock:
+            self._journal = []
+        try:
+            # Providers whose profile was deleted are not suggested
+            rows = db.query(User.id, User.name, Provider.bio, Provider.location_name).join(
+                Provider, Provider.user_id == User.id
+            ).filter(User.role == "provider").all()
+            providers = {user_id: provider_terms(name, bio, location) for user_id, name, bio, location in rows}
+            index = PrefixIndex.from_terms([term for terms in providers.values() for term in terms])
+            with self._lock:
+                self._index, self._providers = index, providers
+                for provider_id, terms in self._journal:
+                    self._apply(provider_id, terms)
+                metrics.set_gauge("autocomplete_terms", len(self._index))
+            return len(providers)
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def _refresh(self) -> None:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            providers = self.rebuild(db)
+        finally:
+            db.close()
+        metrics.observe("autocomplete_rebuild_ms", (time.perf_counter() - started) * 1000)
+        logger.debug("Autocomplete index rebuilt", extra={"providers": providers, "terms": len(self._index)})
+
+    def start(self) -> None:
+        """Build now, then keep rebuilding on a daemon thread"""
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("Autocomplete index build failed, retrying on the next refresh")
+        if self._thread is not None or AUTOCOMPLETE_REFRESH_SECONDS <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="autocomplete-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(AUTOCOMPLETE_REFRESH_SECONDS):
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception("Autocomplete rebuild failed")
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,135 @@
+"""
+Booking Archive
+Moves finished bookings (completed, cancelled, rejected) older than
+ARCHIVE_AFTER_DAYS from the hot `bookings` table into `booking_history` in
+small batches, and exposes a read-only union of both tables for history
+queries
+
+Run one full pass by hand with: python -m backend.utils.booking_archive
+"""
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, insert, select, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
+from .. import all_models  # noqa: F401 - the alias below configures every mapper
+from ..Database_connection.db import get_engine
+from ..config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL_SECONDS
+from ..models.bookings import Booking, BookingStatus
+from ..models.booking_history import BookingHistory
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (BookingStatus.COMPLETED, BookingStatus.CANCELLED, BookingStatus.REJECTED)
+
+# Columns shared by both tables, in bookings order
+_COLUMNS = [column.name for column in Booking.__table__.columns]
+
+# Hot and archived bookings as one read-only entity; query it like Booking
+# wherever finished bookings matter (history lists, stats, reviews)
+_all_bookings = union_all(
+    select(*[Booking.__table__.c[name] for name in _COLUMNS]),
+    select(*[BookingHistory.__table__.c[name] for name in _COLUMNS]),
+).subquery("all_bookings")
+BookingWithHistory = aliased(Booking, _all_bookings, name="booking_with_history")
+
+
+def archive_batch(engine: Engine, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move up to `batch_size` finished bookings created before `cutoff`; returns rows moved"""
+    candidates = (
+        select(Booking.id)
+        .where(Booking.status.in_(FINISHED_STATUSES), Booking.created_at < cutoff)
+        .order_by(Booking.id)
+        .limit(batch_size)
+    )
+    history_columns = [BookingHistory.__table__.c[name] for name in _COLUMNS]
+
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            # One statement: DELETE ... RETURNING feeds the INSERT. SKIP LOCKED
+            # leaves rows that a request is updating right now for a later pass.
+            moved = (
+                delete(Booking)
+                .where(Booking.id.in_(candidates.with_for_update(skip_locked=True).scalar_subquery()))
+                .returning(*[Booking.__table__.c[name] for name in _COLUMNS])
+                .cte("moved")
+            )
+            statement = insert(BookingHistory).from_select(
+                history_columns, select(*[moved.c[name] for name in _COLUMNS])
+            )
+            return connection.execute(statement).rowcount
+
+        ids = connection.execute(candidates).scalars().all()
+        if not ids:
+            return 0
+        connection.execute(insert(BookingHistory).from_select(
+            history_columns,
+            select(*[Booking.__table__.c[name] for name in _COLUMNS]).where(Booking.id.in_(ids))
+        ))
+        connection.execute(delete(Booking).where(Booking.id.in_(ids)))
+        return len(ids)
+
+
+def archive_finished_bookings(
+    engine: Engine,
+    older_than_days: float = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_seconds: float = 0.05
+) -> int:
+    """Archive in batches until nothing old enough is left; returns rows moved"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    started = time.perf_counter()
+    while True:
+        moved = archive_batch(engine, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+        # Short transactions with a pause in between keep lock and I/O bursts small
+        time.sleep(pause_seconds)
+
+    metrics.inc("bookings_archived_total", total)
+    metrics.observe("booking_archive_pass_ms", (time.perf_counter() - started) * 1000)
+    if total:
+        logger.info("Archived finished bookings", extra={"bookings": total})
+    return total
+
+
+class BookingArchiver:
+    """Runs archive_finished_bookings every ARCHIVE_INTERVAL_SECONDS on a daemon thread"""
+
+    def __init__(self, interval_seconds: float = ARCHIVE_INTERVAL_SECONDS):
+        self.interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="booking-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                archive_finished_bookings(get_engine())
+            except Exception:
+                logger.exception("Booking archive pass failed")
+
+
+booking_archiver = BookingArchiver()
+
+
+if __name__ == "__main__":
+    print(f"Archived {archive_finished_bookings(get_engine())} bookings")
@@ -0,0 +1,200 @@
+"""
+Booking State Machine
+Declares the allowed booking status transitions and applies each one as a
+single conditional UPDATE ... RETURNING, so two concurrent requests can never
+both move the same booking, and the counterparty comes back in the same
+round trip. Transitions that start or end an accepted job also move the
+provider's active_jobs counter in the same transaction.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from ..auth.models import User
+from ..config import PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS
+from ..models.bookings import Booking, BookingStatus
+from ..models.providers import Provider
+
+
+class ProviderAtCapacity(Exception):
+    """The provider already holds max_concurrent_jobs accepted jobs"""
+
+    def __init__(self, capacity: int, active_jobs: int):
+        super().__init__(f"Provider is at capacity ({active_jobs}/{capacity} active jobs)")
+        self.capacity = capacity
+        self.active_jobs = active_jobs
+
+
+class Transition:
+    """
+    One allowed move: `actor` ("provider" or "customer") must own the
+    booking, which must currently be in one of `sources`; it ends in `target`.
+    `load_delta` is added to the provider's active_jobs per booking moved.
+    """
+
+    def __init__(self, actor: str, sources: Tuple[BookingStatus, ...], target: BookingStatus, load_delta: int = 0):
+        self.actor = actor
+        self.sources = sources
+        self.target = target
+        self.load_delta = load_delta
+
+
+TRANSITIONS: Dict[str, Transition] = {
+    "accept": Transition("provider", (BookingStatus.PENDING,), BookingStatus.ACCEPTED, load_delta=1),
+    "reject": Transition("provider", (BookingStatus.PENDING,), BookingStatus.REJECTED),
+    "provider_cancel": Transition("provider", (BookingStatus.ACCEPTED,), BookingStatus.CANCELLED, load_delta=-1),
+    # Releases capacity only if the booking had been accepted (see _release_load)
+    "customer_cancel": Transition("customer", (BookingStatus.PENDING, BookingStatus.ACCEPTED), BookingStatus.CANCELLED, load_delta=-1),
+    # Work marked finished: a completion code is issued, status stays ACCEPTED
+    "finish": Transition("customer", (BookingStatus.ACCEPTED,), BookingStatus.ACCEPTED),
+    # Review submitted with the completion code
+    "complete": Transition("customer", (BookingStatus.ACCEPTED,), BookingStatus.COMPLETED, load_delta=-1),
+    # Dispatched booking taken by an offered provider: the actor phone is the
+    # unassigned placeholder and the claimant's phone is set in `values`
+    "claim": Transition("provider", (BookingStatus.PENDING,), BookingStatus.ACCEPTED, load_delta=1),
+}
+
+
+def _provider_for_phone(phone: str):
+    return select(User.id).where(User.phone_number == phone).scalar_subquery()
+
+
+def _lock_provider_load(db: Session, provider_phone: str) -> Optional[Row]:
+    """
+    Lock the provider's row and return (active_jobs, capacity), or None for a
+    provider without a profile row (no capacity tracking). Taking this lock
+    before touching the booking serializes a provider's concurrent accepts.
+    """
+    return db.execute(
+        select(
+            Provider.active_jobs,
+            func.coalesce(Provider.max_concurrent_jobs, PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS).label("capacity")
+        )
+        .where(Provider.user_id == _provider_for_phone(provider_phone))
+        .with_for_update()
+    ).first()
+
+
+def _change_load(db: Session, provider_phone: str, delta: int) -> None:
+    new_value = Provider.active_jobs + delta
+    db.execute(
+        update(Provider)
+        .where(Provider.user_id == _provider_for_phone(provider_phone))
+        .values(active_jobs=case((new_value < 0, 0), else_=new_value))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _take_load(db: Session, provider_phone: str, load: Optional[Row], jobs: int) -> None:
+    if not jobs or load is None:
+        return
+    if load.active_jobs + jobs > load.capacity:
+        raise ProviderAtCapacity(load.capacity, load.active_jobs)
+    _change_load(db, provider_phone, jobs)
+
+
+def _release_load(db: Session, transition: Transition, rows: Iterable[Row]) -> None:
+    # When a pending booking may also take this transition (customer cancel),
+    # only rows that had been accepted free a job: those carry an acceptance code
+    maybe_pending = BookingStatus.PENDING in transition.sources
+    released: Dict[str, int] = {}
+    for row in rows:
+        if not maybe_pending or row.acceptance_code is not None:
+            released[row.provider_phone] = released.get(row.provider_phone, 0) + 1
+    for provider_phone, jobs in released.items():
+        _change_load(db, provider_phone, -jobs)
+
+
+def _transition_statement(name: str, target_ids, actor_phone: str, values: Optional[dict], conditions: Iterable):
+    transition = TRANSITIONS[name]
+    if transition.actor == "provider":
+        actor_column, counterparty_phone = Booking.provider_phone, Booking.customer_phone
+    else:
+        actor_column, counterparty_phone = Booking.customer_phone, Booking.provider_phone
+
+    counterparty = User.phone_number == counterparty_phone
+    return (
+        update(Booking)
+        .where(
+            target_ids,
+            actor_column == actor_phone,
+            Booking.status.in_(transition.sources),
+            *conditions
+        )
+        .values(status=transition.target, **(values or {}))
+        .returning(
+            Booking.id,
+            Booking.customer_phone,
+            Booking.provider_phone,
+            Booking.service,
+            Booking.booking_type,
+            Booking.status,
+            Booking.acceptance_code,
+            Booking.completion_code,
+            Booking.scheduled_start,
+            select(User.id).where(counterparty).scalar_subquery().label("counterparty_id"),
+            select(User.name).where(counterparty).scalar_subquery().label("counterparty_name"),
+            counterparty_phone.label("counterparty_phone"),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_transition(
+    db: Session,
+    name: str,
+    booking_id: int,
+    actor_phone: str,
+    values: Optional[dict] = None,
+    conditions: Iterable = ()
+) -> Optional[Row]:
+    """
+    Run transition `name` on one booking inside the caller's transaction
+
+    Returns a row with the booking's columns plus counterparty_id,
+    counterparty_name and counterparty_phone (the other party's user, NULL
+    id/name if that user no longer exists), or None when the booking does
+    not exist, is not the actor's, or is no longer in a source status.
+    Raises ProviderAtCapacity when accepting would exceed the provider's
+    capacity. The caller commits, or rolls back on None or an exception.
+    """
+    transition = TRANSITIONS[name]
+    provider_phone = (values or {}).get("provider_phone", actor_phone)
+    load = _lock_provider_load(db, provider_phone) if transition.load_delta > 0 else None
+
+    statement = _transition_statement(name, Booking.id == booking_id, actor_phone, values, conditions)
+    row = db.execute(statement).first()
+    if row is not None:
+        if transition.load_delta > 0:
+            _take_load(db, provider_phone, load, 1)
+        elif transition.load_delta < 0:
+            _release_load(db, transition, [row])
+    return row
+
+
+def apply_transition_batch(
+    db: Session,
+    name: str,
+    booking_ids: List[int],
+    actor_phone: str,
+    values: Optional[dict] = None
+) -> Dict[int, Row]:
+    """
+    Run transition `name` on many bookings with one UPDATE
+
+    Returns the rows that moved, keyed by booking id; ids that are missing,
+    not the actor's or no longer in a source status are simply absent.
+    Per-booking values can be passed as SQL expressions, e.g. a case() on
+    Booking.id. Raises ProviderAtCapacity if the batch does not fit in the
+    provider's free capacity (nothing is applied once the caller rolls back).
+    """
+    transition = TRANSITIONS[name]
+    load = _lock_provider_load(db, actor_phone) if transition.load_delta > 0 else None
+
+    statement = _transition_statement(name, Booking.id.in_(booking_ids), actor_phone, values, ())
+    rows = {row.id: row for row in db.execute(statement)}
+    if transition.load_delta > 0:
+        _take_load(db, actor_phone, load, len(rows))
+    elif transition.load_delta < 0:
+        _release_load(db, transition, rows.values())
+    return rows
@@ -0,0 +1,123 @@
+"""
+Response Compression Middleware
+Negotiates brotli or gzip for buffered responses and reports bytes saved
+"""
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import metrics
+from ..config import COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Streaming and already-compressed payloads are passed through untouched
+SKIPPED_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "image/", "video/", "audio/")
+
+
+def _accepted_encodings(accept_encoding: str) -> dict:
+    """Parse Accept-Encoding into {coding: q}"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick br when available and accepted, else gzip, else None"""
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Compress complete (single-message) responses above a minimum size
+
+    Responses that arrive in more than one body message are streaming
+    endpoints; they are forwarded unchanged so chunks reach the client as
+    they are produced.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Message = {}
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                # Hold the start message until we know whether to compress
+                start_message = message
+                headers = MutableHeaders(scope=message)
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or content_type.startswith(SKIPPED_CONTENT_TYPES)
+                )
+                if not passthrough:
+                    # Whether this response is compressed depends on the
+                    # request's Accept-Encoding (and size), so caches must
+                    # key on it even when it goes out uncompressed
+                    headers.add_vary_header("Accept-Encoding")
+                passthrough = passthrough or encoding is None
+                if passthrough:
+                    await send(start_message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Streaming or tiny response: send as is from here on
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            metrics.inc("compression_responses_total")
+            metrics.inc("compression_bytes_in_total", len(body))
+            metrics.inc("compression_bytes_out_total", len(compressed))
+            metrics.inc("compression_bytes_saved_total", len(body) - len(compressed))
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,649 @@
+"""
+Dispatch Engine
+Matches immediate bookings placed without a provider: candidates offering
+the service are ranked by locality, rating, current accepted-job load and
+offer responsiveness from an in-memory index, offered the job in waves of
+DISPATCH_WAVE_SIZE, and the first provider to claim it wins through one
+conditional UPDATE (the "claim" transition).
+
+The ranking core (Candidate, CandidateIndex, score) is pure Python so the
+simulator in backend.benchmarks.dispatch_simulator can drive it directly.
+Providers have no coordinates yet, so distance is approximated by matching
+the customer's locality against the provider's location_name.
+
+Each unassigned booking is dispatched by one worker process: the booking is
+created under its worker's dispatch_owner lease, and opening a wave claims
+(or renews) the lease in the same transaction, so two workers never offer
+it at once. The lease is renewed while a wave waits; every worker sweeps
+for waiting bookings nobody holds every DISPATCH_SWEEP_SECONDS, so a
+crashed or stopped worker's bookings are taken over once its lease runs
+out or is released.
+"""
+import os
+import time
+import uuid
+import socket
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, case, exists, func, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from ..Database_connection.db import SessionLocal
+from ..auth.models import User
+from ..config import (
+    DISPATCH_WAVE_SIZE,
+    DISPATCH_MAX_WAVES,
+    DISPATCH_OFFER_TIMEOUT_SECONDS,
+    DISPATCH_INDEX_REFRESH_SECONDS,
+    DISPATCH_STATS_DAYS,
+    DISPATCH_OWNER_LEASE_SECONDS,
+    DISPATCH_SWEEP_SECONDS,
+    PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS
+)
+from ..models.bookings import Booking, BookingStatus
+from ..models.booking_offers import BookingOffer
+from ..models.providers import Provider
+from ..models.reviews import Review
+from .metrics import metrics
+from .whatsapp_service import notify_provider_new_booking, notify_customer_no_provider
+
+logger = logging.getLogger(__name__)
+
+# provider_phone of a dispatched booking until a provider claims it
+UNASSIGNED_PROVIDER = ""
+
+# Score weights (sum to 1); every component is scaled to [0, 1]
+WEIGHT_LOCALITY = 0.40
+WEIGHT_RATING = 0.25
+WEIGHT_LOAD = 0.20
+WEIGHT_RESPONSIVENESS = 0.15
+
+# Rating assumed for providers without reviews, so new providers still get offers
+NEUTRAL_RATING = 3.5
+
+# How often a waiting wave re-checks the booking when no local claim wakes it
+POLL_SECONDS = 2.0
+
+# How a wave ended
+CLAIMED = "claimed"  # a provider took the booking
+GONE = "gone"  # cancelled, or no longer there, before anyone claimed it
+TIMED_OUT = "timed_out"  # offers expired or were all declined: next wave
+LOST = "lost"  # the lease ran out and another worker dispatches the booking now
+
+# This worker process, as recorded in bookings.dispatch_owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def provider_service(bio: Optional[str]) -> str:
+    """Service from a signup bio ("Experienced {service} in {location}")"""
+    if bio and "Experienced" in bio:
+        try:
+            return bio.split("Experienced")[1].split(" in ")[0].strip()
+        except IndexError:
+            pass
+    return "General Services"
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+class Candidate:
+    """A provider as seen by the ranking: static profile plus live load and offer stats"""
+
+    __slots__ = ("user_id", "phone", "name", "service", "locality", "rating", "active_jobs", "capacity", "offers", "accepted")
+
+    def __init__(
+        self,
+        user_id: int,
+        phone: str,
+        name: str,
+        service: str,
+        locality: str,
+        rating: Optional[float] = None,
+        active_jobs: int = 0,
+        capacity: Optional[int] = None,
+        offers: int = 0,
+        accepted: int = 0
+    ):
+        self.user_id = user_id
+        self.phone = phone
+        self.name = name
+        self.service = _normalize(service)
+        self.locality = _normalize(locality)
+        self.rating = NEUTRAL_RATING if rating is None else float(rating)
+        self.active_jobs = active_jobs
+        self.capacity = capacity  # None: no limit
+        self.offers = offers
+        self.accepted = accepted
+
+    @property
+    def saturated(self) -> bool:
+        return self.capacity is not None and self.active_jobs >= self.capacity
+
+
+def locality_match(candidate_locality: str, locality: str) -> float:
+    if not locality or not candidate_locality:
+        return 0.0
+    if candidate_locality == locality:
+        return 1.0
+    if candidate_locality in locality or locality in candidate_locality:
+        return 0.5
+    return 0.0
+
+
+def score(candidate: Candidate, locality: str) -> float:
+    """Higher is better; `locality` must already be normalized"""
+    responsiveness = (candidate.accepted + 1) / (candidate.offers + 2)  # Laplace-smoothed accept rate
+    return (
+        WEIGHT_LOCALITY * locality_match(candidate.locality, locality)
+        + WEIGHT_RATING * candidate.rating / 5
+        + WEIGHT_LOAD / (1 + candidate.active_jobs)
+        + WEIGHT_RESPONSIVENESS * responsiveness
+    )
+
+
+class CandidateIndex:
+    """
+    Providers bucketed by normalized service. Ranking only scores the
+    requested service's bucket and keeps the top k with a bounded heap, so
+    a request costs O(bucket * log k) instead of a scan over all providers.
+    """
+
+    def __init__(self, candidates: Iterable[Candidate] = ()):
+        self._by_service: Dict[str, List[Candidate]] = {}
+        self._by_id: Dict[int, Candidate] = {}
+        for candidate in candidates:
+            self.add(candidate)
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, candidate: Candidate) -> None:
+        self._by_id[candidate.user_id] = candidate
+        self._by_service.setdefault(candidate.service, []).append(candidate)
+
+    def get(self, user_id: int) -> Optional[Candidate]:
+        return self._by_id.get(user_id)
+
+    def _bucket(self, service: str) -> List[Candidate]:
+        bucket = self._by_service.get(service)
+        if bucket is not None:
+            return bucket
+        # "plumb" or "ac repair" against "plumber" / "ac repair technician"
+        return [
+            candidate
+            for key, candidates in self._by_service.items()
+            if service and (service in key or key in service)
+            for candidate in candidates
+        ]
+
+    def rank(
+        self,
+        service: str,
+        locality: str,
+        k: int,
+        exclude: Set[int] = frozenset()
+    ) -> List[Tuple[float, Candidate]]:
+        """Best k (score, candidate) pairs for the service, skipping `exclude` ids and providers at capacity"""
+        locality = _normalize(locality)
+        scored = (
+            (score(candidate, locality), candidate)
+            for candidate in self._bucket(_normalize(service))
+            if candidate.user_id not in exclude and not candidate.saturated
+        )
+        return heapq.nlargest(k, scored, key=lambda pair: pair[0])
+
+    def record_offers(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            candidate = self._by_id.get(user_id)
+            if candidate is not None:
+                candidate.offers += 1
+
+    def record_claim(self, user_id: int) -> None:
+        candidate = self._by_id.get(user_id)
+        if candidate is not None:
+            candidate.accepted += 1
+            candidate.active_jobs += 1
+
+
+def load_candidate_index(db: Session) -> CandidateIndex:
+    """Build the index with three queries (profiles with load, ratings, offer stats)"""
+    profiles = db.query(
+        User.id,
+        User.phone_number,
+        User.name,
+        Provider.bio,
+        Provider.location_name,
+        func.coalesce(Provider.active_jobs, 0),
+        func.coalesce(Provider.max_concurrent_jobs, PROVIDER_DEFAULT_MAX_CONCURRENT_JOBS)
+    ).outerjoin(Provider, Provider.user_id == User.id).filter(User.role == "provider").all()
+
+    ratings = dict(
+        db.query(Review.provider_id, func.avg(Review.rating)).group_by(Review.provider_id).all()
+    )
+    since = datetime.now(timezone.utc) - timedelta(days=DISPATCH_STATS_DAYS)
+    offer_stats = {
+        provider_id: (offers, accepted)
+        for provider_id, offers, accepted in db.query(
+            BookingOffer.provider_id,
+            func.count(BookingOffer.id),
+            func.sum(case((BookingOffer.status == "accepted", 1), else_=0))
+        ).filter(BookingOffer.offered_at >= since).group_by(BookingOffer.provider_id).all()
+    }
+
+    return CandidateIndex(
+        Candidate(
+            user_id=user_id,
+            phone=phone,
+            name=name,
+            service=provider_service(bio),
+            locality=location_name or "",
+            rating=ratings.get(user_id),
+            active_jobs=active_jobs,
+            capacity=capacity,
+            offers=offer_stats.get(user_id, (0, 0))[0],
+            accepted=int(offer_stats.get(user_id, (0, 0))[1] or 0)
+        )
+        for user_id, phone, name, bio, location_name, active_jobs, capacity in profiles
+    )
+
+
+def open_offer_condition(provider_id: int):
+    """SQL condition: the provider holds an unexpired offer for the booking being updated"""
+    return exists().where(
+        BookingOffer.booking_id == Booking.id,
+        BookingOffer.provider_id == provider_id,
+        BookingOffer.status == "offered",
+        BookingOffer.expires_at > datetime.now(timezone.utc)
+    )
+
+
+def close_offers_after_claim(db: Session, booking_id: int, provider_id: int) -> None:
+    """Mark the winning offer accepted and the rest expired (caller's transaction)"""
+    db.execute(
+        update(BookingOffer)
+        .where(BookingOffer.booking_id == booking_id, BookingOffer.status == "offered")
+        .values(
+            status=case((BookingOffer.provider_id == provider_id, "accepted"), else_="expired"),
+            responded_at=func.now()
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _unassigned_booking(booking_id: int):
+    return and_(
+        Booking.id == booking_id,
+        Booking.status == BookingStatus.PENDING,
+        Booking.provider_phone == UNASSIGNED_PROVIDER
+    )
+
+
+def _dispatch_available(now: datetime, owner: str):
+    """No other worker holds an unexpired dispatch lease on the booking"""
+    return or_(
+        Booking.dispatch_owner.is_(None),
+        Booking.dispatch_owner == owner,
+        Booking.dispatch_lease_until < now
+    )
+
+
+def _open_wave(booking_id: int, owner: str, wave: int, ranked: List[Tuple[float, Candidate]]) -> bool:
+    """
+    Insert the wave's offers if the booking is still waiting for a provider
+    and no other worker dispatches it; takes or renews `owner`'s lease in the
+    same transaction
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        owned = db.execute(
+            update(Booking)
+            .where(_unassigned_booking(booking_id), _dispatch_available(now, owner))
+            .values(dispatch_owner=owner, dispatch_lease_until=dispatch_lease(now))
+            .returning(Booking.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if owned is None:
+            db.rollback()
+            return False
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=DISPATCH_OFFER_TIMEOUT_SECONDS)
+        db.add_all([
+            BookingOffer(
+                booking_id=booking_id,
+                provider_id=candidate.user_id,
+                provider_phone=candidate.phone,
+                wave=wave,
+                score=int(candidate_score * 1000),
+                status="offered",
+                expires_at=expires_at
+            )
+            for candidate_score, candidate in ranked
+        ])
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def dispatch_lease(now: datetime) -> datetime:
+    """When a lease taken or renewed at `now` runs out"""
+    return now + timedelta(seconds=DISPATCH_OWNER_LEASE_SECONDS)
+
+
+def _renew_lease(booking_id: int, owner: str) -> bool:
+    """Extend `owner`'s lease while the booking waits; False once another worker holds it or it moved on"""
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        renewed = db.execute(
+            update(Booking)
+            .where(_unassigned_booking(booking_id), _dispatch_available(now, owner))
+            .values(dispatch_owner=owner, dispatch_lease_until=dispatch_lease(now))
+            .returning(Booking.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        return renewed is not None
+    finally:
+        db.close()
+
+
+def _dispatch_state(booking_id: int) -> Tuple[Optional[str], int]:
+    """(CLAIMED or GONE once the booking stopped waiting, else None; offers still open)"""
+    db = SessionLocal()
+    try:
+        booking = db.query(Booking.status, Booking.provider_phone).filter(Booking.id == booking_id).first()
+        if booking is None:
+            return GONE, 0
+        if booking.provider_phone != UNASSIGNED_PROVIDER:
+            # Only a claim assigns a provider; it may have moved on since
+            return CLAIMED, 0
+        if booking.status != BookingStatus.PENDING:
+            return GONE, 0
+        open_offers = db.query(func.count(BookingOffer.id)).filter(
+            BookingOffer.booking_id == booking_id,
+            BookingOffer.status == "offered",
+            BookingOffer.expires_at > datetime.now(timezone.utc)
+        ).scalar()
+        return None, open_offers
+    finally:
+        db.close()
+
+
+def _expire_offers(booking_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(BookingOffer).filter(
+            BookingOffer.booking_id == booking_id,
+            BookingOffer.status == "offered"
+        ).update({"status": "expired"}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _offered_providers(booking_id: int) -> Set[int]:
+    db = SessionLocal()
+    try:
+        return {
+            provider_id for (provider_id,) in
+            db.query(BookingOffer.provider_id).filter(BookingOffer.booking_id == booking_id)
+        }
+    finally:
+        db.close()
+
+
+def _fail_dispatch(booking_id: int) -> Optional[Row]:
+    """
+    Reject a booking nobody claimed; returns its customer/service, or None
+    if it moved on. It keeps provider_phone == UNASSIGNED_PROVIDER, which
+    tells it apart from a booking a provider rejected (and leaves every
+    provider's stats alone).
+    """
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            update(Booking)
+            .where(_unassigned_booking(booking_id))
+            .values(status=BookingStatus.REJECTED)
+            .returning(Booking.customer_phone, Booking.service)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        return row
+    finally:
+        db.close()
+
+
+def _release_dispatch(booking_ids: List[int], owner: str) -> None:
+    """Give up `owner`'s leases so another worker can resume the bookings right away"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Booking)
+            .where(Booking.id.in_(booking_ids), Booking.dispatch_owner == owner)
+            .values(dispatch_owner=None, dispatch_lease_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _waiting_bookings() -> List[Row]:
+    """Unassigned bookings no live worker is dispatching"""
+    db = SessionLocal()
+    try:
+        return db.query(
+            Booking.id, Booking.service, Booking.location, Booking.description, Booking.created_at,
+            User.name.label("customer_name")
+        ).outerjoin(User, User.phone_number == Booking.customer_phone).filter(
+            Booking.status == BookingStatus.PENDING,
+            Booking.provider_phone == UNASSIGNED_PROVIDER,
+            _dispatch_available(datetime.now(timezone.utc), WORKER_ID)
+        ).all()
+    finally:
+        db.close()
+
+
+class DispatchEngine:
+    """
+    Async glue around the ranking core: one task per dispatched booking
+    runs the waves. A claim handled by this worker wakes the task at once;
+    claims on other workers are noticed by polling every POLL_SECONDS. A
+    sweep task resumes waiting bookings no live worker holds.
+    """
+
+    def __init__(
+        self,
+        wave_size: int = DISPATCH_WAVE_SIZE,
+        max_waves: int = DISPATCH_MAX_WAVES,
+        offer_timeout: float = DISPATCH_OFFER_TIMEOUT_SECONDS
+    ):
+        self.wave_size = wave_size
+        self.max_waves = max_waves
+        self.offer_timeout = offer_timeout
+        self._index: Optional[CandidateIndex] = None
+        self._index_lock: Optional[asyncio.Lock] = None
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._claimed: Dict[int, asyncio.Event] = {}
+        self._started: Dict[int, float] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def candidate_index(self) -> CandidateIndex:
+        if self._index_lock is None:
+            self._index_lock = asyncio.Lock()
+        async with self._index_lock:
+            if self._index is None or time.monotonic() - self._index.built_at > DISPATCH_INDEX_REFRESH_SECONDS:
+                self._index = await run_in_threadpool(self._load_index)
+                metrics.set_gauge("dispatch_candidates", len(self._index))
+        return self._index
+
+    @staticmethod
+    def _load_index() -> CandidateIndex:
+        db = SessionLocal()
+        try:
+            return load_candidate_index(db)
+        finally:
+            db.close()
+
+    def dispatch(self, booking_id: int, service: str, locality: Optional[str], customer_name: str, description: str) -> None:
+        """Start offering the booking in waves (call from inside the event loop)"""
+        if booking_id in self._tasks:
+            return
+        self._claimed[booking_id] = asyncio.Event()
+        self._started[booking_id] = time.perf_counter()
+        task = asyncio.get_running_loop().create_task(
+            self._run(booking_id, service, locality or "", customer_name, description)
+        )
+        self._tasks[booking_id] = task
+        task.add_done_callback(lambda _: self._forget(booking_id))
+
+    def _forget(self, booking_id: int) -> None:
+        self._tasks.pop(booking_id, None)
+        self._claimed.pop(booking_id, None)
+        self._started.pop(booking_id, None)
+
+    def claimed(self, booking_id: int, provider_id: int) -> None:
+        """Called after a provider's claim committed on this worker"""
+        if self._index is not None:
+            self._index.record_claim(provider_id)
+        started = self._started.get(booking_id)
+        if started is not None:
+            metrics.observe("dispatch_match_latency_ms", (time.perf_counter() - started) * 1000)
+        event = self._claimed.get(booking_id)
+        if event is not None:
+            event.set()
+
+    async def _run(self, booking_id: int, service: str, locality: str, customer_name: str, description: str) -> None:
+        try:
+            offered = await run_in_threadpool(_offered_providers, booking_id)
+            for wave in range(self.max_waves):
+                index = await self.candidate_index()
+                ranked = index.rank(service, locality, self.wave_size, exclude=offered)
+                if not ranked:
+                    break
+                if not await run_in_threadpool(_open_wave, booking_id, WORKER_ID, wave, ranked):
+                    return  # assigned, cancelled, or dispatched by another worker
+                offered.update(candidate.user_id for _, candidate in ranked)
+                index.record_offers(candidate.user_id for _, candidate in ranked)
+                metrics.inc("dispatch_offers_total", len(ranked))
+
+                await asyncio.gather(
+                    *[
+                        notify_provider_new_booking(
+                            provider_phone=candidate.phone,
+                            customer_name=customer_name,
+                            service=service,
+                            booking_type="immediate",
+                            description=description,
+                            urgent=True  # an offer expires long before a digest would go out
+                        )
+                        for _, candidate in ranked
+                    ],
+                    return_exceptions=True
+                )
+
+                outcome = await self._await_wave(booking_id)
+                if outcome == CLAIMED:
+                    metrics.inc("dispatch_filled_total")
+                    return
+                if outcome == GONE:
+                    metrics.inc("dispatch_abandoned_total")
+                    await run_in_threadpool(_expire_offers, booking_id)
+                    return
+                if outcome == LOST:
+                    logger.warning("Dispatch lease lost to another worker", extra={"booking_id": booking_id})
+                    return
+                await run_in_threadpool(_expire_offers, booking_id)
+
+            failed = await run_in_threadpool(_fail_dispatch, booking_id)
+            if failed is not None:
+                metrics.inc("dispatch_unfilled_total")
+                logger.info("No provider claimed dispatched booking", extra={"booking_id": booking_id})
+                await notify_customer_no_provider(
+                    customer_phone=failed.customer_phone,
+                    service=failed.service
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Dispatch failed", extra={"booking_id": booking_id})
+
+    async def _await_wave(self, booking_id: int) -> str:
+        """Wait out one wave, keeping the lease: CLAIMED, GONE, LOST, or TIMED_OUT"""
+        deadline = time.monotonic() + self.offer_timeout
+        renew_at = time.monotonic() + DISPATCH_OWNER_LEASE_SECONDS / 3
+        event = self._claimed[booking_id]
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return TIMED_OUT
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(POLL_SECONDS, remaining))
+                return CLAIMED
+            except asyncio.TimeoutError:
+                pass
+            ended, open_offers = await run_in_threadpool(_dispatch_state, booking_id)
+            if ended is not None:
+                return ended
+            if not open_offers:
+                return TIMED_OUT  # every provider in the wave declined
+            if time.monotonic() >= renew_at:
+                if not await run_in_threadpool(_renew_lease, booking_id, WORKER_ID):
+                    ended, _ = await run_in_threadpool(_dispatch_state, booking_id)
+                    return ended or LOST
+                renew_at = time.monotonic() + DISPATCH_OWNER_LEASE_SECONDS / 3
+
+    async def resume(self) -> int:
+        """Dispatch waiting bookings no live worker holds (left by a crashed or stopped one); returns bookings resumed"""
+        waiting = [booking for booking in await run_in_threadpool(_waiting_bookings) if booking.id not in self._tasks]
+        for booking in waiting:
+            self.dispatch(
+                booking.id, booking.service, booking.location,
+                booking.customer_name or "Customer", booking.description or ""
+            )
+        if waiting:
+            logger.info("Resumed dispatched bookings", extra={"bookings": len(waiting)})
+        return len(waiting)
+
+    async def start(self) -> None:
+        """Resume bookings left waiting by a previous process, then keep sweeping for them"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        while True:
+            try:
+                await self.resume()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Could not resume dispatched bookings", exc_info=True)
+            await asyncio.sleep(DISPATCH_SWEEP_SECONDS)
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        booking_ids = list(self._tasks)
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if booking_ids:
+            try:
+                await run_in_threadpool(_release_dispatch, booking_ids, WORKER_ID)
+            except Exception:
+                logger.warning("Could not release dispatched bookings", exc_info=True)
+
+
+dispatch_engine = DispatchEngine()
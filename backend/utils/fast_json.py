@@ -0,0 +1,57 @@
+"""
+Fast JSON Responses
+Serializes plain dict/list payloads with orjson when it is installed,
+falling back to the standard library encoder
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode the handful of non-JSON types our DB rows contain"""
+    if isinstance(value, datetime):
+        # "Z" for UTC, as Pydantic and orjson's OPT_UTC_Z write it
+        encoded = value.isoformat()
+        return encoded[:-6] + "Z" if encoded.endswith("+00:00") else encoded
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for payloads built from trusted DB rows
+
+    Returning a Response instance from a route skips FastAPI's response_model
+    validation, so routes using this class should build plain dicts whose
+    shape already matches the declared response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
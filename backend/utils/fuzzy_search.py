@@ -0,0 +1,328 @@
+"""
+Fuzzy Search
+Typo-tolerant lookup of query words ("plumer", "electrision") in the
+vocabulary of provider search terms, ranked by edit distance.
+
+The vocabulary is a partition index (after Pass-Join): every term is cut
+into four segments, each indexed by (term length, segment number, text).
+An edit breaks at most one segment, so a term within tau edits of a word
+keeps at least 4 - tau segments unchanged. An intact segment is shifted
+by the edits before it, and each broken segment holds at least one edit,
+so for every choice of intact segments their positions in the word are
+narrowed to a window of one to five letters (multi-match aware
+selection). A lookup probes those substrings of the word, intersects the
+segments' postings (in C) and verifies the terms found with a
+bit-parallel Levenshtein, after a letter-set filter drops most of them.
+Unlike a BK-tree, which visits a large part of the tree for two typos,
+the work per lookup does not grow with the vocabulary.
+
+The allowed distance grows with word length (no typos under 4 letters, one
+up to 7, two from 8). Built at startup from provider_search_terms, extended
+as providers are indexed and rebuilt every FUZZY_REFRESH_SECONDS.
+"""
+import logging
+import threading
+import time
+from array import array
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from sqlalchemy import distinct, select
+from sqlalchemy.orm import Session
+from ..Database_connection.db import SessionLocal
+from ..config import FUZZY_REFRESH_SECONDS, FUZZY_MAX_CORRECTIONS
+from ..models.provider_search_terms import ProviderSearchTerm
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_TYPOS = 2
+# Terms are cut into MAX_TYPOS + 2 segments, so a term within tau edits of a
+# word keeps at least two of them intact
+SEGMENTS = MAX_TYPOS + 2
+MIN_INDEXED_LENGTH = 3
+# Postings longer than this are kept as sets, so intersecting a few
+# candidates with a common segment ("k" among 7-letter terms) costs the
+# few, not the segment's whole list
+SET_POSTINGS = 1024
+
+
+def max_typos(length: int) -> int:
+    """Edits tolerated in a word of `length` letters"""
+    if length < 4:
+        return 0
+    return 1 if length < 8 else 2
+
+
+def _pattern_masks(word: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for position, char in enumerate(word):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def edit_distance(word: str, term: str, masks: Optional[Dict[str, int]] = None) -> int:
+    """
+    Levenshtein distance, bit-parallel (Myers/Hyyrö): one column of the
+    matrix per letter of `term`, held in two integers. Pass
+    _pattern_masks(word) when comparing one word with many terms.
+    """
+    if not word:
+        return len(term)
+    masks = masks if masks is not None else _pattern_masks(word)
+    full = (1 << len(word)) - 1
+    last = 1 << (len(word) - 1)
+    positive, negative, distance = full, 0, len(word)
+    for char in term:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        up = negative | (~(horizontal | positive) & full)
+        down = positive & horizontal
+        if up & last:
+            distance += 1
+        elif down & last:
+            distance -= 1
+        up = ((up << 1) | 1) & full
+        down = (down << 1) & full
+        positive = down | (~(vertical | up) & full)
+        negative = up & vertical
+    return distance
+
+
+# int.bit_count is Python 3.10+
+_popcount = getattr(int, "bit_count", None) or (lambda value: bin(value).count("1"))
+
+
+def _letter_mask(term: str) -> int:
+    """Set of the term's letters as bits (letters sharing a bit only weaken the filter)"""
+    mask = 0
+    for char in term:
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def _segments(length: int, count: int) -> List[Tuple[int, int]]:
+    """(start, length) of `count` segments of a term; the last ones are one longer when it does not divide evenly"""
+    base, longer = divmod(length, count)
+    segments = []
+    start = 0
+    for number in range(count):
+        size = base + (1 if number >= count - longer else 0)
+        segments.append((start, size))
+        start += size
+    return segments
+
+
+class SegmentIndex:
+    """Partition index over a growing set of terms; not thread-safe on its own"""
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self._terms: List[str] = []
+        self._letters = array("Q")
+        self._ids: Dict[str, int] = {}
+        # key -> one term id, a list once several terms share the segment, a
+        # set past SET_POSTINGS
+        self._postings: Dict[str, Union[int, List[int], Set[int]]] = {}
+        for term in terms:
+            self.add(term)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._ids
+
+    def add(self, term: str) -> None:
+        if not term or term in self._ids:
+            return
+        term_id = len(self._terms)
+        self._terms.append(term)
+        self._letters.append(_letter_mask(term))
+        self._ids[term] = term_id
+        if len(term) < MIN_INDEXED_LENGTH:
+            return
+        for number, (start, size) in enumerate(_segments(len(term), min(SEGMENTS, len(term)))):
+            key = f"{len(term)}:{number}:{term[start:start + size]}"
+            postings = self._postings.get(key)
+            if postings is None:
+                self._postings[key] = term_id
+            elif isinstance(postings, int):
+                self._postings[key] = [postings, term_id]
+            elif isinstance(postings, set):
+                postings.add(term_id)
+            else:
+                postings.append(term_id)
+                if len(postings) > SET_POSTINGS:
+                    self._postings[key] = set(postings)
+
+    def _candidates(self, word: str, tau: int) -> List[Set[int]]:
+        """
+        Terms that may be within tau edits of `word`, by lower bound: entry k
+        holds terms found with k segments broken, so at least k edits away
+        (a term can be in several entries)
+        """
+        length = len(word)
+        by_bound: List[Set[int]] = [set() for _ in range(tau + 1)]
+        for term_length in range(max(MIN_INDEXED_LENGTH, length - tau), length + tau + 1):
+            count = min(SEGMENTS, term_length)
+            segments = _segments(term_length, count)
+            shift = length - term_length
+            # (segment number, window) -> postings of the word's substrings in it
+            probed: Dict[Tuple[int, int, int], list] = {}
+            for broken in range(min(tau, count - 1) + 1):
+                for intact in combinations(range(count), count - broken):
+                    found = []
+                    for number in intact:
+                        # An intact segment moves by the edits before it, and
+                        # each broken segment before or after it takes one
+                        before = number - sum(1 for other in intact if other < number)
+                        after = broken - before
+                        earliest = max(after - tau, shift - tau + before)
+                        latest = min(tau - after, shift + tau - before)
+                        key = (number, earliest, latest)
+                        postings = probed.get(key)
+                        if postings is None:
+                            start, size = segments[number]
+                            postings = []
+                            for position in range(max(0, start + earliest), min(length - size, start + latest) + 1):
+                                ids = self._postings.get(f"{term_length}:{number}:{word[position:position + size]}")
+                                if ids is not None:
+                                    postings.append((ids,) if isinstance(ids, int) else ids)
+                            probed[key] = postings
+                        if not postings:
+                            break
+                        found.append(postings)
+                    else:
+                        # Start from the rarest segment; only it is copied into a set
+                        found.sort(key=lambda lists: sum(map(len, lists)))
+                        ids = set().union(*found[0])
+                        for lists in found[1:]:
+                            if not ids:
+                                break
+                            ids = set().union(*(ids.intersection(postings) for postings in lists))
+                        by_bound[broken] |= ids
+        return by_bound
+
+    def lookup(self, word: str, limit: int = FUZZY_MAX_CORRECTIONS, tau: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Closest terms as (distance, term), nearest first, within
+        max_typos(len(word)) edits. Candidates are verified in order of their
+        lower bound and the lookup stops once `limit` terms are known to be
+        nearest, so which of several equally distant terms make the cut is
+        arbitrary.
+        """
+        tau = max_typos(len(word)) if tau is None else min(tau, MAX_TYPOS)
+        if tau == 0:
+            return [(0, word)] if word in self._ids else []
+        masks = _pattern_masks(word)
+        letters = _letter_mask(word)
+        found = []
+        settled = 0
+        verified: Set[int] = set()
+        for bound, candidates in enumerate(self._candidates(word, tau)):
+            settled += sum(1 for distance, _ in found if distance == bound)
+            for term_id in candidates - verified:
+                if settled >= limit:
+                    break
+                # Each edit brings in or drops at most one distinct letter
+                missing = self._letters[term_id] & ~letters
+                extra = letters & ~self._letters[term_id]
+                if _popcount(missing) > tau or _popcount(extra) > tau:
+                    continue
+                term = self._terms[term_id]
+                distance = edit_distance(word, term, masks)
+                if distance <= tau:
+                    found.append((distance, term))
+                    # Nothing still unverified can be nearer than `bound`
+                    if distance == bound:
+                        settled += 1
+            if settled >= limit:
+                break
+            verified |= candidates
+        found.sort()
+        return found[:limit]
+
+
+class FuzzyVocabulary:
+    """
+    The live SegmentIndex of provider search terms. Terms are only added
+    between rebuilds (a term nobody uses any more just matches nothing);
+    rebuilds swap in a fresh index built off the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = SegmentIndex()
+        self._journal: Optional[List[str]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, word: str, limit: int = FUZZY_MAX_CORRECTIONS) -> List[Tuple[int, str]]:
+        started = time.perf_counter()
+        corrections = self._index.lookup(word, limit)
+        metrics.observe("fuzzy_lookup_ms", (time.perf_counter() - started) * 1000)
+        return corrections
+
+    def add_terms(self, terms: Iterable[str]) -> None:
+        with self._lock:
+            for term in terms:
+                self._index.add(term)
+                if self._journal is not None:
+                    self._journal.append(term)
+
+    def rebuild(self, db: Session) -> int:
+        """Reload the vocabulary; terms added while the query runs are replayed on the new index"""
+        with self._lock:
+            self._journal = []
+        try:
+            index = SegmentIndex(db.execute(select(distinct(ProviderSearchTerm.latin))).scalars())
+            with self._lock:
+                for term in self._journal:
+                    index.add(term)
+                self._index = index
+            metrics.set_gauge("fuzzy_vocabulary_terms", len(index))
+            return len(index)
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def _refresh(self) -> None:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            terms = self.rebuild(db)
+        finally:
+            db.close()
+        metrics.observe("fuzzy_rebuild_ms", (time.perf_counter() - started) * 1000)
+        logger.debug("Fuzzy vocabulary rebuilt", extra={"terms": terms})
+
+    def start(self) -> None:
+        """Build now, then keep rebuilding on a daemon thread"""
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception("Fuzzy vocabulary build failed, retrying on the next refresh")
+        if self._thread is not None or FUZZY_REFRESH_SECONDS <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="fuzzy-vocabulary-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(FUZZY_REFRESH_SECONDS):
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception("Fuzzy vocabulary rebuild failed")
+
+
+fuzzy_vocabulary = FuzzyVocabulary()
@@ -0,0 +1,198 @@
+"""
+Idempotency-Key Support
+Lets clients safely retry booking mutations: the first request with a key
+stores its response, and a replay of the same request returns that stored
+response without touching bookings or sending notifications again
+"""
+import time
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..config import IDEMPOTENCY_KEY_TTL_HOURS, IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+from ..Database_connection.db import SessionLocal
+from ..auth.routes import get_current_user
+from ..models.idempotency_keys import IdempotencyKey
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def _request_hash(endpoint: str, payload: dict) -> str:
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(f"{endpoint}:{body}".encode()).hexdigest()
+
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete expired keys; keeps the table bounded to roughly one TTL of traffic"""
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+    db.commit()
+    metrics.inc("idempotency_keys_purged_total", deleted)
+    return deleted
+
+
+def _maybe_purge(db: Session) -> None:
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < IDEMPOTENCY_PURGE_INTERVAL_SECONDS or not _purge_lock.acquire(blocking=False):
+        return
+    try:
+        _last_purge = now
+        purge_expired_keys(db)
+    except Exception:
+        db.rollback()
+        logger.warning("Failed to purge expired idempotency keys", exc_info=True)
+    finally:
+        _purge_lock.release()
+
+
+class IdempotencyGuard:
+    """
+    Per-request handle used by an endpoint:
+
+        replay = idempotency.begin(request.model_dump(mode="json"))
+        if replay is not None:
+            return replay
+        ...
+        idempotency.store(db, result)   # same transaction as the mutation
+        db.commit()
+
+    begin() claims the key with a placeholder row (committed on its own
+    session); a concurrent duplicate gets 409 until the first one finishes.
+    store() fills the placeholder inside the endpoint's transaction, so the
+    stored response commits or rolls back together with the booking change.
+    If the endpoint fails before that, the placeholder is removed and the
+    client can retry with the same key.
+    """
+
+    def __init__(self, endpoint: str, user_id: int, key: Optional[str]):
+        self.endpoint = endpoint
+        self.user_id = user_id
+        self.key = key
+        self._record_id: Optional[int] = None
+        self._stored = False
+
+    def begin(self, payload: dict) -> Optional[JSONResponse]:
+        """Claim the key, or return the stored response for a replay"""
+        if not self.key:
+            return None
+        if len(self.key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"
+            )
+
+        request_hash = _request_hash(self.endpoint, payload)
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            _maybe_purge(db)
+
+            # An expired key may be reused
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.expires_at <= now
+            ).delete(synchronize_session=False)
+
+            record = IdempotencyKey(
+                user_id=self.user_id,
+                key=self.key,
+                endpoint=self.endpoint,
+                request_hash=request_hash,
+                expires_at=now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+            )
+            db.add(record)
+            try:
+                db.commit()
+                self._record_id = record.id
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            existing = db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key
+            ).first()
+        finally:
+            db.close()
+
+        if existing is not None and existing.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        if existing is None or existing.status_code is None:
+            metrics.inc("idempotency_conflicts_total")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed"
+            )
+
+        metrics.inc("idempotency_replays_total")
+        return JSONResponse(
+            content=existing.response_json,
+            status_code=existing.status_code,
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    def store(self, db: Session, response: dict, status_code: int = 200) -> None:
+        """Record the response in the endpoint's transaction (committed by the caller)"""
+        if self._record_id is None:
+            return
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == self._record_id).update(
+            {"response_json": response, "status_code": status_code},
+            synchronize_session=False
+        )
+        self._stored = True
+
+    def release(self) -> None:
+        """Drop an unfinished claim so the key can be retried"""
+        if self._record_id is None:
+            return
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.id == self._record_id,
+                IdempotencyKey.status_code.is_(None)
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            logger.warning("Failed to release idempotency key", exc_info=True)
+        finally:
+            db.close()
+        self._record_id = None
+
+
+def idempotency_guard(endpoint: str):
+    """Dependency factory reading the optional Idempotency-Key header for `endpoint`"""
+
+    def dependency(
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+        current_user=Depends(get_current_user)
+    ):
+        guard = IdempotencyGuard(endpoint, current_user.id, idempotency_key)
+        failed = False
+        try:
+            yield guard
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if failed or not guard._stored:
+                guard.release()
+
+    return dependency
@@ -0,0 +1,98 @@
+"""
+Event Loop Lag Monitor
+Measures event-loop scheduling lag continuously and captures the stack of
+callbacks that block the loop past a threshold
+"""
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from typing import Optional
+from .metrics import metrics
+from ..config import LOOP_MONITOR_INTERVAL_MS, LOOP_BLOCK_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    """
+    Two cooperating probes:
+
+    - an asyncio task that sleeps for a fixed interval and records how late it
+      wakes up (scheduling lag), exported as the `event_loop_lag_ms` metric
+    - a watchdog thread that notices when that task has not run for longer than
+      the block threshold and snapshots the loop thread's stack while it is
+      still stuck, so the blocking call (e.g. a sync DB query or Twilio request)
+      shows up in the log
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+        block_threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS
+    ):
+        self.interval = interval_ms / 1000
+        self.block_threshold = block_threshold_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = time.monotonic()
+        self._tick = 0
+
+    def start(self) -> None:
+        """Start monitoring the running event loop (call from inside the loop)"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the probe task and watchdog thread"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - scheduled - self.interval) * 1000)
+            self._last_tick = time.monotonic()
+            self._tick += 1
+            metrics.set_gauge("event_loop_lag_ms", lag_ms)
+            metrics.observe("event_loop_lag_ms", lag_ms)
+
+    def _watch(self) -> None:
+        reported_tick = -1
+        while not self._stop.wait(self.block_threshold / 4):
+            stalled = time.monotonic() - self._last_tick - self.interval
+            if stalled < self.block_threshold or reported_tick == self._tick:
+                continue
+
+            # Report each stall once, while the loop thread is still inside it
+            reported_tick = self._tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            metrics.inc("event_loop_blocked_total")
+            logger.warning(
+                "Event loop blocked for more than %.0f ms",
+                stalled * 1000,
+                extra={"blocked_ms": round(stalled * 1000, 1), "stack": stack}
+            )
+
+
+loop_monitor = EventLoopMonitor()
@@ -0,0 +1,51 @@
+"""
+In-Process Metrics Registry
+Thread-safe counters, gauges and summaries exposed by the /metrics endpoint
+"""
+import threading
+from typing import Dict
+
+
+class MetricsRegistry:
+    """Minimal metrics store shared by the monitoring utilities"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """Increment a monotonically increasing counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def gauge(self, name: str, default: float = 0.0) -> float:
+        """Current value of a gauge"""
+        with self._lock:
+            return self._gauges.get(name, default)
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation in a count/sum/max summary"""
+        with self._lock:
+            summary = self._summaries.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+
+    def snapshot(self) -> dict:
+        """Copy of all current values"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {name: dict(values) for name, values in self._summaries.items()},
+            }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,138 @@
+"""
+Notification Coalescing
+Buffers non-urgent notifications per recipient for NOTIFY_COALESCE_WINDOW_SECONDS
+and sends whatever piled up as one digest message, so a provider receiving a
+burst of booking requests costs one Twilio call instead of one per request.
+
+The window starts with the first buffered notification, so nothing waits
+longer than the window (or until NOTIFY_COALESCE_MAX_BATCH notifications are
+buffered). A lone notification is sent with its original text. Urgent kinds
+(acceptance and completion codes, reminders, customer updates) never enter
+the buffer.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from ..config import NOTIFY_COALESCE_ENABLED, NOTIFY_COALESCE_WINDOW_SECONDS, NOTIFY_COALESCE_MAX_BATCH
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Coalescible notification kinds; anything else is sent immediately
+NEW_BOOKING = "new_booking"
+BOOKING_CANCELLED = "booking_cancelled"
+COALESCED_KINDS = frozenset({NEW_BOOKING, BOOKING_CANCELLED})
+
+
+class PendingNotification:
+    __slots__ = ("kind", "message", "summary")
+
+    def __init__(self, kind: str, message: str, summary: str):
+        self.kind = kind
+        self.message = message  # full text, used when it ends up alone
+        self.summary = summary  # one line for the digest
+
+
+class NotificationCoalescer:
+    """
+    recipient -> buffered notifications plus the timer that flushes them.
+    Only touched from the event loop: submit() buffers synchronously and a
+    flush detaches the buffer before sending, so notifications arriving
+    during a send open a new window.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, str], Awaitable[bool]],
+        render_digest: Callable[[List[PendingNotification]], str],
+        window_seconds: float = NOTIFY_COALESCE_WINDOW_SECONDS,
+        max_batch: int = NOTIFY_COALESCE_MAX_BATCH,
+        enabled: bool = NOTIFY_COALESCE_ENABLED
+    ):
+        self.send = send
+        self.render_digest = render_digest
+        self.window = window_seconds
+        self.max_batch = max_batch
+        self.enabled = enabled
+        self._buffers: Dict[str, List[PendingNotification]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._flushes: set = set()
+        self._running = False
+
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    async def submit(self, recipient: str, kind: str, message: str, summary: str) -> bool:
+        """
+        Send `message` to `recipient` now if urgent (or coalescing is off),
+        otherwise buffer it. Returns the send result, or True once buffered.
+        """
+        if not self._running or not self.enabled or self.window <= 0 or kind not in COALESCED_KINDS:
+            metrics.inc("notifications_immediate_total")
+            return await self._deliver(recipient, message, notifications=1)
+
+        buffer = self._buffers.setdefault(recipient, [])
+        buffer.append(PendingNotification(kind, message, summary))
+        metrics.inc("notifications_buffered_total")
+        metrics.set_gauge("notifications_buffered", len(self))
+
+        if len(buffer) >= self.max_batch:
+            await self.flush(recipient)
+        elif recipient not in self._timers:
+            self._timers[recipient] = asyncio.get_running_loop().call_later(
+                self.window, self._flush_later, recipient
+            )
+        return True
+
+    def _flush_later(self, recipient: str) -> None:
+        self._timers.pop(recipient, None)
+        task = asyncio.get_running_loop().create_task(self.flush(recipient))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self, recipient: str) -> Optional[bool]:
+        """Send the recipient's buffered notifications now (one digest if several)"""
+        timer = self._timers.pop(recipient, None)
+        if timer is not None:
+            timer.cancel()
+        buffer = self._buffers.pop(recipient, None)
+        metrics.set_gauge("notifications_buffered", len(self))
+        if not buffer:
+            return None
+
+        if len(buffer) == 1:
+            return await self._deliver(recipient, buffer[0].message, notifications=1)
+
+        metrics.inc("notifications_digests_total")
+        metrics.inc("notifications_merged_total", len(buffer))
+        return await self._deliver(recipient, self.render_digest(buffer), notifications=len(buffer))
+
+    async def _deliver(self, recipient: str, message: str, notifications: int) -> bool:
+        try:
+            sent = await self.send(recipient, message)
+        except Exception:
+            logger.warning("Notification send failed", exc_info=True, extra={"recipient": recipient})
+            sent = False
+        if sent:
+            metrics.inc("notifications_messages_sent_total")
+            metrics.inc("notifications_delivered_total", notifications)
+        else:
+            metrics.inc("notifications_failed_total", notifications)
+        return sent
+
+    def start(self) -> None:
+        """Begin buffering (call from inside the event loop); before this everything is sent directly"""
+        self._running = True
+
+    async def stop(self) -> None:
+        """Stop buffering and send everything still held, so shutdown loses nothing"""
+        self._running = False
+        pending = list(self._buffers)
+        results = await asyncio.gather(*[self.flush(recipient) for recipient in pending], return_exceptions=True)
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+        if pending:
+            logger.info(
+                "Flushed buffered notifications on shutdown",
+                extra={"recipients": len(pending), "sent": sum(1 for result in results if result is True)}
+            )
@@ -1,25 +1,24 @@
 import random
 import string
-import httpx
 from datetime import datetime, timedelta
 from typing import Optional
-import os
-from dotenv import load_dotenv
+import logging
+from ..config import (
+    MSG91_AUTH_KEY,
+    MSG91_SENDER_ID,
+    MSG91_DLT_TEMPLATE_ID,
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_PHONE_NUMBER,
+    OTP_PROVIDER,
+    OTP_LENGTH,
+    OTP_EXPIRY_MINUTES,
+    MAX_OTP_ATTEMPTS,
+    DEVELOPMENT_MODE
+)
+from .twilio_client import get_twilio_client
 
-load_dotenv()
-
-# Configuration
-MSG91_AUTH_KEY = os.getenv("MSG91_AUTH_KEY")
-MSG91_SENDER_ID = os.getenv("MSG91_SENDER_ID", "MSGIND")
-MSG91_DLT_TEMPLATE_ID = os.getenv("MSG91_DLT_TEMPLATE_ID")
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
-OTP_PROVIDER = os.getenv("OTP_PROVIDER", "MSG91")  # MSG91 or TWILIO
-OTP_LENGTH = int(os.getenv("OTP_LENGTH", "6"))
-OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "5"))
-MAX_OTP_ATTEMPTS = int(os.getenv("MAX_OTP_ATTEMPTS", "3"))
-DEVELOPMENT_MODE = os.getenv("DEVELOPMENT_MODE", "false").lower() == "true"
+logger = logging.getLogger(__name__)
 
 def generate_otp(length: int = OTP_LENGTH) -> str:
     """Generate random numeric OTP"""
@@ -37,8 +36,6 @@ async def send_otp_via_twilio(phone: str, otp: str) -> bool:
         bool: True if sent successfully, False otherwise
     """
     try:
-        from twilio.rest import Client
-        
         # Format phone number with country code
         phone = phone.replace("+", "").replace(" ", "")
         if not phone.startswith("91"):
@@ -46,16 +43,17 @@ async def send_otp_via_twilio(phone: str, otp: str) -> bool:
         else:
             phone = "+" + phone
         
-        print(f"🔄 Attempting to send OTP via Twilio to {phone}")
-        print(f"📱 Using Twilio Account: {TWILIO_ACCOUNT_SID[:10] if TWILIO_ACCOUNT_SID else 'Not Set'}...")
+        logger.debug("Sending OTP via Twilio", extra={"phone": phone})
         
         if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
-            print(f"❌ Twilio credentials not configured")
-            print(f"⚠️  Set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER in .env")
+            logger.error(
+                "Twilio credentials not configured; set TWILIO_ACCOUNT_SID, "
+                "TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER in .env"
+            )
             return False
         
-        # Create Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        # Shared Twilio client (SDK imported on first use)
+        client = get_twilio_client()
         
         # Send SMS
         message = client.messages.create(
@@ -64,41 +62,31 @@ async def send_otp_via_twilio(phone: str, otp: str) -> bool:
             to=phone
         )
         
-        print(f"✅ OTP sent successfully via Twilio to {phone}")
-        print(f"✅ Message SID: {message.sid}")
-        print(f"✅ Status: {message.status}")
-        print(f"📱 Check your phone for the OTP!")
+        logger.info(
+            "OTP sent via Twilio",
+            extra={"phone": phone, "message_sid": message.sid, "status": message.status}
+        )
         
         return True
         
     except Exception as e:
         error_message = str(e)
-        print(f"❌ Error sending OTP via Twilio: {error_message}")
         
         # Check if it's a trial account error (unverified number)
         if "unverified" in error_message.lower() or "21608" in error_message:
-            print(f"")
-            print(f"⚠️  TWILIO TRIAL ACCOUNT LIMITATION")
-            print(f"⚠️  The phone number {phone} is not verified in your Twilio account.")
-            print(f"")
-            print(f"💡 SOLUTIONS:")
-            print(f"   1. Verify this number at: https://www.twilio.com/console/phone-numbers/verified")
-            print(f"   2. Or upgrade to a paid Twilio account")
-            print(f"   3. Or enable DEVELOPMENT_MODE in .env for testing")
-            print(f"")
-            print(f"🔧 DEVELOPMENT MODE:")
-            print(f"   Add to .env: DEVELOPMENT_MODE=true")
-            print(f"   This will skip SMS sending and just print OTP to console")
-            print(f"")
+            logger.warning(
+                "Twilio trial account cannot send to unverified number %s; verify it at "
+                "https://www.twilio.com/console/phone-numbers/verified, upgrade the account, "
+                "or set DEVELOPMENT_MODE=true in .env to skip SMS sending",
+                phone
+            )
             
             # If in development mode, still return True to allow login
             if DEVELOPMENT_MODE:
-                print(f"🔓 DEVELOPMENT_MODE is ON - OTP saved to database")
-                print(f"✅ You can use the OTP shown above to login")
+                logger.info("DEVELOPMENT_MODE is on - OTP saved to database")
                 return True
         
-        import traceback
-        print(traceback.format_exc())
+        logger.error("Error sending OTP via Twilio", exc_info=True, extra={"phone": phone})
         return False
 
 
@@ -113,18 +101,12 @@ async def send_otp(phone: str, otp: str) -> bool:
     Returns:
         bool: True if sent successfully
     """
-    print(f"📤 OTP Provider: {OTP_PROVIDER}")
-    
     # If in development mode, skip SMS and just log OTP
     if DEVELOPMENT_MODE:
-        print(f"")
-        print(f"🔓 ==================== DEVELOPMENT MODE ====================")
-        print(f"📱 Phone: {phone}")
-        print(f"🔑 OTP: {otp}")
-        print(f"⏰ Valid for: {OTP_EXPIRY_MINUTES} minutes")
-        print(f"✅ OTP saved to database - Use this code to login!")
-        print(f"🔓 ==========================================================")
-        print(f"")
+        logger.info(
+            "DEVELOPMENT_MODE: OTP not sent, use this code to login",
+            extra={"phone": phone, "otp": otp, "valid_minutes": OTP_EXPIRY_MINUTES}
+        )
         return True
     
     if OTP_PROVIDER == "TWILIO":
@@ -145,17 +127,18 @@ async def send_otp_via_msg91(phone: str, otp: str) -> bool:
         bool: True if sent successfully, False otherwise
     """
     try:
+        # Imported here so app startup does not pay for the HTTP client
+        import httpx
+        
         # Remove + if present and ensure country code
         phone = phone.replace("+", "").replace(" ", "")
         if not phone.startswith("91"):
             phone = "91" + phone
         
-        print(f"🔄 Attempting to send OTP to {phone}")
-        print(f"📱 Using MSG91 Auth Key: {MSG91_AUTH_KEY[:10]}...")
+        logger.debug("Sending OTP via MSG91", extra={"phone": phone})
         
         # If DLT Template ID is configured, use SMS API with DLT
         if MSG91_DLT_TEMPLATE_ID and MSG91_DLT_TEMPLATE_ID != "your_template_id_here":
-            print(f"📋 Using DLT Template ID: {MSG91_DLT_TEMPLATE_ID}")
             
             # Use SMS API with DLT template
             url = "https://api.msg91.com/api/sendhttp.php"
@@ -175,25 +158,24 @@ async def send_otp_via_msg91(phone: str, otp: str) -> bool:
             
             async with httpx.AsyncClient(timeout=10.0) as client:
                 response = await client.get(url, params=params)
-                print(f"📊 MSG91 Response Status: {response.status_code}")
-                print(f"📊 MSG91 Response: {response.text}")
+                logger.debug(
+                    "MSG91 response",
+                    extra={"status_code": response.status_code, "body": response.text}
+                )
                 
                 if response.status_code == 200:
                     response_text = response.text.strip()
                     # Check if response contains error
                     if "error" not in response_text.lower() and "invalid" not in response_text.lower():
-                        print(f"✅ OTP sent successfully to {phone}")
-                        print(f"✅ Message ID: {response_text}")
-                        print(f"📱 Check your phone for the OTP!")
+                        logger.info("OTP sent via MSG91", extra={"phone": phone, "message_id": response_text})
                         return True
                     else:
-                        print(f"❌ Failed: {response_text}")
+                        logger.error("MSG91 rejected OTP", extra={"phone": phone, "body": response_text})
                         return False
         
         # If no DLT template, use OTP API (may fail without DLT in India)
         else:
-            print(f"⚠️  No DLT Template configured")
-            print(f"⚠️  Trying MSG91 OTP API (may require DLT approval)")
+            logger.warning("No DLT template configured, trying MSG91 OTP API (may require DLT approval)")
             
             url = "https://control.msg91.com/api/v5/otp"
             phone_without_code = phone[2:] if phone.startswith("91") else phone
@@ -211,37 +193,32 @@ async def send_otp_via_msg91(phone: str, otp: str) -> bool:
             
             async with httpx.AsyncClient(timeout=10.0) as client:
                 response = await client.post(url, json=payload, headers=headers)
-                print(f"📊 MSG91 OTP API Response Status: {response.status_code}")
-                print(f"📊 MSG91 OTP API Response: {response.text}")
+                logger.debug(
+                    "MSG91 OTP API response",
+                    extra={"status_code": response.status_code, "body": response.text}
+                )
                 
                 if response.status_code == 200:
                     try:
                         response_data = response.json()
                         if response_data.get("type") == "success":
-                            print(f"✅ OTP sent successfully to {phone}")
-                            print(f"📱 Check your phone for the OTP!")
+                            logger.info("OTP sent via MSG91 OTP API", extra={"phone": phone})
                             return True
                     except:
                         pass
         
         # If failed, show instructions
-        print(f"❌ Failed to send OTP")
-        print(f"")
-        print(f"⚠️  TO FIX DLT ERROR:")
-        print(f"⚠️  1. Go to: https://control.msg91.com/")
-        print(f"⚠️  2. Settings → DLT Templates → Add Template")
-        print(f"⚠️  3. Template: 'Your verification code is ##OTP##. Do not share with anyone.'")
-        print(f"⚠️  4. Variable: ##OTP## (Type: Alphanumeric)")
-        print(f"⚠️  5. Wait for approval (1-24 hours)")
-        print(f"⚠️  6. Once approved, add template ID to .env:")
-        print(f"⚠️     MSG91_DLT_TEMPLATE_ID=your_template_id_here")
-        print(f"")
+        logger.error(
+            "Failed to send OTP via MSG91. To fix DLT errors, add the template "
+            "'Your verification code is ##OTP##. Do not share with anyone.' under "
+            "Settings -> DLT Templates at https://control.msg91.com/ and set "
+            "MSG91_DLT_TEMPLATE_ID in .env once approved",
+            extra={"phone": phone}
+        )
         return False
             
-    except Exception as e:
-        print(f"❌ Error sending OTP: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+    except Exception:
+        logger.error("Error sending OTP via MSG91", exc_info=True, extra={"phone": phone})
         return False
 
 def get_otp_expiry() -> datetime:
@@ -0,0 +1,251 @@
+"""
+Provider Import
+Bulk onboarding of providers from a partner CSV, without going through
+/auth/signup once per row.
+
+Rows are validated with the signup rules, initial passwords are bcrypt
+hashed across a process pool, and each batch of PROVIDER_IMPORT_BATCH_SIZE
+rows is written in one transaction: a multi-row INSERT ... ON CONFLICT DO
+NOTHING RETURNING for users, then one INSERT for their provider profiles.
+Phones that are already registered are skipped before hashing.
+
+After every committed batch the last CSV line is saved to
+<csv>.checkpoint, so an interrupted import resumes where it stopped (the
+ON CONFLICT makes replaying a batch harmless either way). Rejected rows go
+to an error CSV with their line number and reason.
+
+Run with: python -m backend.utils.provider_import providers.csv [errors.csv]
+
+CSV columns: phone, name, password, location, service, and optionally
+email, years_of_experience, max_concurrent_jobs
+"""
+import csv
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import Field, ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from ..Database_connection.db import get_engine
+from ..auth.models import User
+from ..auth.schemas import UserSignup
+from ..auth.security import hash_password
+from ..config import PROVIDER_IMPORT_BATCH_SIZE, PROVIDER_IMPORT_WORKERS
+from ..models.providers import Provider
+from .metrics import metrics
+from .provider_search import insert_terms
+
+logger = logging.getLogger(__name__)
+
+ERROR_COLUMNS = ("line", "phone", "error")
+
+
+class ProviderImportRow(UserSignup):
+    """One CSV row: the signup fields plus optional profile details"""
+    user_type: str = Field("provider", pattern="^provider$")
+    email: Optional[str] = Field(None, max_length=255)
+    years_of_experience: Optional[int] = Field(None, ge=0, le=80)
+    max_concurrent_jobs: Optional[int] = Field(None, ge=1, le=50)
+
+
+class ImportReport:
+    __slots__ = ("rows", "inserted", "already_registered", "invalid", "resumed_after", "seconds")
+
+    def __init__(self, resumed_after: int = 0):
+        self.rows = 0
+        self.inserted = 0
+        self.already_registered = 0
+        self.invalid = 0
+        self.resumed_after = resumed_after
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+
+def _clean(record: Dict[str, Optional[str]]) -> Dict[str, str]:
+    # Empty cells mean "not given", so optional columns fall back to their defaults
+    return {
+        key.strip().lower(): value.strip()
+        for key, value in record.items()
+        if key and value is not None and value.strip()
+    }
+
+
+def _read_batches(reader: csv.DictReader, batch_size: int, skip_through: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """(line number, cleaned record) batches, skipping lines up to the checkpoint"""
+    records = ((reader.line_num, _clean(record)) for record in reader)
+    records = ((line, record) for line, record in records if line > skip_through)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(engine: Engine):
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert
+
+
+def _read_checkpoint(path: str) -> int:
+    try:
+        with open(path) as handle:
+            return int(handle.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path: str, line: int) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as handle:
+        handle.write(str(line))
+    os.replace(temporary, path)
+
+
+class ProviderImporter:
+    def __init__(
+        self,
+        engine: Engine,
+        batch_size: int = PROVIDER_IMPORT_BATCH_SIZE,
+        workers: int = PROVIDER_IMPORT_WORKERS
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.insert = _insert(engine)
+
+    def _existing_phones(self, phones: List[str]) -> set:
+        with self.engine.connect() as connection:
+            return set(connection.execute(
+                select(User.phone_number).where(User.phone_number.in_(phones))
+            ).scalars())
+
+    def _write_batch(self, rows: List[ProviderImportRow], hashes: List[str]) -> List[str]:
+        """Insert users and their profiles in one transaction; returns the phones actually inserted"""
+        user_rows = [
+            {
+                "phone_number": row.phone,
+                "password_hash": password_hash,
+                "name": row.name,
+                "email_id": row.email,
+                "role": "provider",
+            }
+            for row, password_hash in zip(rows, hashes)
+        ]
+        with self.engine.begin() as connection:
+            inserted = dict(connection.execute(
+                self.insert(User)
+                .values(user_rows)
+                .on_conflict_do_nothing(index_elements=["phone_number"])
+                .returning(User.phone_number, User.id)
+            ).all())
+            profiles = [
+                {
+                    "user_id": inserted[row.phone],
+                    "location_name": row.location,
+                    # Same bio format as signup; dispatch reads the service back out of it
+                    "bio": f"Experienced {row.service} in {row.location}" if row.service and row.location else None,
+                    "years_of_experience": row.years_of_experience,
+                    "max_concurrent_jobs": row.max_concurrent_jobs,
+                    "average_rating": 0,
+                    "jobs_completed": 0,
+                    "is_verified": False,
+                }
+                for row in rows
+                if row.phone in inserted
+            ]
+            if profiles:
+                connection.execute(self.insert(Provider).values(profiles).on_conflict_do_nothing())
+                insert_terms(connection, [
+                    (profile["user_id"], row.name, profile["bio"], profile["location_name"])
+                    for row, profile in zip((row for row in rows if row.phone in inserted), profiles)
+                ])
+        return list(inserted)
+
+    def run(self, csv_path: str, errors_path: Optional[str] = None) -> ImportReport:
+        checkpoint_path = f"{csv_path}.checkpoint"
+        errors_path = errors_path or f"{csv_path}.errors.csv"
+        resume_after = _read_checkpoint(checkpoint_path)
+        report = ImportReport(resumed_after=resume_after)
+        started = time.perf_counter()
+        seen_phones = set()
+
+        with open(csv_path, newline="", encoding="utf-8-sig") as source, \
+                open(errors_path, "a" if resume_after else "w", newline="", encoding="utf-8") as errors_file, \
+                ProcessPoolExecutor(max_workers=self.workers) as pool:
+            errors = csv.writer(errors_file)
+            if not resume_after:
+                errors.writerow(ERROR_COLUMNS)
+
+            def reject(line: int, phone: Optional[str], message: str) -> None:
+                errors.writerow((line, phone or "", message))
+
+            for batch in _read_batches(csv.DictReader(source), self.batch_size, resume_after):
+                report.rows += len(batch)
+                valid: List[Tuple[int, ProviderImportRow]] = []
+                for line, record in batch:
+                    try:
+                        row = ProviderImportRow(**record)
+                    except ValidationError as error:
+                        report.invalid += 1
+                        reject(line, record.get("phone"), _validation_message(error))
+                        continue
+                    if row.phone in seen_phones:
+                        report.invalid += 1
+                        reject(line, row.phone, "Duplicate phone number in file")
+                        continue
+                    seen_phones.add(row.phone)
+                    valid.append((line, row))
+
+                # Hashing is the expensive part: leave out phones that are already registered
+                existing = self._existing_phones([row.phone for _, row in valid]) if valid else set()
+                new_rows = [(line, row) for line, row in valid if row.phone not in existing]
+                for line, row in valid:
+                    if row.phone in existing:
+                        report.already_registered += 1
+                        reject(line, row.phone, "Phone number already registered")
+
+                if new_rows:
+                    chunksize = max(1, len(new_rows) // (self.workers * 4))
+                    hashes = list(pool.map(hash_password, [row.password for _, row in new_rows], chunksize=chunksize))
+                    inserted = set(self._write_batch([row for _, row in new_rows], hashes))
+                    report.inserted += len(inserted)
+                    # Registered by someone else between the lookup and the insert
+                    for line, row in new_rows:
+                        if row.phone not in inserted:
+                            report.already_registered += 1
+                            reject(line, row.phone, "Phone number already registered")
+
+                errors_file.flush()
+                _write_checkpoint(checkpoint_path, batch[-1][0])
+                logger.info("Provider import batch committed", extra={"through_line": batch[-1][0], **report.as_dict()})
+
+        # Finished: a re-run starts from the top again
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        report.seconds = round(time.perf_counter() - started, 2)
+        metrics.inc("providers_imported_total", report.inserted)
+        logger.info("Provider import finished", extra=report.as_dict())
+        return report
+
+
+def import_providers(csv_path: str, errors_path: Optional[str] = None, engine: Optional[Engine] = None) -> ImportReport:
+    """Import every provider in `csv_path` (resuming from its checkpoint, if any)"""
+    return ProviderImporter(engine or get_engine()).run(csv_path, errors_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python -m backend.utils.provider_import providers.csv [errors.csv]")
+    result = import_providers(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Imported {result.inserted} providers in {result.seconds}s: {result.as_dict()}")
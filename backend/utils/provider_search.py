@@ -0,0 +1,193 @@
+"""
+Provider Search
+Maintains provider_search_terms (script-neutral keys for every word of a
+provider's name, service, bio and locality) and turns a customer query in
+English, Hindi or Marathi into one indexed condition on it.
+
+A query word matches a provider word when its latin key occurs in the
+provider's ("umb" -> "plumber", "pur" -> "नागपूर", stored as "nagpur"; keys
+under three letters only as a prefix, "pu" -> "pune"), or when its
+consonant skeleton is a prefix of the provider's ("plumber" -> "प्लंबर",
+stored as "plambar"). Skeletons of fewer than three consonants are too
+ambiguous ("pan" and "pune" are both "pn") and only match through the
+latin key. Substring lookups use the pg_trgm index when the server has the
+extension (see Database_connection.schema).
+
+When that finds nothing, fuzzy_match retries with the closest spellings of
+each word from the in-memory vocabulary (utils.fuzzy_search).
+
+Reindex every provider by hand with: python -m backend.utils.provider_search
+"""
+import logging
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import and_, case, delete, exists, func, insert, or_, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from ..Database_connection.db import get_engine
+from ..auth.models import User
+from ..models.providers import Provider
+from ..models.provider_search_terms import ProviderSearchTerm
+from .dispatch import provider_service
+from .fuzzy_search import fuzzy_vocabulary
+from .transliteration import search_keys, skeleton_key
+
+logger = logging.getLogger(__name__)
+
+NAME = "name"
+SERVICE = "service"
+BIO = "bio"
+LOCALITY = "locality"
+ALL_FIELDS = (NAME, SERVICE, BIO, LOCALITY)
+
+# Shorter query skeletons are not used ("pan" would find "pune")
+MIN_SKELETON_LENGTH = 3
+
+# Shorter latin keys only match as a prefix: trigram indexes cannot serve
+# them, and "a" would match nearly every provider
+MIN_INFIX_LENGTH = 3
+
+KEY_LENGTH = ProviderSearchTerm.latin.type.length
+
+
+def term_rows(provider_id: int, name: Optional[str], bio: Optional[str], location_name: Optional[str]) -> List[dict]:
+    """provider_search_terms rows for one provider, one per distinct (field, word)"""
+    rows = {}
+    for field, text in ((NAME, name), (SERVICE, provider_service(bio)), (BIO, bio), (LOCALITY, location_name)):
+        for latin, skeleton in search_keys(text or ""):
+            rows.setdefault((field, latin[:KEY_LENGTH]), skeleton[:KEY_LENGTH])
+    return [
+        {"provider_id": provider_id, "field": field, "latin": latin, "skeleton": skeleton}
+        for (field, latin), skeleton in rows.items()
+    ]
+
+
+def index_provider(
+    db: Session, provider_id: int, name: Optional[str], bio: Optional[str], location_name: Optional[str]
+) -> None:
+    """Replace the provider's search terms in the caller's transaction (the caller commits)"""
+    db.execute(delete(ProviderSearchTerm).where(ProviderSearchTerm.provider_id == provider_id))
+    rows = term_rows(provider_id, name, bio, location_name)
+    if rows:
+        db.execute(insert(ProviderSearchTerm), rows)
+        fuzzy_vocabulary.add_terms(row["latin"] for row in rows)
+
+
+def unindex_provider(db: Session, provider_id: int) -> None:
+    """Drop the provider's search terms in the caller's transaction (profile deleted; the caller commits)"""
+    db.execute(delete(ProviderSearchTerm).where(ProviderSearchTerm.provider_id == provider_id))
+
+
+def insert_terms(connection: Connection, providers: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]]) -> None:
+    """Bulk-index newly created providers given as (id, name, bio, location_name)"""
+    rows = [row for provider in providers for row in term_rows(*provider)]
+    if rows:
+        connection.execute(insert(ProviderSearchTerm), rows)
+
+
+def match_condition(text: Optional[str], fields: Tuple[str, ...] = ALL_FIELDS):
+    """
+    Condition on User.id: every word of `text` matches a search term of the
+    provider in one of `fields`. None when `text` has no searchable words.
+    """
+    words = search_keys(text or "")
+    if not words:
+        return None
+    conditions = []
+    for latin, skeleton in words:
+        key = latin[:KEY_LENGTH]
+        if len(key) >= MIN_INFIX_LENGTH:
+            matches = [ProviderSearchTerm.latin.contains(key, autoescape=True)]
+        else:
+            matches = [ProviderSearchTerm.latin.startswith(key, autoescape=True)]
+        if len(skeleton) >= MIN_SKELETON_LENGTH:
+            matches.append(ProviderSearchTerm.skeleton.startswith(skeleton[:KEY_LENGTH], autoescape=True))
+        conditions.append(exists().where(
+            ProviderSearchTerm.provider_id == User.id,
+            ProviderSearchTerm.field.in_(fields),
+            or_(*matches)
+        ))
+    return and_(*conditions)
+
+
+def fuzzy_match(text: Optional[str], fields: Tuple[str, ...] = ALL_FIELDS):
+    """
+    Typo-tolerant match_condition: every word of `text` is replaced by its
+    closest known spellings ("plumer" -> "plumber"). Returns (condition,
+    edits), edits being the provider's total edit distance to sort by, or
+    None when some word has no spelling within reach.
+    """
+    words = search_keys(text or "")
+    if not words:
+        return None
+    conditions = []
+    edits = []
+    for latin, _ in words:
+        corrections = fuzzy_vocabulary.lookup(latin[:KEY_LENGTH])
+        if not corrections:
+            return None
+        by_latin = {term: distance for distance, term in corrections}
+        # The corrections' skeletons carry the match over to the other script
+        # ("plumer" -> "plumber" -> "प्लंबर")
+        by_skeleton = {}
+        for distance, term in corrections:
+            skeleton = skeleton_key(term)
+            if len(skeleton) >= MIN_SKELETON_LENGTH:
+                by_skeleton.setdefault(skeleton, distance)
+        matches = [ProviderSearchTerm.latin.in_(list(by_latin))]
+        distance = case(by_latin, value=ProviderSearchTerm.latin)
+        if by_skeleton:
+            matches.append(ProviderSearchTerm.skeleton.in_(list(by_skeleton)))
+            distance = func.coalesce(distance, case(by_skeleton, value=ProviderSearchTerm.skeleton))
+        where = (
+            ProviderSearchTerm.provider_id == User.id,
+            ProviderSearchTerm.field.in_(fields),
+            or_(*matches)
+        )
+        conditions.append(exists().where(*where))
+        edits.append(select(func.min(distance)).where(*where).scalar_subquery())
+    return and_(*conditions), sum(edits)
+
+
+def backfill_provider_search(engine: Engine, reindex: bool = False, batch_size: int = 500) -> int:
+    """
+    Index providers that have no search terms yet (every provider with
+    `reindex`, e.g. after the transliteration rules change); returns
+    providers indexed. Providers without a profile (deleted) are not
+    indexed, and `reindex` drops any terms they still have.
+    """
+    indexed = 0
+    last_id = 0
+    if reindex:
+        with engine.begin() as connection:
+            connection.execute(delete(ProviderSearchTerm).where(
+                ~exists().where(Provider.user_id == ProviderSearchTerm.provider_id)
+            ))
+    while True:
+        with engine.begin() as connection:
+            query = (
+                select(User.id, User.name, Provider.bio, Provider.location_name)
+                .join(Provider, Provider.user_id == User.id)
+                .where(User.role == "provider", User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            )
+            if not reindex:
+                query = query.where(~exists().where(ProviderSearchTerm.provider_id == User.id))
+            providers = connection.execute(query).all()
+            if not providers:
+                break
+            last_id = providers[-1].id
+            if reindex:
+                connection.execute(delete(ProviderSearchTerm).where(
+                    ProviderSearchTerm.provider_id.in_([provider.id for provider in providers])
+                ))
+            insert_terms(connection, providers)
+            indexed += len(providers)
+
+    if indexed:
+        logger.info("Indexed provider search terms", extra={"providers": indexed})
+    return indexed
+
+
+if __name__ == "__main__":
+    print(f"Reindexed {backfill_provider_search(get_engine(), reindex=True)} providers")
@@ -0,0 +1,136 @@
+"""
+SQLAlchemy Query Instrumentation
+Tracks per-request query counts, DB time, slow statements and probable N+1 patterns
+"""
+import time
+import logging
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..config import SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD, SLOWEST_STATEMENTS_KEPT
+
+logger = logging.getLogger(__name__)
+
+_STATEMENT_PREVIEW_LENGTH = 200
+
+
+class RequestQueryStats:
+    """Query statistics collected for a single HTTP request"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.total_ms = 0.0
+        self.slowest: List[Tuple[float, str]] = []
+        self.statement_counts: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.query_count += 1
+        self.total_ms += elapsed_ms
+        self.statement_counts[statement] = self.statement_counts.get(statement, 0) + 1
+
+        # Keep only the N slowest statements, sorted slowest first
+        if len(self.slowest) < SLOWEST_STATEMENTS_KEPT or elapsed_ms > self.slowest[-1][0]:
+            self.slowest.append((elapsed_ms, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_STATEMENTS_KEPT:]
+
+    def repeated_statements(self) -> List[Tuple[str, int]]:
+        """Statements executed at least N_PLUS_ONE_THRESHOLD times (probable N+1 queries)"""
+        return [
+            (statement, count)
+            for statement, count in self.statement_counts.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def server_timing(self) -> str:
+        """Render totals as a Server-Timing header value"""
+        entries = [f'db;dur={self.total_ms:.1f};desc="{self.query_count} queries"']
+        if self.slowest:
+            entries.append(f"db-slowest;dur={self.slowest[0][0]:.1f}")
+        return ", ".join(entries)
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _preview(statement: str) -> str:
+    """Collapse whitespace and truncate a statement for logging"""
+    flat = " ".join(statement.split())
+    if len(flat) > _STATEMENT_PREVIEW_LENGTH:
+        return flat[:_STATEMENT_PREVIEW_LENGTH] + "..."
+    return flat
+
+
+def _parameter_shape(parameters, executemany: bool) -> str:
+    """Describe bound parameters by type only, never by value"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameters[0] if parameters else None
+        return f"{len(parameters)} x {_parameter_shape(first, False)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, not conn.info: a failed statement never
+    # reaches after_cursor_execute and would leave a stale entry on the
+    # pooled connection
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_start_time) * 1000
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            elapsed_ms,
+            _preview(statement),
+            _parameter_shape(parameters, executemany),
+        )
+
+
+def install_query_instrumentation() -> None:
+    """Hook cursor-execute events on every SQLAlchemy engine (idempotent)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def begin_request_stats():
+    """Start collecting query stats for the current request context"""
+    stats = RequestQueryStats()
+    token = _current_stats.set(stats)
+    return stats, token
+
+
+def end_request_stats(token) -> None:
+    """Stop collecting query stats for the current request context"""
+    _current_stats.reset(token)
+
+
+def report_request_stats(stats: RequestQueryStats, method: str, path: str) -> None:
+    """Log probable N+1 patterns and a per-request summary"""
+    for statement, count in stats.repeated_statements():
+        logger.warning(
+            "Probable N+1 on %s %s: statement executed %d times: %s",
+            method,
+            path,
+            count,
+            _preview(statement),
+        )
+
+    logger.debug(
+        "%s %s issued %d queries in %.1f ms",
+        method,
+        path,
+        stats.query_count,
+        stats.total_ms,
+    )
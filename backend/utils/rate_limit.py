@@ -0,0 +1,232 @@
+"""
+Rate Limiting and Load Shedding Middleware
+Token buckets per authenticated user and per client IP, with tighter
+budgets for expensive or abuse-prone routes, plus a concurrency cap that
+sheds load with 503 while the database pool is saturated
+"""
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .metrics import metrics
+from ..auth.security import decode_access_token
+from ..config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_USER_RATE,
+    RATE_LIMIT_USER_BURST,
+    RATE_LIMIT_IP_RATE,
+    RATE_LIMIT_IP_BURST,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_TRUST_FORWARDED,
+    LOAD_SHED_POOL_WAIT_MS,
+    LOAD_SHED_MAX_CONCURRENCY,
+    LOAD_SHED_RETRY_AFTER_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# (method or "*", path prefix, rate per second, burst), first match wins.
+# Applied per user (or per IP when anonymous) on top of the global buckets.
+ROUTE_BUDGETS: List[Tuple[str, str, float, float]] = [
+    ("GET", "/dashboard/customer/providers", 1.0, 10),  # aggregates over all reviews
+    ("POST", "/dashboard/customer/create-booking", 0.2, 5),
+    ("POST", "/dashboard/provider/batch-", 0.5, 5),
+    ("POST", "/auth/login", 0.2, 10),
+    ("POST", "/auth/signup", 0.1, 10),
+]
+
+# Never limited or shed: probes and monitoring
+EXEMPT_PATHS = ("/", "/health", "/metrics")
+
+MAX_TRACKED_BUCKETS = 100_000
+
+
+def route_budget(method: str, path: str) -> Optional[Tuple[str, float, float]]:
+    for budget_method, prefix, rate, burst in ROUTE_BUDGETS:
+        if (budget_method == "*" or budget_method == method) and path.startswith(prefix):
+            return prefix, rate, burst
+    return None
+
+
+Bucket = Tuple[str, float, float]  # (key, rate per second, burst)
+
+
+class InMemoryBucketStore:
+    """Token buckets in this process, least recently used evicted past a size bound"""
+
+    def __init__(self, max_buckets: int = MAX_TRACKED_BUCKETS):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_buckets = max_buckets
+
+    async def take(self, buckets: List[Bucket]) -> Tuple[bool, float]:
+        """
+        Take one token from every bucket, or from none when any is empty;
+        returns (allowed, seconds until all have a token)
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, rate, burst in buckets:
+                tokens, updated = self._buckets.pop(key, (burst, now))
+                levels.append(min(burst, tokens + (now - updated) * rate))
+            allowed = all(tokens >= 1 for tokens in levels)
+            retry_after = 0.0
+            for (key, rate, _), tokens in zip(buckets, levels):
+                if allowed:
+                    tokens -= 1
+                elif tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+                self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every worker through Redis (atomic Lua script)
+
+    Falls back to the in-memory store while Redis is unreachable, so an
+    outage degrades to per-process limits instead of failing requests. A
+    request's buckets are checked and debited in one script call, so on
+    Redis Cluster they would all need to hash to one slot.
+    """
+
+    # KEYS: the buckets; ARGV: now, then rate and burst of each bucket
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local levels = {}
+    local allowed = 1
+    local retry_after = 0
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[i * 2])
+        local burst = tonumber(ARGV[i * 2 + 1])
+        local state = redis.call('HMGET', key, 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or burst
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        levels[i] = tokens
+        if tokens < 1 then
+            allowed = 0
+            retry_after = math.max(retry_after, (1 - tokens) / rate)
+        end
+    end
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[i * 2])
+        local burst = tonumber(ARGV[i * 2 + 1])
+        redis.call('HSET', key, 'tokens', levels[i] - allowed, 'updated', now)
+        redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+    end
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # optional dependency, only with RATE_LIMIT_REDIS_URL
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._fallback = InMemoryBucketStore()
+
+    async def take(self, buckets: List[Bucket]) -> Tuple[bool, float]:
+        args = [time.time()]
+        for _, rate, burst in buckets:
+            args.extend((rate, burst))
+        try:
+            allowed, retry_after = await self._script(keys=[f"ratelimit:{key}" for key, _, _ in buckets], args=args)
+        except Exception:
+            metrics.inc("rate_limit_store_errors_total")
+            logger.warning("Rate limit store unavailable, using in-process buckets", exc_info=True)
+            return await self._fallback.take(buckets)
+        return bool(allowed), float(retry_after)
+
+
+def _client_ip(scope: Scope, headers: Headers) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user_id(headers: Headers) -> Optional[int]:
+    """User id from a valid bearer token, without a database lookup"""
+    authorization = headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_access_token(authorization[7:])
+    return payload.get("user_id") if payload else None
+
+
+class RateLimitMiddleware:
+    """
+    Per request, in order:
+
+    - load shedding: while the smoothed DB pool wait is above
+      LOAD_SHED_POOL_WAIT_MS, at most LOAD_SHED_MAX_CONCURRENCY requests run
+      at once and the rest get 503 with Retry-After
+    - per-IP bucket (RATE_LIMIT_IP_*), always
+    - per-user bucket (RATE_LIMIT_USER_*) when the bearer token is valid
+    - the route's budget from ROUTE_BUDGETS, keyed by user (or IP)
+
+    Any empty bucket answers 429 with Retry-After, and then no bucket is
+    debited.
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.store = RedisBucketStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else InMemoryBucketStore()
+        self.in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= LOAD_SHED_MAX_CONCURRENCY and metrics.gauge("db_pool_wait_ewma_ms") > LOAD_SHED_POOL_WAIT_MS:
+            metrics.inc("load_shed_total")
+            await self._reject(scope, receive, send, 503, "Server is busy, please retry shortly", LOAD_SHED_RETRY_AFTER_SECONDS)
+            return
+
+        headers = Headers(scope=scope)
+        ip = _client_ip(scope, headers)
+        user_id = _user_id(headers)
+        identity = f"user:{user_id}" if user_id is not None else f"ip:{ip}"
+
+        buckets: List[Bucket] = [(f"ip:{ip}", RATE_LIMIT_IP_RATE, RATE_LIMIT_IP_BURST)]
+        if user_id is not None:
+            buckets.append((identity, RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST))
+        budget = route_budget(scope["method"], scope["path"])
+        if budget is not None:
+            prefix, rate, burst = budget
+            buckets.append((f"{identity}:{scope['method']}:{prefix}", rate, burst))
+
+        # All or nothing: a request denied by one bucket costs the others nothing
+        allowed, retry_after = await self.store.take(buckets)
+        if not allowed:
+            metrics.inc("rate_limited_total")
+            await self._reject(scope, receive, send, 429, "Too many requests", retry_after)
+            return
+
+        self.in_flight += 1
+        metrics.set_gauge("requests_in_flight", self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("requests_in_flight", self.in_flight)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, retry_after: float) -> None:
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
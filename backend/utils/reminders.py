@@ -0,0 +1,244 @@
+"""
+Provider Reminders
+In-process min-heap of reminder times for upcoming scheduled bookings. Only
+bookings whose reminder falls within REMINDER_HORIZON_HOURS are held in
+memory (loaded through ix_bookings_reminder_due and refreshed every half
+horizon), so memory stays bounded however many future bookings exist.
+
+Every due batch is claimed with one UPDATE ... WHERE reminder_sent_at IS NULL
+RETURNING before anything is sent, so a restart, a reload or a second worker
+never reminds a provider twice.
+"""
+import time
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+from ..Database_connection.db import SessionLocal
+from ..auth.models import User
+from ..config import REMINDER_LEAD_MINUTES, REMINDER_HORIZON_HOURS, REMINDER_BATCH_SIZE
+from ..models.bookings import Booking
+from .metrics import metrics
+from .scheduling import BLOCKING_STATUSES, to_epoch
+from .whatsapp_service import notify_provider_upcoming_booking
+
+logger = logging.getLogger(__name__)
+
+# Back-off after an unexpected error in the scheduler loop
+ERROR_RETRY_SECONDS = 5
+
+
+def claim_reminders(booking_ids: List[int]) -> List[Row]:
+    """
+    Mark the still-pending reminders among `booking_ids` as sent and return
+    what is needed to send them. Bookings that were cancelled, rejected,
+    already reminded (by another worker or before a restart) or have already
+    started are skipped.
+    """
+    now = datetime.now(timezone.utc)
+    statement = (
+        update(Booking)
+        .where(
+            Booking.id.in_(booking_ids),
+            Booking.reminder_sent_at.is_(None),
+            Booking.status.in_(BLOCKING_STATUSES),
+            Booking.scheduled_start > now
+        )
+        .values(reminder_sent_at=now)
+        .returning(
+            Booking.id,
+            Booking.provider_phone,
+            Booking.service,
+            Booking.scheduled_date,
+            Booking.scheduled_time,
+            Booking.status,
+            select(User.name).where(User.phone_number == Booking.customer_phone).scalar_subquery().label("customer_name"),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db = SessionLocal()
+    try:
+        rows = db.execute(statement).all()
+        db.commit()
+        return rows
+    finally:
+        db.close()
+
+
+class ReminderScheduler:
+    """
+    Heap of (fire_at, booking_id) plus a booking_id -> fire_at map. Cancelling
+    or rescheduling only updates the map; heap entries that no longer match
+    it are dropped when they surface (lazy deletion), keeping every
+    operation O(log n).
+
+    schedule() and cancel() are called from request handlers on the event
+    loop; the loop task wakes up whenever an earlier reminder is added.
+    """
+
+    def __init__(
+        self,
+        lead_minutes: float = REMINDER_LEAD_MINUTES,
+        horizon_hours: float = REMINDER_HORIZON_HOURS,
+        batch_size: int = REMINDER_BATCH_SIZE
+    ):
+        self.lead = timedelta(minutes=lead_minutes)
+        self.horizon = horizon_hours * 3600
+        self.batch_size = batch_size
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}
+        self._loaded_until = 0.0  # reminders firing later are picked up by the next reload
+        self._next_reload = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, booking_id: int, scheduled_start: Optional[datetime]) -> None:
+        """Remind the provider REMINDER_LEAD_MINUTES before `scheduled_start`"""
+        if scheduled_start is None:
+            return
+        fire_at = to_epoch(scheduled_start - self.lead)
+        if fire_at > self._loaded_until or self._due.get(booking_id) == fire_at:
+            return
+        self._due[booking_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, booking_id))
+        metrics.set_gauge("reminders_scheduled", len(self._due))
+        if self._wakeup is not None and self._heap[0] == (fire_at, booking_id):
+            self._wakeup.set()
+
+    def cancel(self, booking_id: int) -> None:
+        """Forget a booking's reminder (its heap entry becomes stale)"""
+        if self._due.pop(booking_id, None) is None:
+            return
+        metrics.set_gauge("reminders_scheduled", len(self._due))
+        # Rebuild once stale entries dominate, so cancellations cannot grow the heap
+        if len(self._heap) > 2 * len(self._due) + 1024:
+            self._heap = [(fire_at, booking_id) for booking_id, fire_at in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def next_fire_at(self) -> Optional[float]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[int]:
+        """Up to batch_size booking ids whose reminder time has come"""
+        booking_ids = []
+        while self._heap and self._heap[0][0] <= now and len(booking_ids) < self.batch_size:
+            fire_at, booking_id = heapq.heappop(self._heap)
+            if self._due.get(booking_id) == fire_at:
+                del self._due[booking_id]
+                booking_ids.append(booking_id)
+        metrics.set_gauge("reminders_scheduled", len(self._due))
+        return booking_ids
+
+    def _fetch_upcoming(self, loaded_until: float) -> List[Tuple[int, datetime]]:
+        now = datetime.now(timezone.utc)
+        window_end = datetime.fromtimestamp(loaded_until, timezone.utc) + self.lead
+        db = SessionLocal()
+        try:
+            return db.execute(
+                select(Booking.id, Booking.scheduled_start).where(
+                    Booking.reminder_sent_at.is_(None),
+                    Booking.scheduled_start > now,
+                    Booking.scheduled_start <= window_end,
+                    Booking.status.in_(BLOCKING_STATUSES)
+                )
+            ).all()
+        finally:
+            db.close()
+
+    async def load(self) -> int:
+        """Merge every unsent reminder due within the horizon from the database"""
+        loaded_until = time.time() + self.horizon
+        # Extend the window first: bookings created while the query runs are
+        # scheduled by their request, and the merge below skips duplicates
+        self._loaded_until = max(self._loaded_until, loaded_until)
+        rows = await run_in_threadpool(self._fetch_upcoming, loaded_until)
+        # The heap is only touched on the event loop
+        for booking_id, scheduled_start in rows:
+            self.schedule(booking_id, scheduled_start)
+        logger.debug("Reminders loaded", extra={"loaded": len(rows), "scheduled": len(self._due)})
+        return len(rows)
+
+    def start(self) -> None:
+        """Start the scheduler loop (call from inside the event loop)"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._next_reload = 0.0
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                await asyncio.sleep(ERROR_RETRY_SECONDS)
+
+    async def _tick(self) -> None:
+        now = time.time()
+        if now >= self._next_reload:
+            await self.load()
+            self._next_reload = now + self.horizon / 2
+
+        booking_ids = self.pop_due(now)
+        if booking_ids:
+            await self._send(booking_ids)
+            return
+
+        next_fire_at = self.next_fire_at()
+        timeout = self._next_reload - now
+        if next_fire_at is not None:
+            timeout = min(timeout, next_fire_at - now)
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _send(self, booking_ids: List[int]) -> None:
+        rows = await run_in_threadpool(claim_reminders, booking_ids)
+        results = await asyncio.gather(
+            *[
+                notify_provider_upcoming_booking(
+                    provider_phone=row.provider_phone,
+                    customer_name=row.customer_name or "Customer",
+                    service=row.service,
+                    scheduled_date=row.scheduled_date,
+                    scheduled_time=row.scheduled_time,
+                    booking_status=row.status.value
+                )
+                for row in rows
+            ],
+            return_exceptions=True
+        )
+        sent = sum(1 for result in results if result is True)
+        metrics.inc("reminders_sent_total", sent)
+        metrics.inc("reminders_failed_total", len(rows) - sent)
+        metrics.inc("reminders_skipped_total", len(booking_ids) - len(rows))
+        logger.info(
+            "Provider reminders processed",
+            extra={"due": len(booking_ids), "claimed": len(rows), "sent": sent}
+        )
+
+
+reminder_scheduler = ReminderScheduler()
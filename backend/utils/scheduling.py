@@ -0,0 +1,226 @@
+"""
+Scheduling
+Parses the customer-facing scheduled_date/scheduled_time strings into UTC
+timestamps, indexes a provider's booked intervals for O(log n) overlap
+checks, and computes free slots from the provider's weekly availability
+
+Backfill existing bookings by hand with: python -m backend.utils.scheduling
+"""
+import bisect
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..Database_connection.db import get_engine
+from ..config import SCHEDULE_TIMEZONE, BOOKING_SLOT_MINUTES, DEFAULT_WORKING_HOURS
+from ..models.bookings import Booking, BookingStatus
+from ..models.booking_history import BookingHistory
+from ..models.provider_availability import ProviderAvailability
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_TZ = ZoneInfo(SCHEDULE_TIMEZONE)
+SLOT_LENGTH = timedelta(minutes=BOOKING_SLOT_MINUTES)
+
+# Bookings in these states hold their slot
+BLOCKING_STATUSES = (BookingStatus.PENDING, BookingStatus.ACCEPTED)
+
+# Upper bound on a booking's length, so overlap lookups stay an index range
+# scan on (provider_phone, scheduled_start) instead of reading every earlier slot
+MAX_BOOKING_LENGTH = timedelta(hours=12)
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y")
+TIME_FORMATS = ("%I:%M %p", "%I:%M%p", "%H:%M", "%H:%M:%S", "%I %p")
+
+# Namespace for pg_advisory_xact_lock(namespace, provider_id)
+_SCHEDULE_LOCK_NAMESPACE = 41
+
+
+def _parse(value: str, formats: Tuple[str, ...]) -> Optional[datetime]:
+    for fmt in formats:
+        try:
+            return datetime.strptime(value.strip().upper(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_schedule(scheduled_date: Optional[str], scheduled_time: Optional[str]) -> Optional[datetime]:
+    """'2030-01-31' + '09:00 AM' (local time) -> aware UTC datetime, or None if unparseable"""
+    if not scheduled_date or not scheduled_time:
+        return None
+    day = _parse(scheduled_date, DATE_FORMATS)
+    clock = _parse(scheduled_time, TIME_FORMATS)
+    if day is None or clock is None:
+        return None
+    local = datetime.combine(day.date(), clock.time(), tzinfo=SCHEDULE_TZ)
+    return local.astimezone(timezone.utc)
+
+
+def format_slot(start: datetime) -> Tuple[str, str]:
+    """UTC datetime -> (scheduled_date, scheduled_time) strings as customers send them"""
+    local = start.astimezone(SCHEDULE_TZ)
+    return local.strftime("%Y-%m-%d"), local.strftime("%I:%M %p")
+
+
+def to_epoch(value: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals sorted by start, with a running maximum
+    of the ends: every interval starting before `end` is a prefix found by
+    bisection, and the prefix's largest end says whether any of them reaches
+    past `start`. Overlap checks are O(log n) even if stored intervals overlap
+    each other (legacy double bookings).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[float, float]] = ()):
+        ordered = sorted(intervals)
+        self._starts = [start for start, _ in ordered]
+        self._ends = [end for _, end in ordered]
+        self._max_ends = list(accumulate(self._ends, max))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: float, end: float) -> bool:
+        candidates = bisect.bisect_left(self._starts, end)
+        return candidates > 0 and self._max_ends[candidates - 1] > start
+
+
+def _parse_hours(hours: str) -> Tuple[time, time]:
+    start, end = hours.split("-")
+    return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+
+
+def load_weekly_windows(db: Session, provider_id: int) -> Dict[int, List[Tuple[time, time]]]:
+    """weekday -> sorted working windows; DEFAULT_WORKING_HOURS daily when none are set"""
+    rows = db.query(
+        ProviderAvailability.weekday, ProviderAvailability.start_time, ProviderAvailability.end_time
+    ).filter(ProviderAvailability.provider_id == provider_id).all()
+    if not rows:
+        default = _parse_hours(DEFAULT_WORKING_HOURS)
+        return {weekday: [default] for weekday in range(7)}
+
+    windows: Dict[int, List[Tuple[time, time]]] = {}
+    for weekday, start, end in rows:
+        windows.setdefault(weekday, []).append((start, end))
+    for day_windows in windows.values():
+        day_windows.sort()
+    return windows
+
+
+def _busy_query(db: Session, provider_phone: str, start: datetime, end: datetime):
+    return db.query(Booking.scheduled_start, Booking.scheduled_end).filter(
+        Booking.provider_phone == provider_phone,
+        Booking.status.in_(BLOCKING_STATUSES),
+        Booking.scheduled_start > start - MAX_BOOKING_LENGTH,
+        Booking.scheduled_start < end,
+        Booking.scheduled_end > start
+    )
+
+
+def load_busy_index(db: Session, provider_phone: str, start: datetime, end: datetime) -> IntervalIndex:
+    """Index of the provider's slot-holding bookings that touch [start, end)"""
+    return IntervalIndex(
+        (to_epoch(booked_start), to_epoch(booked_end))
+        for booked_start, booked_end in _busy_query(db, provider_phone, start, end)
+    )
+
+
+def lock_provider_schedule(db: Session, provider_id: int) -> None:
+    """Serialize booking creation per provider until the caller's transaction ends (PostgreSQL)"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :provider_id)"),
+            {"namespace": _SCHEDULE_LOCK_NAMESPACE, "provider_id": provider_id}
+        )
+
+
+def slot_taken(db: Session, provider_phone: str, start: datetime, end: datetime) -> bool:
+    """Whether an active booking of the provider overlaps [start, end)"""
+    return db.query(_busy_query(db, provider_phone, start, end).exists()).scalar()
+
+
+def free_slots(
+    windows: Dict[int, List[Tuple[time, time]]],
+    busy: IntervalIndex,
+    first_day: date,
+    days: int,
+    now: Optional[datetime] = None
+) -> List[datetime]:
+    """Start times (UTC) of every free BOOKING_SLOT_MINUTES slot inside the working windows"""
+    now = now or datetime.now(timezone.utc)
+    slots = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for window_start, window_end in windows.get(day.weekday(), ()):
+            slot = datetime.combine(day, window_start, tzinfo=SCHEDULE_TZ)
+            window_close = datetime.combine(day, window_end, tzinfo=SCHEDULE_TZ)
+            while slot + SLOT_LENGTH <= window_close:
+                start = slot.astimezone(timezone.utc)
+                if start >= now and not busy.overlaps(start.timestamp(), (start + SLOT_LENGTH).timestamp()):
+                    slots.append(start)
+                slot += SLOT_LENGTH
+    return slots
+
+
+def backfill_schedule_timestamps(engine: Engine, batch_size: int = 500) -> int:
+    """
+    Fill scheduled_start/scheduled_end from the date/time strings where still
+    NULL, in bookings and booking_history; returns rows updated. Strings
+    that do not parse are left NULL and counted in the log.
+    """
+    updated = 0
+    unparseable = 0
+    for model in (Booking, BookingHistory):
+        table = model.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(scheduled_start=bindparam("start"), scheduled_end=bindparam("end"))
+        )
+        last_id = 0
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    select(table.c.id, table.c.scheduled_date, table.c.scheduled_time)
+                    .where(
+                        table.c.id > last_id,
+                        table.c.scheduled_start.is_(None),
+                        table.c.scheduled_date.isnot(None),
+                        func.length(table.c.scheduled_date) > 0
+                    )
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                params = []
+                for row in rows:
+                    start = parse_schedule(row.scheduled_date, row.scheduled_time)
+                    if start is None:
+                        unparseable += 1
+                        continue
+                    params.append({"row_id": row.id, "start": start, "end": start + SLOT_LENGTH})
+                if params:
+                    connection.execute(statement, params)
+                    updated += len(params)
+
+    if updated or unparseable:
+        logger.info("Backfilled booking schedule timestamps", extra={"updated": updated, "unparseable": unparseable})
+    return updated
+
+
+if __name__ == "__main__":
+    print(f"Backfilled {backfill_schedule_timestamps(get_engine())} bookings")
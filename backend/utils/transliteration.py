@@ -0,0 +1,142 @@
+"""
+Transliteration
+Script-neutral search keys for Hindi/Marathi (Devanagari) and English text,
+so "प्लंबर" finds "Plumber" and "Pune" finds "पुणे".
+
+Devanagari is romanized with simple Hindi/Marathi rules (inherent vowel,
+virama, matras, anusvara, final schwa deletion). Every word then gets two
+keys:
+- latin: lowercase romanization with long vowels and common spelling
+  variants folded ("ee" -> "i", "w" -> "v"), for prefix matching
+- skeleton: consonants only, with aspirates and sibilants merged, so
+  spellings that differ in vowels ("plambar", "plumber") meet
+
+Both scripts converge on these keys, so no Latin-to-Devanagari conversion
+is needed.
+"""
+import re
+import unicodedata
+from typing import List, Tuple
+
+_VOWELS = {
+    "अ": "a", "आ": "a", "इ": "i", "ई": "i", "उ": "u", "ऊ": "u", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o", "ॲ": "a",
+}
+_MATRAS = {
+    "ा": "a", "ि": "i", "ी": "i", "ु": "u", "ू": "u", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o", "ॅ": "e",
+}
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+# Consonant + nukta (precomposed forms are decomposed by NFD first)
+_NUKTA_CONSONANTS = {"क": "k", "ख": "kh", "ग": "g", "ज": "z", "ड": "r", "ढ": "rh", "फ": "f"}
+_VIRAMA = "्"
+_NUKTA = "़"
+_ANUSVARA = "ं"
+_CHANDRABINDU = "ँ"
+_VISARGA = "ः"
+_DIGITS = {chr(0x0966 + digit): str(digit) for digit in range(10)}
+
+# Spelling variants folded in the latin key, applied in order
+_LATIN_FOLDS = (("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"), ("w", "v"), ("ph", "f"))
+
+# Consonant merges for the skeleton, applied in order ("C" stands for "ch")
+_SKELETON_FOLDS = (
+    ("chh", "C"), ("ch", "C"), ("sh", "s"), ("ph", "f"), ("kh", "k"), ("gh", "g"),
+    ("ng", "n"), ("th", "t"), ("dh", "d"), ("bh", "b"), ("jh", "j"), ("ck", "k"), ("q", "k"),
+    ("x", "ks"), ("z", "j"), ("w", "v"),
+)
+_SOFT_C = re.compile(r"c(?=[eiy])")
+_SKELETON_DROP = re.compile(r"[aeiouhy]")
+_REPEATS = re.compile(r"(.)\1+")
+_WORD = re.compile(r"(?:[^\W_]|[\u0900-\u097F])+")  # matras and virama are not \w
+
+
+def is_devanagari(text: str) -> bool:
+    return any("ऀ" <= char <= "ॿ" for char in text)
+
+
+def _romanize_word(word: str) -> str:
+    out: List[str] = []
+    aksharas = 0
+    pending_schwa = False
+    chars = unicodedata.normalize("NFD", word)
+    for position, char in enumerate(chars):
+        following = chars[position + 1] if position + 1 < len(chars) else ""
+        if char in _CONSONANTS:
+            if pending_schwa:
+                out.append("a")
+            nukta = following == _NUKTA
+            out.append(_NUKTA_CONSONANTS.get(char, _CONSONANTS[char]) if nukta else _CONSONANTS[char])
+            aksharas += 1
+            pending_schwa = True
+            continue
+        if char == _NUKTA:
+            continue
+        if char == _VIRAMA:
+            pending_schwa = False
+            continue
+        if char in _MATRAS:
+            out.append(_MATRAS[char])
+            pending_schwa = False
+            continue
+        if pending_schwa:
+            out.append("a")
+            pending_schwa = False
+        if char in _VOWELS:
+            out.append(_VOWELS[char])
+            aksharas += 1
+        elif char in (_ANUSVARA, _CHANDRABINDU):
+            out.append("N")
+        elif char == _VISARGA:
+            out.append("h")
+        elif char in _DIGITS:
+            out.append(_DIGITS[char])
+        elif char.isascii():
+            out.append(char)
+    # Final schwa deletion: "राम" is "ram", but a lone "क" stays "ka"
+    if pending_schwa and aksharas == 1:
+        out.append("a")
+    # Anusvara is "m" before labials ("मुंबई" -> "mumbai"), otherwise "n"
+    return re.sub("N(?=[pbm])", "m", "".join(out)).replace("N", "n")
+
+
+def romanize(text: str) -> str:
+    """Devanagari words to Latin; other text is passed through"""
+    if not is_devanagari(text):
+        return text
+    return _WORD.sub(lambda match: _romanize_word(match.group()), text)
+
+
+def latin_key(word: str) -> str:
+    key = romanize(word).lower()
+    key = unicodedata.normalize("NFKD", key).encode("ascii", "ignore").decode()
+    for variant, folded in _LATIN_FOLDS:
+        key = key.replace(variant, folded)
+    return _REPEATS.sub(r"\1", key)
+
+
+def skeleton_key(latin: str) -> str:
+    key = latin
+    for variant, folded in _SKELETON_FOLDS:
+        key = key.replace(variant, folded)
+    key = _SOFT_C.sub("s", key).replace("c", "k")
+    key = _SKELETON_DROP.sub("", key)
+    return _REPEATS.sub(r"\1", key).lower()
+
+
+def search_keys(text: str) -> List[Tuple[str, str]]:
+    """(latin, skeleton) per word of `text`, in either script"""
+    keys = []
+    for word in _WORD.findall(text or ""):
+        latin = latin_key(word)
+        if latin:
+            keys.append((latin, skeleton_key(latin)))
+    return keys
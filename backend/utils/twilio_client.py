@@ -0,0 +1,20 @@
+"""
+Shared Twilio Client
+Imports the Twilio SDK on first use and reuses one client per process
+"""
+import threading
+from ..config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_twilio_client():
+    """Return the process-wide Twilio REST client, creating it lazily"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from twilio.rest import Client
+                _client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _client
@@ -5,17 +5,13 @@ import random
 import string
 from datetime import datetime, timedelta
 from typing import Optional
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Twilio Configuration
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")  # Your Twilio number
-OTP_LENGTH = int(os.getenv("OTP_LENGTH", "6"))
-OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "5"))
+from ..config import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_PHONE_NUMBER,  # Your Twilio number
+    OTP_LENGTH,
+    OTP_EXPIRY_MINUTES
+)
+from .twilio_client import get_twilio_client
 
 def generate_otp(length: int = OTP_LENGTH) -> str:
     """Generate random numeric OTP"""
@@ -33,8 +29,6 @@ async def send_otp_via_twilio(phone: str, otp: str) -> bool:
         bool: True if sent successfully, False otherwise
     """
     try:
-        from twilio.rest import Client
-        
         # Format phone number
         if not phone.startswith("+"):
             phone = "+91" + phone.replace("+", "").replace(" ", "")
@@ -42,8 +36,8 @@ async def send_otp_via_twilio(phone: str, otp: str) -> bool:
         print(f"🔄 Attempting to send OTP via Twilio to {phone}")
         print(f"📱 Using Twilio Account: {TWILIO_ACCOUNT_SID[:10]}...")
         
-        # Create Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        # Shared Twilio client (SDK imported on first use)
+        client = get_twilio_client()
         
         # Send SMS
         message = client.messages.create(
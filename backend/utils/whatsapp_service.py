@@ -2,20 +2,14 @@
 WhatsApp Notification Service using Twilio
 Sends booking notifications via WhatsApp
 """
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-from typing import Optional
+import logging
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from ..config import TWILIO_WHATSAPP_NUMBER, WEBSITE_URL
+from .notification_coalescer import NEW_BOOKING, BOOKING_CANCELLED, NotificationCoalescer, PendingNotification
+from .twilio_client import get_twilio_client
 
-# Load .env from backend folder
-env_path = Path(__file__).parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
-
-# Twilio Configuration
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")  # Twilio Sandbox
-WEBSITE_URL = os.getenv("WEBSITE_URL", "http://localhost:5175")  # Your website URL
+logger = logging.getLogger(__name__)
 
 
 async def send_whatsapp_message(phone: str, message: str) -> bool:
@@ -30,8 +24,6 @@ async def send_whatsapp_message(phone: str, message: str) -> bool:
         bool: True if sent successfully, False otherwise
     """
     try:
-        from twilio.rest import Client
-        
         # Format phone number for WhatsApp
         if not phone.startswith("whatsapp:"):
             # Remove any existing + and add whatsapp: prefix
@@ -42,23 +34,25 @@ async def send_whatsapp_message(phone: str, message: str) -> bool:
         else:
             whatsapp_phone = phone
         
-        print(f"📱 Attempting to send WhatsApp message to {whatsapp_phone}")
-        
-        # Create Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        # Shared Twilio client (SDK imported on first use)
+        client = get_twilio_client()
         
-        # Send WhatsApp message
-        twilio_message = client.messages.create(
+        # Send WhatsApp message (the Twilio SDK blocks, keep it off the event loop)
+        twilio_message = await run_in_threadpool(
+            client.messages.create,
             body=message,
             from_=TWILIO_WHATSAPP_NUMBER,
             to=whatsapp_phone
         )
         
-        print(f"✅ WhatsApp message sent successfully! SID: {twilio_message.sid}")
+        logger.info(
+            "WhatsApp message sent",
+            extra={"phone": whatsapp_phone, "message_sid": twilio_message.sid}
+        )
         return True
         
-    except Exception as e:
-        print(f"❌ Failed to send WhatsApp message: {str(e)}")
+    except Exception:
+        logger.error("Failed to send WhatsApp message", exc_info=True, extra={"phone": phone})
         return False
 
 
@@ -67,7 +61,8 @@ async def notify_provider_new_booking(
     customer_name: str,
     service: str,
     booking_type: str,
-    description: str
+    description: str,
+    urgent: bool = False
 ) -> bool:
     """
     Notify provider about a new booking request
@@ -78,9 +73,10 @@ async def notify_provider_new_booking(
         service: Service requested
         booking_type: Type of booking (immediate/scheduled)
         description: Booking description
+        urgent: Send now instead of coalescing (e.g. time-limited dispatch offers)
         
     Returns:
-        bool: True if notification sent successfully
+        bool: True if notification sent (or buffered for the provider's digest)
     """
     message = f"""
 🔔 *New Booking Request!*
@@ -96,7 +92,14 @@ Please check your dashboard to accept or reject:
 _Reply with 'join @notify' to receive future notifications_
     """.strip()
     
-    return await send_whatsapp_message(provider_phone, message)
+    if urgent:
+        return await send_whatsapp_message(provider_phone, message)
+    return await notification_coalescer.submit(
+        provider_phone,
+        NEW_BOOKING,
+        message,
+        summary=f"{service} for {customer_name} ({booking_type.upper()})"
+    )
 
 
 async def notify_customer_booking_accepted(
@@ -174,6 +177,40 @@ _Reply with 'join @notify' to receive future notifications_
     return await send_whatsapp_message(customer_phone, message)
 
 
+async def notify_customer_no_provider(
+    customer_phone: str,
+    service: str
+) -> bool:
+    """
+    Notify customer that no provider took their dispatched booking
+    
+    Args:
+        customer_phone: Customer's phone number
+        service: Service requested
+        
+    Returns:
+        bool: True if notification sent successfully
+    """
+    message = f"""
+😔 *No Provider Available*
+
+We couldn't find an available provider near you right now.
+
+🔧 Service: {service}
+
+💡 You can:
+• Try again in a few minutes
+• Book a provider directly or schedule for later
+
+Browse providers on your dashboard:
+🌐 {WEBSITE_URL}/dashboard
+
+_Reply with 'join @notify' to receive future notifications_
+    """.strip()
+    
+    return await send_whatsapp_message(customer_phone, message)
+
+
 async def notify_customer_work_completed(
     customer_phone: str,
     provider_name: str,
@@ -227,7 +264,7 @@ async def notify_provider_booking_cancelled(
         booking_type: Type of booking (immediate/scheduled)
         
     Returns:
-        bool: True if notification sent successfully
+        bool: True if notification sent (or buffered for the provider's digest)
     """
     message = f"""
 🚫 *Booking Cancelled by Customer*
@@ -246,7 +283,12 @@ Check your dashboard:
 _Reply with 'join @notify' to receive future notifications_
     """.strip()
     
-    return await send_whatsapp_message(provider_phone, message)
+    return await notification_coalescer.submit(
+        provider_phone,
+        BOOKING_CANCELLED,
+        message,
+        summary=f"{service} for {customer_name} ({booking_type.upper()})"
+    )
 
 
 async def notify_customer_job_cancelled(
@@ -284,3 +326,85 @@ _Reply with 'join @notify' to receive future notifications_
     """.strip()
     
     return await send_whatsapp_message(customer_phone, message)
+
+
+async def notify_provider_upcoming_booking(
+    provider_phone: str,
+    customer_name: str,
+    service: str,
+    scheduled_date: str,
+    scheduled_time: str,
+    booking_status: str
+) -> bool:
+    """
+    Remind provider about a scheduled booking that starts soon
+    
+    Args:
+        provider_phone: Provider's phone number
+        customer_name: Name of the customer
+        service: Service that was booked
+        scheduled_date: Booking date as the customer entered it
+        scheduled_time: Booking time as the customer entered it
+        booking_status: 'pending' or 'accepted'
+        
+    Returns:
+        bool: True if notification sent successfully
+    """
+    if booking_status == "pending":
+        action = "⚠️ This request is still waiting for your response. Accept or reject it on your dashboard."
+    else:
+        action = "Please be on time and ask the customer for the acceptance code."
+    
+    message = f"""
+⏰ *Upcoming Booking Reminder*
+
+You have a booking coming up soon.
+
+👤 Customer: {customer_name}
+🔧 Service: {service}
+📅 Date: {scheduled_date}
+🕐 Time: {scheduled_time}
+
+{action}
+
+Check your dashboard:
+🌐 {WEBSITE_URL}/dashboard
+
+_Reply with 'join @notify' to receive future notifications_
+    """.strip()
+    
+    return await send_whatsapp_message(provider_phone, message)
+
+
+# Digest headings per coalesced kind: (singular, plural)
+DIGEST_HEADINGS = {
+    NEW_BOOKING: ("🔔 1 new booking request", "🔔 {count} new booking requests"),
+    BOOKING_CANCELLED: ("🚫 1 booking cancelled by the customer", "🚫 {count} bookings cancelled by customers"),
+}
+
+# Lines listed per kind before the rest is summarized as "and N more"
+DIGEST_MAX_LINES = 10
+
+
+def render_digest(notifications: List[PendingNotification]) -> str:
+    """One message summarizing several buffered notifications for the same recipient, grouped by kind"""
+    sections = []
+    for kind, (singular, plural) in DIGEST_HEADINGS.items():
+        summaries = [notification.summary for notification in notifications if notification.kind == kind]
+        if not summaries:
+            continue
+        heading = singular if len(summaries) == 1 else plural.format(count=len(summaries))
+        lines = [f"• {summary}" for summary in summaries[:DIGEST_MAX_LINES]]
+        if len(summaries) > DIGEST_MAX_LINES:
+            lines.append(f"• …and {len(summaries) - DIGEST_MAX_LINES} more")
+        sections.append(f"*{heading}*\n" + "\n".join(lines))
+    
+    return "\n\n".join(sections) + f"""
+
+Please check your dashboard to respond:
+🌐 {WEBSITE_URL}/dashboard
+
+_Reply with 'join @notify' to receive future notifications_"""
+
+
+notification_coalescer = NotificationCoalescer(send_whatsapp_message, render_digest)